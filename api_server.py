@@ -1,31 +1,78 @@
-from typing import Dict, Optional
-from multiprocessing import Queue, Process
+import json
+import time
+from typing import Dict, List, Tuple, Optional, AsyncIterator
+
+from utils.metrics_dir_utils import init_metrics_multiproc_dir
+
+# 多进程指标目录需要在导入 utils.metrics_utils 之前设置，
+# 直接启动时清空这个容器上一次启动留下的指标文件，uvicorn 的 worker 导入时不清空
+init_metrics_multiproc_dir(clear=__name__ == "__main__")
 
 import uvicorn
 from pydantic import BaseModel
+from pymongo.errors import PyMongoError
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi import Limiter, _rate_limit_exceeded_handler
+from fastapi.responses import Response, StreamingResponse
 from fastapi import Query, FastAPI, Request, BackgroundTasks
 
 from utils.encrypt_utils import md5_str
-from call_spider import spider_task_receiver
-from utils.async_task_utils import MultiProcessQueue
-from pipeline.redis_pipeline import RedisPipelineHandler
+from spiders import blogs_collection_name_map
+from pipeline.mongodb_pipeline import AsyncMongoDBHandler
+from pipeline.redis_pipeline import AsyncRedisPipelineHandler
 from utils.logger_utils import LogManager, UVICORN_LOGGING_CONFIG
+from utils.task_control_utils import (
+    get_cancel_key,
+    get_credential_key,
+    split_task_credential,
+)
+from utils.trace_utils import get_trace_key, parse_trace_spans
+from utils.metrics_utils import generate_metrics, TASK_QUEUE_DEPTH_METRIC
+from utils.progress_utils import (
+    TaskProgressPhase,
+    get_progress_key,
+    get_progress_channel,
+    parse_progress_snapshot,
+)
 from config import (
     LOG_LEVEL,
     SERVER_HOST,
     SERVER_PORT,
+    SERVER_WORKERS,
     SPIDER_SUPPORT_LIST,
+    CODE_TO_STATUS_MAP,
     PROCESS_STATUS_FAIL,
+    PROCESS_STATUS_START,
+    PROCESS_STATUS_PENDING,
+    BATCH_CHECK_MAX_SIZE,
+    TASK_QUEUE_REDIS_KEY,
+    TASK_CANCEL_EXPIRE_SECONDS,
+    TASK_CREDENTIAL_EXPIRE_SECONDS,
+    BATCH_CREATE_QUOTA,
+    BATCH_CREATE_MAX_SIZE,
+    BATCH_CREATE_RATE_LIMIT,
+    BATCH_CREATE_QUOTA_WINDOW_SECONDS,
+    RATE_LIMIT_STORAGE_URI,
+    RATE_LIMIT_STORAGE_TIMEOUT_SECONDS,
+    TASK_RESULT_BATCH_SIZE,
+    TASK_PROGRESS_HEARTBEAT_SECONDS,
 )
 
 logger = LogManager("fastapi").get_logger_and_add_handlers(
     formatter_template=5, log_level_int=LOG_LEVEL
 )
 
-limiter = Limiter(key_func=get_remote_address)
+# 限流计数保存在 Redis 中，多个 worker 以及多个实例共享
+# slowapi 只支持同步的存储，限流计数的读写会阻塞事件循环，通过超时时间限制阻塞的时间
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    storage_options={
+        "socket_timeout": RATE_LIMIT_STORAGE_TIMEOUT_SECONDS,
+        "socket_connect_timeout": RATE_LIMIT_STORAGE_TIMEOUT_SECONDS,
+    },
+)
 app = FastAPI(
     title="BlogsCrawler-Management",
     description="BlogsCrawler-API",
@@ -38,8 +85,9 @@ app = FastAPI(
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app_api_router: str = "/api/v1"
-app_redis_handler = RedisPipelineHandler()
-message_queue: Queue = MultiProcessQueue()
+# API 服务使用异步的 Redis 以及 MongoDB 客户端，接口不会阻塞事件循环
+app_redis_handler = AsyncRedisPipelineHandler()
+app_mongo_handler: Optional[AsyncMongoDBHandler] = None
 logger.info("项目启动成功!")
 
 
@@ -56,6 +104,20 @@ class TaskResponse(BaseModel):
     taskId: Optional[str] = None
 
 
+class BatchTaskResponse(BaseModel):
+    code: str = "000000"
+    message: str = "success"
+    data: Optional[Dict] = None
+
+
+def get_mongo_handler() -> AsyncMongoDBHandler:
+    # MongoDB 只有任务结果接口会用到，第一次使用时再连接
+    global app_mongo_handler
+    if app_mongo_handler is None:
+        app_mongo_handler = AsyncMongoDBHandler()
+    return app_mongo_handler
+
+
 def error_response(code: str = "999999", message: str = "error") -> TaskResponse:
     response = TaskResponse()
     response.code = code
@@ -73,23 +135,66 @@ def success_response(
     return response
 
 
-def submit_async_task(task_id: str, spider_name: str, username: str, password: str):
+def parse_create_task_args(task_args: Optional[Dict]) -> Tuple[Optional[Dict], str]:
     """
-    提交异步任务
-    :param task_id: 任务 ID
-    :param spider_name: 爬虫名称
-    :param username: 爬虫登录的用户名
-    :param password: 爬虫登录的密码
+    校验创建任务的参数并生成任务 ID
+    :param task_args: {"spiderName": 爬虫名称, "username": 用户名, "password": 密码}
+    :return: (任务数据, 错误信息)，参数错误时任务数据为 None
     """
-    # 生成任务 ID
+    if task_args is None or isinstance(task_args, dict) is not True:
+        return None, "ErrorTaskArgs"
+
+    spider_name: Optional[str] = task_args.get("spiderName")
+    if spider_name is None or isinstance(spider_name, str) is not True:
+        return None, "ErrorTaskArgs"
+    spider_name = spider_name.lower()
+    if spider_name not in SPIDER_SUPPORT_LIST:
+        return None, "ErrorTaskArgs - spiderName is Error"
+
+    spider_username: Optional[str] = task_args.get("username")
+    if spider_username is None:
+        return None, "ErrorTaskArgs"
+
+    spider_password: Optional[str] = task_args.get("password")
+    if spider_password is None:
+        return None, "ErrorTaskArgs"
+
+    # 任务 ID
+    task_id: str = md5_str(
+        encrypt_str=f"{spider_name}-*-{spider_username}-*-{spider_password}"
+    )
     task_dict: Dict = {
         "taskId": task_id,
         "spider": spider_name,
-        "username": username,
-        "password": password,
+        "username": spider_username,
+        "password": spider_password,
     }
-    message_queue.put(task_dict)
-    logger.info(f"任务创建成功! 任务ID: {task_id}")
+    return task_dict, ""
+
+
+async def submit_async_task(task_dict: Dict):
+    """
+    提交异步任务(写入 Redis 任务队列，由爬虫进程 call_spider.py 消费)
+    登录凭据不写入任务队列，单独保存在带过期时间的 key 中，爬虫进程读取后立即删除
+    :param task_dict: 任务
+    """
+    task_id: str = task_dict["taskId"]
+    task_message, credential = split_task_credential(task_dict=task_dict)
+    is_push = await app_redis_handler.insert_keys_and_push_list(
+        mapping={},
+        list_key=TASK_QUEUE_REDIS_KEY,
+        values=[task_message],
+        hash_mapping={get_credential_key(task_id=task_id): credential},
+        hash_expire_seconds=TASK_CREDENTIAL_EXPIRE_SECONDS,
+    )
+    if is_push:
+        logger.info(f"任务创建成功! 任务ID: {task_id}")
+    else:
+        # 写入队列失败时把任务设置为失败，可以重新创建
+        await app_redis_handler.insert_key(
+            key=f"spider_task:{task_id}", value=str(PROCESS_STATUS_FAIL)
+        )
+        logger.error(f"任务创建失败! 任务ID: {task_id}")
 
 
 @app.post(
@@ -98,55 +203,174 @@ def submit_async_task(task_id: str, spider_name: str, username: str, password: s
     response_model_include={"code", "message"},
 )
 @limiter.limit("1/seconds")
-def create_task(request: Request, task: TaskRequest, background_task: BackgroundTasks):
+async def create_task(
+    request: Request, task: TaskRequest, background_task: BackgroundTasks
+):
     """
     接口请求参数：
     taskType：操作类型
     taskArgs：具体的数据
 
     0、这个接口需要做限流
-    1、利用 FastAPI 的 BackgroundTask 去传递任务信息
-    2、前端在收到这个接口返回之后去请求 checkTaskStatus 获取任务的状态
-    3、BackgroundTask 往进程队列发送任务
+    1、通过 WATCH/MULTI 把任务状态设置为 PENDING，同时创建同一个任务时只有一个请求成功(失败的任务可以重新创建)，
+       同时删除上一次执行留下的取消标记
+    2、利用 FastAPI 的 BackgroundTask 去传递任务信息
+    3、前端在收到这个接口返回之后去请求 checkTaskStatus 获取任务的状态
+    4、BackgroundTask 往 Redis 任务队列发送任务
     """
 
     if task.taskType != "create":
         return error_response(message="ErrorTaskType")
 
     # 参数校验
-    task_args: Optional[Dict] = task.taskArgs
-    if task_args is None or isinstance(task.taskArgs, dict) is not True:
-        return error_response(message="ErrorTaskArgs")
-
-    spider_name: Optional[str] = task_args.get("spiderName")
-    if spider_name is None:
-        return error_response(message="ErrorTaskArgs")
-    spider_name = spider_name.lower()
-    if spider_name not in SPIDER_SUPPORT_LIST:
-        return error_response(message="ErrorTaskArgs - spiderName is Error")
+    task_dict, error_message = parse_create_task_args(task_args=task.taskArgs)
+    if task_dict is None:
+        return error_response(message=error_message)
+    task_id: str = task_dict["taskId"]
+
+    admit_keys: Optional[List[str]] = await app_redis_handler.insert_keys_if_absent(
+        keys=[f"spider_task:{task_id}"],
+        value=str(PROCESS_STATUS_PENDING),
+        replace_value=str(PROCESS_STATUS_FAIL),
+        delete_keys={f"spider_task:{task_id}": get_cancel_key(task_id=task_id)},
+    )
+    if admit_keys is None:
+        return error_response(message="Redis error!")
+    if len(admit_keys) == 0:
+        return error_response(message="Task is Exist! Do not duplicate create!")
+    # 通过 BackgroundTask 提交异步任务
+    background_task.add_task(submit_async_task, task_dict)
+    return success_response(data=task_id)
 
-    spider_username: Optional[str] = task_args.get("username")
-    if spider_username is None:
-        return error_response(message="ErrorTaskArgs")
 
-    spider_password: Optional[str] = task_args.get("password")
-    if spider_password is None:
-        return error_response(message="ErrorTaskArgs")
+@app.post(path=f"{app_api_router}/task/batchCreate", response_model=BatchTaskResponse)
+@limiter.limit(BATCH_CREATE_RATE_LIMIT)
+async def batch_create_task(request: Request, task: TaskRequest):
+    """
+    批量创建任务
+    接口请求参数：
+    taskType：batchCreate
+    taskArgs.tasks：[{"spiderName": 爬虫名称, "username": 用户名, "password": 密码}, ...]
+
+    0、接口限流与单个创建接口分开计数，另外每个 IP 在一个时间窗口内有创建任务数的配额
+    1、逐个校验参数并计算任务 ID，同一请求中重复的任务只创建一次
+    2、按任务数预扣配额，超出配额时回滚
+    3、通过 WATCH/MULTI 把任务状态设置为 PENDING(失败的任务可以重新创建)并删除上一次执行留下的取消标记，
+       同时创建同一个任务时只有一个请求成功，只有设置成功的任务写入任务队列，未使用的配额退回
+    返回 {"created": 创建的任务数, "results": [{"index": 序号, "taskId": 任务 ID, "result": 结果}]}
+    结果为 created，exist，duplicate 或者参数错误信息
+    """
+    if task.taskType != "batchCreate":
+        return BatchTaskResponse(code="999999", message="ErrorTaskType")
+
+    if task.taskArgs is None or isinstance(task.taskArgs, dict) is not True:
+        return BatchTaskResponse(code="999999", message="ErrorTaskArgs")
+
+    task_args_list = task.taskArgs.get("tasks")
+    if isinstance(task_args_list, list) is not True or len(task_args_list) == 0:
+        return BatchTaskResponse(code="999999", message="ErrorTaskArgs")
+    if len(task_args_list) > BATCH_CREATE_MAX_SIZE:
+        return BatchTaskResponse(
+            code="999999",
+            message=f"ErrorTaskArgs - tasks is limited to {BATCH_CREATE_MAX_SIZE}",
+        )
 
-    # 任务 ID
-    task_id: str = md5_str(
-        encrypt_str=f"{spider_name}-*-{spider_username}-*-{spider_password}"
+    # 参数校验并去重
+    results: List[Dict] = []
+    task_dict_map: Dict = {}
+    for index, task_args in enumerate(task_args_list):
+        task_dict, error_message = parse_create_task_args(task_args=task_args)
+        if task_dict is None:
+            results.append({"index": index, "taskId": None, "result": error_message})
+        elif task_dict["taskId"] in task_dict_map:
+            results.append(
+                {"index": index, "taskId": task_dict["taskId"], "result": "duplicate"}
+            )
+        else:
+            task_dict_map[task_dict["taskId"]] = task_dict
+            results.append(
+                {"index": index, "taskId": task_dict["taskId"], "result": "created"}
+            )
+    task_ids: List = list(task_dict_map.keys())
+    if len(task_ids) == 0:
+        return BatchTaskResponse(data={"created": 0, "results": results})
+
+    # 预扣配额，超出配额时回滚
+    quota_window: int = int(time.time()) // BATCH_CREATE_QUOTA_WINDOW_SECONDS
+    quota_key: str = f"batch_create_quota:{get_remote_address(request)}:{quota_window}"
+    quota_used = await app_redis_handler.incr_key(
+        key=quota_key,
+        amount=len(task_ids),
+        expire_seconds=BATCH_CREATE_QUOTA_WINDOW_SECONDS,
     )
+    if quota_used is None:
+        return BatchTaskResponse(code="999999", message="Redis error!")
+    if quota_used > BATCH_CREATE_QUOTA:
+        await app_redis_handler.incr_key(key=quota_key, amount=-len(task_ids))
+        return BatchTaskResponse(
+            code="999999",
+            message=f"Quota exceeded! {BATCH_CREATE_QUOTA} tasks per "
+            f"{BATCH_CREATE_QUOTA_WINDOW_SECONDS} seconds",
+        )
 
-    task_result = app_redis_handler.find_key(key=f"spider_task:{task_id}")
-    if task_result is None or task_result == str(PROCESS_STATUS_FAIL):
-        # 通过 BackgroundTask 提交异步任务
-        background_task.add_task(
-            submit_async_task, task_id, spider_name, spider_username, spider_password
+    # 设置任务状态，只有设置成功的任务由这个请求创建
+    admit_keys: Optional[List[str]] = await app_redis_handler.insert_keys_if_absent(
+        keys=[f"spider_task:{task_id}" for task_id in task_ids],
+        value=str(PROCESS_STATUS_PENDING),
+        replace_value=str(PROCESS_STATUS_FAIL),
+        delete_keys={
+            f"spider_task:{task_id}": get_cancel_key(task_id=task_id)
+            for task_id in task_ids
+        },
+    )
+    if admit_keys is None:
+        await app_redis_handler.incr_key(key=quota_key, amount=-len(task_ids))
+        return BatchTaskResponse(code="999999", message="Redis error!")
+    admit_key_set = set(admit_keys)
+    new_task_ids: List = [
+        task_id for task_id in task_ids if f"spider_task:{task_id}" in admit_key_set
+    ]
+    for result in results:
+        if (
+            result["result"] == "created"
+            and f"spider_task:{result['taskId']}" not in admit_key_set
+        ):
+            result["result"] = "exist"
+    if len(new_task_ids) < len(task_ids):
+        await app_redis_handler.incr_key(
+            key=quota_key, amount=len(new_task_ids) - len(task_ids)
         )
-        return success_response(data=task_id)
-    else:
-        return error_response(message="Task is Exist! Do not duplicate create!")
+    if len(new_task_ids) == 0:
+        return BatchTaskResponse(data={"created": 0, "results": results})
+
+    # 写入任务队列，登录凭据单独写入带过期时间的 key
+    task_message_list: List[str] = []
+    credential_mapping: Dict = {}
+    for task_id in new_task_ids:
+        task_message, credential = split_task_credential(
+            task_dict=task_dict_map[task_id]
+        )
+        task_message_list.append(task_message)
+        credential_mapping[get_credential_key(task_id=task_id)] = credential
+    is_push = await app_redis_handler.insert_keys_and_push_list(
+        mapping={},
+        list_key=TASK_QUEUE_REDIS_KEY,
+        values=task_message_list,
+        hash_mapping=credential_mapping,
+        hash_expire_seconds=TASK_CREDENTIAL_EXPIRE_SECONDS,
+    )
+    if is_push is not True:
+        # 写入队列失败时把任务设置为失败，可以重新创建
+        await app_redis_handler.insert_keys_and_push_list(
+            mapping={key: str(PROCESS_STATUS_FAIL) for key in admit_keys},
+            list_key=TASK_QUEUE_REDIS_KEY,
+            values=[],
+        )
+        await app_redis_handler.incr_key(key=quota_key, amount=-len(new_task_ids))
+        return BatchTaskResponse(code="999999", message="Redis error!")
+
+    logger.info(f"批量创建任务成功! 任务数: {len(new_task_ids)}")
+    return BatchTaskResponse(data={"created": len(new_task_ids), "results": results})
 
 
 @app.post(
@@ -154,7 +378,7 @@ def create_task(request: Request, task: TaskRequest, background_task: Background
     response_model=TaskResponse,
     response_model_include={"code", "message"},
 )
-def check_task(task: TaskRequest):
+async def check_task(task: TaskRequest):
     if task.taskType != "check":
         return error_response(message="ErrorTaskType")
     """
@@ -166,7 +390,7 @@ def check_task(task: TaskRequest):
         if job_id is None:
             return error_response(message="ErrorTaskArgs")
 
-        job_status = app_redis_handler.find_key(key=job_id)
+        job_status = await app_redis_handler.find_key(key=job_id)
         if job_status is None:
             return error_response(message="Non exist task!")
 
@@ -174,22 +398,304 @@ def check_task(task: TaskRequest):
     return error_response(message="ErrorTaskArgs")
 
 
+@app.post(
+    path=f"{app_api_router}/task/cancel",
+    response_model=TaskResponse,
+    response_model_include={"code", "message"},
+)
+async def cancel_task(task: TaskRequest):
+    """
+    取消任务
+    1、在 Redis 中写入任务的取消标记
+    2、还在队列中的任务不再执行；正在执行的任务在下一次分页时停止，保存已经获取到的数据，任务状态为 EXIT
+    """
+    if task.taskType != "cancel":
+        return error_response(message="ErrorTaskType")
+
+    if task.taskArgs is None or isinstance(task.taskArgs, dict) is not True:
+        return error_response(message="ErrorTaskArgs")
+
+    job_id = task.taskArgs.get("job_id")
+    if job_id is None:
+        return error_response(message="ErrorTaskArgs")
+
+    # 只有还在队列中或者刚开始执行的任务可以取消，检查任务状态与写入取消标记在同一个事务中完成
+    insert_res = await app_redis_handler.insert_key_if_value_in(
+        key=get_cancel_key(task_id=job_id),
+        value="1",
+        check_key=f"spider_task:{job_id}",
+        check_values=[str(PROCESS_STATUS_PENDING), str(PROCESS_STATUS_START)],
+        expire_seconds=TASK_CANCEL_EXPIRE_SECONDS,
+    )
+    if insert_res is None:
+        return error_response(message="Redis error!")
+    is_insert, job_status = insert_res
+    if job_status is None:
+        return error_response(message="Non exist task!")
+    if is_insert is not True:
+        return error_response(message="Task is finished! Can not cancel!")
+    return success_response(data=job_id)
+
+
+@app.post(
+    path=f"{app_api_router}/task/batchCheckTaskStatus",
+    response_model=BatchTaskResponse,
+)
+async def batch_check_task(task: TaskRequest):
+    """
+    批量查询任务状态
+    1、通过一次 MGET 获取所有任务的状态
+    2、返回 {任务 ID: {"code": 状态码, "status": 状态名称}}，不存在的任务为 null
+    """
+    if task.taskType != "batchCheck":
+        return BatchTaskResponse(code="999999", message="ErrorTaskType")
+
+    if task.taskArgs is None or isinstance(task.taskArgs, dict) is not True:
+        return BatchTaskResponse(code="999999", message="ErrorTaskArgs")
+
+    job_ids = task.taskArgs.get("job_ids")
+    if isinstance(job_ids, list) is not True or len(job_ids) == 0:
+        return BatchTaskResponse(code="999999", message="ErrorTaskArgs")
+    if len(job_ids) > BATCH_CHECK_MAX_SIZE:
+        return BatchTaskResponse(
+            code="999999",
+            message=f"ErrorTaskArgs - job_ids is limited to {BATCH_CHECK_MAX_SIZE}",
+        )
+
+    job_ids = [str(job_id) for job_id in job_ids]
+    job_status_list: Optional[List] = await app_redis_handler.find_keys(
+        keys=[f"spider_task:{job_id}" for job_id in job_ids]
+    )
+    if job_status_list is None:
+        return BatchTaskResponse(code="999999", message="Redis error!")
+
+    data: Dict = {}
+    for job_id, job_status in zip(job_ids, job_status_list):
+        if job_status is None:
+            data[job_id] = None
+        else:
+            data[job_id] = {
+                "code": job_status,
+                "status": CODE_TO_STATUS_MAP.get(int(job_status)),
+            }
+    return BatchTaskResponse(data=data)
+
+
+async def progress_event_stream(task_id: str) -> AsyncIterator[str]:
+    """
+    任务进度的 SSE 数据流
+    :param task_id: 任务 ID
+    """
+    pubsub = await app_redis_handler.subscribe_channel(
+        channel=get_progress_channel(task_id=task_id)
+    )
+    if pubsub is None:
+        yield f"event: error\ndata: {json.dumps({'message': 'Redis error!'})}\n\n"
+        return
+
+    try:
+        # 先订阅再读取快照，避免丢失两者之间发布的进度
+        snapshot = await app_redis_handler.find_hash(
+            key=get_progress_key(task_id=task_id)
+        )
+        if snapshot:
+            snapshot = parse_progress_snapshot(snapshot=snapshot)
+            yield f"data: {json.dumps(snapshot)}\n\n"
+            if snapshot.get("phase") == TaskProgressPhase.Finish:
+                return
+
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=TASK_PROGRESS_HEARTBEAT_SECONDS
+            )
+            if message is None:
+                # 没有新的进度时检查任务是否已经失败，否则发送心跳保持连接
+                task_status = await app_redis_handler.find_key(
+                    key=f"spider_task:{task_id}"
+                )
+                if task_status == str(PROCESS_STATUS_FAIL):
+                    yield f"event: fail\ndata: {json.dumps({'taskId': task_id})}\n\n"
+                    return
+                yield ": heartbeat\n\n"
+                continue
+
+            yield f"data: {message['data']}\n\n"
+            if json.loads(message["data"]).get("phase") == TaskProgressPhase.Finish:
+                return
+    finally:
+        await pubsub.reset()
+
+
+@app.get(path=f"{app_api_router}/task/taskProgress")
+async def get_task_progress(
+    taskId: str = Query(..., title="任务 ID", description="创建任务接口返回的任务 ID")
+):
+    """
+    通过 SSE(text/event-stream) 推送任务的实时进度，替代轮询 checkTaskStatus
+    推送内容：当前阶段、请求页数、解析条数、写入条数以及各阶段耗时
+    """
+    return StreamingResponse(
+        progress_event_stream(task_id=taskId), media_type="text/event-stream"
+    )
+
+
+@app.get(path=f"{app_api_router}/task/taskTrace", response_model=BatchTaskResponse)
+async def get_task_trace(
+    taskId: str = Query(..., title="任务 ID", description="创建任务接口返回的任务 ID")
+):
+    """
+    获取任务的追踪数据(瀑布图)
+    spans：按开始时间排序的 span，顶层 span(parentId 为 -1)为任务阶段，子 span 为请求、验证码识别、JS 签名、写入数据等
+    summary：每种子 span 的次数以及总耗时(毫秒)
+    """
+    raw_spans: Optional[List] = await app_redis_handler.find_list(
+        key=get_trace_key(task_id=taskId)
+    )
+    if raw_spans is None:
+        return BatchTaskResponse(code="999999", message="Redis error!")
+    if len(raw_spans) == 0:
+        return BatchTaskResponse(code="999999", message="Non exist task trace!")
+    return BatchTaskResponse(data=dict(parse_trace_spans(raw_spans), taskId=taskId))
+
+
+async def task_result_stream(
+    task_id: str, data_types: List[str], col_show: Dict, skip: int, limit: int
+) -> AsyncIterator[str]:
+    """
+    通过服务端游标分批读取任务数据并以 NDJSON 的形式输出，内存占用与数据量无关
+    :param task_id: 任务 ID
+    :param data_types: 数据类型
+    :param col_show: 返回的字段
+    :param skip: 跳过的条数
+    :param limit: 最多返回的条数，0 为不限制
+    """
+    mongo_handler = get_mongo_handler()
+    for data_type in data_types:
+        cursor = mongo_handler.find_cursor(
+            col_name=blogs_collection_name_map[data_type],
+            query={"taskId": task_id},
+            col_show=col_show,
+            skip=skip,
+            limit=limit,
+            batch_size=TASK_RESULT_BATCH_SIZE,
+        )
+        if cursor is None:
+            yield json.dumps({"dataType": data_type, "error": "MongoDB error!"}) + "\n"
+            continue
+
+        # 游标在迭代时才查询 MongoDB，响应已经开始发送，出错时输出一行错误信息
+        lines: List = []
+        try:
+            async for doc in cursor:
+                lines.append(
+                    json.dumps(
+                        {"dataType": data_type, "data": doc},
+                        ensure_ascii=False,
+                        default=str,
+                    )
+                )
+                if len(lines) >= TASK_RESULT_BATCH_SIZE:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+        except PyMongoError as err:
+            logger.error(err)
+            lines.append(json.dumps({"dataType": data_type, "error": "MongoDB error!"}))
+        finally:
+            await cursor.close()
+        if len(lines) > 0:
+            yield "\n".join(lines) + "\n"
+
+
 @app.post(
     path=f"{app_api_router}/task/taskResult",
     response_model=TaskResponse,
     response_model_include={"code", "message"},
 )
-def get_task_result(task: TaskRequest):
+async def get_task_result(task: TaskRequest):
+    """
+    接口请求参数：
+    taskArgs.job_id：任务 ID
+    taskArgs.dataTypes：数据类型，可选 personal，personalBlogs，personalLikeBlogs，默认全部
+    taskArgs.fields：返回的字段，默认全部
+    taskArgs.page，taskArgs.pageSize：分页参数(每种数据类型分别分页)，默认不分页
+
+    以 NDJSON 的形式流式返回任务数据，每行为 {"dataType": 数据类型, "data": 数据}
+    """
     if task.taskType != "getResult":
         return error_response(message="ErrorTaskType")
-    # TODO 获取任务结果
+
+    task_args: Optional[Dict] = task.taskArgs
+    if task_args is None or isinstance(task_args, dict) is not True:
+        return error_response(message="ErrorTaskArgs")
+
+    job_id: Optional[str] = task_args.get("job_id")
+    if job_id is None:
+        return error_response(message="ErrorTaskArgs")
+
+    data_types = task_args.get("dataTypes", list(blogs_collection_name_map.keys()))
+    if isinstance(data_types, list) is not True or any(
+        data_type not in blogs_collection_name_map for data_type in data_types
+    ):
+        return error_response(message="ErrorTaskArgs - dataTypes is Error")
+
+    col_show: Dict = {"_id": 0}
+    fields = task_args.get("fields")
+    if fields is not None:
+        if isinstance(fields, list) is not True:
+            return error_response(message="ErrorTaskArgs - fields is Error")
+        col_show.update({str(field): 1 for field in fields})
+
+    skip: int = 0
+    limit: int = 0
+    page = task_args.get("page")
+    page_size = task_args.get("pageSize")
+    if page is not None or page_size is not None:
+        if (
+            isinstance(page, int) is not True
+            or isinstance(page_size, int) is not True
+            # bool 是 int 的子类，true/false 不是合法的页码
+            or isinstance(page, bool)
+            or isinstance(page_size, bool)
+            or page < 0
+            or page_size <= 0
+        ):
+            return error_response(message="ErrorTaskArgs - page is Error")
+        skip = page * page_size
+        limit = page_size
+
+    return StreamingResponse(
+        task_result_stream(
+            task_id=job_id,
+            data_types=data_types,
+            col_show=col_show,
+            skip=skip,
+            limit=limit,
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.get(path="/metrics")
+async def get_metrics():
+    """
+    Prometheus 监控指标(汇总 API 服务以及爬虫进程所有进程的指标)
+    """
+    extra_gauges: Dict = {}
+    queue_depth = await app_redis_handler.find_list_length(key=TASK_QUEUE_REDIS_KEY)
+    if queue_depth is not None:
+        extra_gauges[TASK_QUEUE_DEPTH_METRIC] = ("任务队列中等待的任务数", queue_depth)
+    return Response(
+        content=generate_metrics(extra_gauges=extra_gauges),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 if __name__ == "__main__":
-    # 子进程
-    sub_process = Process(target=spider_task_receiver)
-    sub_process.start()
-    # 启动 API 服务
+    # 启动 API 服务(爬虫进程通过 python call_spider.py 单独启动)
     uvicorn.run(
-        app=app, host=SERVER_HOST, port=SERVER_PORT, log_config=UVICORN_LOGGING_CONFIG
+        app="api_server:app",
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        workers=SERVER_WORKERS,
+        log_config=UVICORN_LOGGING_CONFIG,
     )
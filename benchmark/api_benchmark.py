@@ -0,0 +1,130 @@
+"""
+API 压测脚本
+通过线程池并发请求接口，统计每秒请求数(rps)以及 p50/p90/p99 延迟
+
+默认压测 checkTaskStatus 接口，压测前在 Redis 中写入 spider_task:benchmark，
+保证请求走的是查到任务状态的路径(而不是任务不存在的路径)
+
+例：
+python benchmark/api_benchmark.py --concurrency 64 --requests 20000
+python benchmark/api_benchmark.py --path /api/v1/task/checkTaskStatus \
+    --payload '{"taskType": "check", "taskArgs": {"job_id": "spider_task:xxx"}}' \
+    --no-seed
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from redis import Redis
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import RedisConfig, PROCESS_STATUS_PENDING  # noqa: E402
+
+# 默认压测使用的任务
+benchmark_task_key: str = "spider_task:benchmark"
+
+thread_local = threading.local()
+
+
+def seed_benchmark_task(expire_seconds: int = 3600):
+    """
+    在 Redis 中写入压测使用的任务状态
+    """
+    Redis(
+        host=RedisConfig["host"],
+        port=RedisConfig["port"],
+        password=RedisConfig["password"],
+        db=RedisConfig["database"],
+    ).set(benchmark_task_key, str(PROCESS_STATUS_PENDING), ex=expire_seconds)
+
+
+def get_session() -> requests.Session:
+    # 每个线程复用一个 Session(长连接)
+    session = getattr(thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        thread_local.session = session
+    return session
+
+
+def send_request(url: str, payload: Dict) -> Tuple[float, bool]:
+    start_time = time.perf_counter()
+    try:
+        resp = get_session().post(url=url, json=payload, timeout=30)
+        is_success = resp.status_code == 200
+    except requests.RequestException:
+        is_success = False
+    return time.perf_counter() - start_time, is_success
+
+
+def percentile(sorted_list: List[float], percent: float) -> float:
+    if len(sorted_list) == 0:
+        return 0.0
+    index = min(len(sorted_list) - 1, int(len(sorted_list) * percent / 100))
+    return sorted_list[index]
+
+
+def run_benchmark(url: str, payload: Dict, concurrency: int, total: int) -> Dict:
+    """
+    :param url: 接口地址
+    :param payload: 请求体
+    :param concurrency: 并发数
+    :param total: 请求总数
+    """
+    # 预热，建立连接
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: send_request(url, payload), range(concurrency)))
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: send_request(url, payload), range(total)))
+    total_seconds = time.perf_counter() - start_time
+
+    latency_list = sorted(latency for latency, _ in results)
+    error_count = sum(1 for _, is_success in results if not is_success)
+    return {
+        "requests": total,
+        "errors": error_count,
+        "seconds": round(total_seconds, 3),
+        "rps": round(total / total_seconds, 2),
+        "p50(ms)": round(percentile(latency_list, 50) * 1000, 2),
+        "p90(ms)": round(percentile(latency_list, 90) * 1000, 2),
+        "p99(ms)": round(percentile(latency_list, 99) * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BlogsCrawler API 压测")
+    parser.add_argument("--host", default="http://127.0.0.1:12580")
+    parser.add_argument("--path", default="/api/v1/task/checkTaskStatus")
+    parser.add_argument(
+        "--payload",
+        default=json.dumps(
+            {"taskType": "check", "taskArgs": {"job_id": benchmark_task_key}}
+        ),
+        help="JSON 格式的请求体",
+    )
+    parser.add_argument(
+        "--no-seed", action="store_true", help="不在 Redis 中写入压测使用的任务"
+    )
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=10000)
+    args = parser.parse_args()
+
+    if not args.no_seed:
+        seed_benchmark_task()
+    report = run_benchmark(
+        url=f"{args.host}{args.path}",
+        payload=json.loads(args.payload),
+        concurrency=args.concurrency,
+        total=args.requests,
+    )
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,119 @@
+"""
+验证码模型压测脚本
+每个模型在独立的子进程中加载，统计加载耗时、逐张识别的 p50/p90/p99 延迟、
+序列准确率以及峰值内存。数据集图片命名格式为 <idx>_<code>.png
+
+例：
+python benchmark/captcha_benchmark.py --image-dir ./imgs/val/ --variants frozen int8
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List
+
+project_dir: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 模型名称与 captcha.zhihu_captcha_predictor.captcha_variant_dict 一致
+variant_list: List[str] = ["checkpoint", "frozen", "int8"]
+
+probe_code: str = """
+import sys
+import time
+import json
+import resource
+
+from PIL import Image
+
+from captcha.zhihu_captcha_charset import list_labeled_images
+from captcha.zhihu_captcha_predictor import get_captcha_predictor
+
+image_list = list_labeled_images(image_dir="{image_dir}")[:{limit}]
+img_list = [Image.open(path).copy() for path, _ in image_list]
+
+start_time = time.perf_counter()
+predictor = get_captcha_predictor(variant="{variant}")
+load_seconds = time.perf_counter() - start_time
+
+latency_list = []
+correct = 0
+for (_, code), img in zip(image_list, img_list):
+    start_time = time.perf_counter()
+    correct += int(predictor.predict(img) == code)
+    latency_list.append(time.perf_counter() - start_time)
+
+max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    max_rss = max_rss / 1024
+print(json.dumps({{
+    "loadSeconds": load_seconds,
+    "latencyList": latency_list,
+    "correct": correct,
+    "maxRssMB": max_rss / 1024,
+}}))
+"""
+
+
+def percentile(data: List[float], percent: float) -> float:
+    if len(data) == 0:
+        return 0.0
+    data = sorted(data)
+    index = min(int(len(data) * percent / 100), len(data) - 1)
+    return data[index]
+
+
+def measure_variant(variant: str, image_dir: str, limit: int) -> Dict:
+    """
+    :param variant: 模型名称
+    :param image_dir: 数据集目录
+    :param limit: 最多识别的图片数
+    """
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            probe_code.format(
+                variant=variant,
+                image_dir=os.path.abspath(image_dir),
+                limit=limit,
+            ),
+        ],
+        cwd=project_dir,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result: Dict = json.loads(output.strip().splitlines()[-1])
+    latency_list: List[float] = result["latencyList"]
+    total: int = max(len(latency_list), 1)
+    return {
+        "variant": variant,
+        "images": len(latency_list),
+        "accuracy": round(result["correct"] / total, 4),
+        "loadSeconds": round(result["loadSeconds"], 3),
+        "p50Ms": round(percentile(latency_list, 50) * 1000, 2),
+        "p90Ms": round(percentile(latency_list, 90) * 1000, 2),
+        "p99Ms": round(percentile(latency_list, 99) * 1000, 2),
+        "maxRssMB": round(result["maxRssMB"], 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BlogsCrawler 验证码模型压测")
+    parser.add_argument("--image-dir", required=True)
+    parser.add_argument(
+        "--variants",
+        nargs="+",
+        default=variant_list,
+        choices=variant_list,
+    )
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    report = [
+        measure_variant(variant=variant, image_dir=args.image_dir, limit=args.limit)
+        for variant in args.variants
+    ]
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,96 @@
+"""
+验证码预处理压测脚本
+对比逐张处理(Base64 -> Pillow -> np.array -> reshape -> np.array([im]) 再拼接批次)
+与直接写入预分配缓冲区的 CaptchaInputBuffer，输出每张图片的平均耗时(微秒)
+
+例：
+python benchmark/captcha_preprocess_benchmark.py --count 2000 --batch-size 32
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+from io import BytesIO
+from typing import Dict, List, Callable
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from captcha.generate_zhihu_captcha import CaptchaGenerator
+from captcha.zhihu_captcha_preprocess import CaptchaInputBuffer
+from captcha.zhihu_captcha_charset import (
+    image_width,
+    image_height,
+    image_channel,
+    max_stepsize,
+)
+
+
+def legacy_preprocess(img_base64_list: List[str]):
+    """
+    原来的预处理流程
+    """
+    image_list = []
+    for img_base64 in img_base64_list:
+        img = Image.open(BytesIO(base64.b64decode(img_base64)))
+        im = np.array(img.convert("L")).astype(np.float32) / 255.0
+        im = np.reshape(im, [image_height, image_width, image_channel])
+        image_list.append(np.asarray(np.array([im]))[0])
+    seq_len = np.asarray([max_stepsize for _ in range(len(image_list))])
+    return np.stack(image_list), seq_len
+
+
+def measure(func: Callable, batch_list: List[List[str]], rounds: int) -> float:
+    """
+    :return: 每张图片的平均耗时(微秒)
+    """
+    count = sum(len(batch) for batch in batch_list)
+    best = float("inf")
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        for batch in batch_list:
+            func(batch)
+        best = min(best, time.perf_counter() - start_time)
+    return best / count * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="验证码预处理压测")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    generator = CaptchaGenerator(seed=0)
+    img_base64_list: List[str] = []
+    for _ in range(args.count):
+        img, _ = generator.generate()
+        output = BytesIO()
+        img.save(output, format="PNG")
+        img_base64_list.append(base64.b64encode(output.getvalue()).decode())
+    batch_list = [
+        img_base64_list[start : start + args.batch_size]
+        for start in range(0, args.count, args.batch_size)
+    ]
+
+    input_buffer = CaptchaInputBuffer(capacity=args.batch_size)
+    legacy_inputs, _ = legacy_preprocess(batch_list[0])
+    buffer_inputs, _ = input_buffer.load_base64(batch_list[0])
+    assert np.array_equal(legacy_inputs, buffer_inputs)
+
+    report: Dict = {
+        "count": args.count,
+        "batchSize": args.batch_size,
+        "legacyMicrosecondsPerImage": round(
+            measure(legacy_preprocess, batch_list, args.rounds), 1
+        ),
+        "bufferMicrosecondsPerImage": round(
+            measure(input_buffer.load_base64, batch_list, args.rounds), 1
+        ),
+    }
+    print(json.dumps(report, indent=2))
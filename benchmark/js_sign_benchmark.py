@@ -0,0 +1,69 @@
+"""
+JS 签名压测脚本
+对比 execjs(每次调用启动一个 node 进程)、常驻的 node 进程池调用 zhihu_encrypt_js_code 的
+encrypt 函数以及 Python 实现 zhihu_encrypt 的吞吐量和 p50/p99 延迟，同时校验三者的结果一致
+
+例：
+python benchmark/js_sign_benchmark.py --requests 1000 --concurrency 4
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from typing import Dict, List, Callable
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.js_worker_utils import JSWorkerPool
+from utils.zhihu_encrypt_utils import zhihu_encrypt
+from utils.js_utils import get_js_context, zhihu_encrypt_js_code
+
+
+def run(func: Callable, requests: int, concurrency: int) -> Dict:
+    def timed_call(index: int) -> float:
+        start_time = time.perf_counter()
+        func(f"username=user{index}&password=pass{index}&lang=en")
+        return time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latency_list: List[float] = sorted(executor.map(timed_call, range(requests)))
+    elapsed = time.perf_counter() - start_time
+    return {
+        "requests": requests,
+        "signaturesPerSecond": round(requests / elapsed, 1),
+        "p50Ms": round(statistics.median(latency_list) * 1000, 3),
+        "p99Ms": round(latency_list[int(len(latency_list) * 0.99) - 1] * 1000, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JS 签名压测")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--execjs-requests", type=int, default=50)
+    parser.add_argument("--python-requests", type=int, default=100000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    js_context = get_js_context(js_str=zhihu_encrypt_js_code)
+    pool = JSWorkerPool()
+
+    def execjs_encrypt(data: str) -> str:
+        return js_context.call("encrypt", data)
+
+    def pool_encrypt(data: str) -> str:
+        return pool.call(zhihu_encrypt_js_code, "encrypt", data)
+
+    assert (
+        execjs_encrypt("a=1&b=2") == pool_encrypt("a=1&b=2") == zhihu_encrypt("a=1&b=2")
+    )
+    report: Dict = {
+        "execjs": run(execjs_encrypt, args.execjs_requests, args.concurrency),
+        "workerPool": run(pool_encrypt, args.requests, args.concurrency),
+        "python": run(zhihu_encrypt, args.python_requests, 1),
+    }
+    print(json.dumps(report, indent=2))
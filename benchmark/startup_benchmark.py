@@ -0,0 +1,84 @@
+"""
+启动耗时压测脚本
+在独立的子进程中导入模块，统计导入耗时、峰值内存以及是否加载了 TensorFlow
+
+例：
+python benchmark/startup_benchmark.py --modules api_server call_spider --repeat 5
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List
+
+project_dir: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+probe_code: str = """
+import sys
+import time
+import json
+import resource
+
+start_time = time.perf_counter()
+__import__("{module}")
+elapsed = time.perf_counter() - start_time
+max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    max_rss = max_rss / 1024
+print(json.dumps({{
+    "seconds": elapsed,
+    "maxRssMB": max_rss / 1024,
+    "tensorflowLoaded": "tensorflow" in sys.modules,
+}}))
+"""
+
+
+def measure_module(module: str, repeat: int) -> Dict:
+    """
+    :param module: 模块名称
+    :param repeat: 重复次数(每次都是新的进程)
+    """
+    results: List[Dict] = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", probe_code.format(module=module)],
+            cwd=project_dir,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    seconds_list = [result["seconds"] for result in results]
+    return {
+        "module": module,
+        "repeat": repeat,
+        "medianSeconds": round(statistics.median(seconds_list), 3),
+        "maxSeconds": round(max(seconds_list), 3),
+        "maxRssMB": round(max(result["maxRssMB"] for result in results), 1),
+        "tensorflowLoaded": any(result["tensorflowLoaded"] for result in results),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BlogsCrawler 启动耗时压测")
+    parser.add_argument(
+        "--modules",
+        nargs="+",
+        default=[
+            "api_server",
+            "call_spider",
+            "spiders.csdn_spider",
+            "spiders.zhihu_spider",
+        ],
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    report = [
+        measure_module(module=module, repeat=args.repeat) for module in args.modules
+    ]
+    print(json.dumps(report, indent=2))
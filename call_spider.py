@@ -1,18 +1,48 @@
+import json
 import time
-from typing import Dict
-from multiprocessing import Queue
+import signal
+import threading
+from typing import Dict, Optional
 
+from utils.metrics_dir_utils import init_metrics_multiproc_dir
+
+# 多进程指标目录需要在导入 utils.metrics_utils 之前设置，启动时清空这个容器上一次启动留下的指标文件
+if __name__ == "__main__":
+    init_metrics_multiproc_dir(clear=True)
+
+from spiders import BaseSpider
 from utils.logger_utils import LogManager
 from spiders.csdn_spider import CSDNSpider
 from spiders.zhihu_spider import ZhiHuSpider
 from spiders.juejin_spider import JuejinSpider
 from spiders.segmentfault_spider import SegmentfaultSpider
-from utils.async_task_utils import MultiProcessQueue
+from utils.cookie_sweeper_utils import CookieSweeper
 from pipeline.redis_pipeline import RedisPipelineHandler
+from utils.metrics_utils import TASK_QUEUE_WAIT
+from utils.exception_utils import TaskCancelException, TaskInterruptException
+from utils.async_task_utils import (
+    AsyncTaskHandler,
+    AsyncThreadTask,
+    AsyncSchedulerTask,
+)
+from utils.task_control_utils import (
+    get_cancel_key,
+    get_credential_key,
+    split_task_credential,
+    worker_drain_event,
+    worker_interrupt_event,
+)
 from config import (
     LOG_LEVEL,
+    TASK_QUEUE_REDIS_KEY,
+    TASK_QUEUE_POP_TIMEOUT_SECONDS,
+    TASK_CREDENTIAL_EXPIRE_SECONDS,
+    TASK_DRAIN_TIMEOUT_SECONDS,
+    COOKIE_SWEEP_INTERVAL_SECONDS,
+    PROCESS_STATUS_EXIT,
     PROCESS_STATUS_FAIL,
     PROCESS_STATUS_START,
+    PROCESS_STATUS_PENDING,
     PROCESS_STATUS_RUNNING,
 )
 
@@ -20,67 +50,110 @@ logger = LogManager(__name__).get_logger_and_add_handlers(
     formatter_template=5, log_level_int=LOG_LEVEL
 )
 
-# 多进程任务队列
-message_queue: Queue = MultiProcessQueue()
 # Redis
 redis_task_key_prefix: str = "spider_task"
 redis_handler = RedisPipelineHandler()
+# 每个平台一个 Cookie 巡检
+cookie_sweeper_dict: Dict = {
+    "csdn": CookieSweeper(platform="csdn", probe=CSDNSpider.probe_cookies),
+    "juejin": CookieSweeper(platform="juejin", probe=JuejinSpider.probe_cookies),
+    "segmentfault": CookieSweeper(
+        platform="segmentfault", probe=SegmentfaultSpider.probe_cookies
+    ),
+    "zhihu": CookieSweeper(platform="zhihu", probe=ZhiHuSpider.probe_cookies),
+}
+
+
+def _run_spider(spider: BaseSpider, task_dict: Dict):
+    task_redis_key: str = f"{redis_task_key_prefix}:{task_dict['taskId']}"
+    try:
+        spider.login()
+    except TaskInterruptException:
+        # 爬虫进程退出：保存已经获取到的数据，任务放回队列由其他爬虫进程重新执行
+        spider.save_partial_data(is_interrupted=True)
+        # 登录凭据重新写入带过期时间的 key，不写入任务队列
+        task_message, credential = split_task_credential(task_dict=task_dict)
+        redis_handler.insert_keys_and_push_list(
+            mapping={task_redis_key: str(PROCESS_STATUS_PENDING)},
+            list_key=TASK_QUEUE_REDIS_KEY,
+            values=[task_message],
+            hash_mapping={get_credential_key(task_id=task_dict["taskId"]): credential},
+            hash_expire_seconds=TASK_CREDENTIAL_EXPIRE_SECONDS,
+        )
+        logger.info(f"任务ID: {task_dict['taskId']}, 已中断并放回任务队列!")
+        return
+    except TaskCancelException:
+        # 任务被取消：保存已经获取到的数据
+        spider.save_partial_data()
+        redis_handler.insert_key(key=task_redis_key, value=str(PROCESS_STATUS_EXIT))
+        logger.info(f"任务ID: {task_dict['taskId']}, 已取消!")
+        return
+    finally:
+        # 写入任务的追踪数据
+        spider.tracer.finish()
+    redis_handler.insert_key(key=task_redis_key, value=str(PROCESS_STATUS_RUNNING))
 
 
-def _call_juejin_spider(task_id: str, username: str, password: str):
-    task_redis_key: str = f"{redis_task_key_prefix}:{task_id}"
-    t = JuejinSpider(task_id=task_id, username=username, password=password)
-    t.login()
-    redis_handler.insert_key(key=task_redis_key, value=str(PROCESS_STATUS_RUNNING))
+def _call_juejin_spider(task_dict: Dict):
+    t = JuejinSpider(
+        task_id=task_dict["taskId"],
+        username=task_dict["username"],
+        password=task_dict["password"],
+    )
+    _run_spider(spider=t, task_dict=task_dict)
 
 
-def _call_zhihu_spider(task_id: str, username: str, password: str):
-    task_redis_key: str = f"{redis_task_key_prefix}:{task_id}"
-    zhihu = ZhiHuSpider(task_id=task_id, username=username, password=password)
-    zhihu.login()
-    redis_handler.insert_key(key=task_redis_key, value=str(PROCESS_STATUS_RUNNING))
+def _call_zhihu_spider(task_dict: Dict):
+    zhihu = ZhiHuSpider(
+        task_id=task_dict["taskId"],
+        username=task_dict["username"],
+        password=task_dict["password"],
+    )
+    _run_spider(spider=zhihu, task_dict=task_dict)
 
 
-def _call_segmentfault_spider(task_id: str, username: str, password: str):
-    task_redis_key: str = f"{redis_task_key_prefix}:{task_id}"
-    seg = SegmentfaultSpider(task_id=task_id, username=username, password=password)
-    seg.login()
-    redis_handler.insert_key(key=task_redis_key, value=str(PROCESS_STATUS_RUNNING))
+def _call_segmentfault_spider(task_dict: Dict):
+    seg = SegmentfaultSpider(
+        task_id=task_dict["taskId"],
+        username=task_dict["username"],
+        password=task_dict["password"],
+    )
+    _run_spider(spider=seg, task_dict=task_dict)
 
 
-def _call_csdn_spider(task_id: str, username: str, password: str):
-    task_redis_key: str = f"{redis_task_key_prefix}:{task_id}"
-    csdn = CSDNSpider(task_id=task_id, username=username, password=password)
-    csdn.login()
-    redis_handler.insert_key(key=task_redis_key, value=str(PROCESS_STATUS_RUNNING))
+def _call_csdn_spider(task_dict: Dict):
+    csdn = CSDNSpider(
+        task_id=task_dict["taskId"],
+        username=task_dict["username"],
+        password=task_dict["password"],
+    )
+    _run_spider(spider=csdn, task_dict=task_dict)
 
 
 def task_parser(task_dict: Dict):
     task_id: str = task_dict["taskId"]
     spider_name: str = task_dict["spider"]
-    username: str = task_dict["username"]
-    password: str = task_dict["password"]
 
     if spider_name == "csdn":
         redis_handler.insert_key(
             key=f"{redis_task_key_prefix}:{task_id}", value=str(PROCESS_STATUS_START)
         )
-        _call_csdn_spider(task_id=task_id, username=username, password=password)
+        _call_csdn_spider(task_dict=task_dict)
     elif spider_name == "zhihu":
         redis_handler.insert_key(
             key=f"{redis_task_key_prefix}:{task_id}", value=str(PROCESS_STATUS_START)
         )
-        _call_zhihu_spider(task_id=task_id, username=username, password=password)
+        _call_zhihu_spider(task_dict=task_dict)
     elif spider_name == "juejin":
         redis_handler.insert_key(
             key=f"{redis_task_key_prefix}:{task_id}", value=str(PROCESS_STATUS_START)
         )
-        _call_juejin_spider(task_id=task_id, username=username, password=password)
+        _call_juejin_spider(task_dict=task_dict)
     elif spider_name == "segmentfault":
         redis_handler.insert_key(
             key=f"{redis_task_key_prefix}:{task_id}", value=str(PROCESS_STATUS_START)
         )
-        _call_segmentfault_spider(task_id=task_id, username=username, password=password)
+        _call_segmentfault_spider(task_dict=task_dict)
     else:
         redis_handler.insert_key(
             key=f"{redis_task_key_prefix}:{task_id}", value=str(PROCESS_STATUS_FAIL)
@@ -88,9 +161,89 @@ def task_parser(task_dict: Dict):
         logger.error(f"任务ID: {task_id}, 创建失败! 错误原因: 爬虫名称错误!")
 
 
+def start_cookie_sweepers():
+    """
+    为每个平台注册一个 Cookie 巡检的定时任务
+    """
+    async_task = AsyncTaskHandler()
+    for platform, cookie_sweeper in cookie_sweeper_dict.items():
+        async_task.make_async_scheduler_task_by_interval(
+            job_id=f"cookie_sweeper:{platform}",
+            interval_seconds=COOKIE_SWEEP_INTERVAL_SECONDS,
+            callback=cookie_sweeper.sweep,
+        )
+
+
+def drain_signal_handler(signum, frame):
+    """
+    收到退出信号(SIGTERM/SIGINT)后不再接收新任务，等待当前任务结束
+    超过 TASK_DRAIN_TIMEOUT_SECONDS 或者再次收到信号时，在下一次分页时中断当前任务并放回队列
+    """
+    if worker_drain_event.is_set():
+        worker_interrupt_event.set()
+        return
+    logger.info(f"收到退出信号: {signum}, 停止接收新任务，等待当前任务结束...")
+    worker_drain_event.set()
+    drain_timer = threading.Timer(
+        interval=TASK_DRAIN_TIMEOUT_SECONDS, function=worker_interrupt_event.set
+    )
+    drain_timer.daemon = True
+    drain_timer.start()
+
+
 def spider_task_receiver():
-    while True:
-        task = message_queue.get()
-        logger.info(f"接收到的任务数据: {task}")
-        task_parser(task_dict=task)
-        time.sleep(1)
+    """
+    从 Redis 任务队列中读取任务，可以启动多个爬虫进程共同消费
+    """
+    start_cookie_sweepers()
+    while worker_drain_event.is_set() is not True:
+        task = redis_handler.pop_list_blocking(
+            key=TASK_QUEUE_REDIS_KEY, timeout=TASK_QUEUE_POP_TIMEOUT_SECONDS
+        )
+        if task is None:
+            continue
+        task_dict: Dict = json.loads(task)
+        logger.info(f"接收到的任务 ID: {task_dict['taskId']}")
+        if "enqueueTime" in task_dict:
+            TASK_QUEUE_WAIT.observe(time.time() - task_dict["enqueueTime"])
+        # 读取并删除登录凭据，取消的任务同样需要删除
+        credential: Optional[Dict] = redis_handler.pop_hash(
+            key=get_credential_key(task_id=task_dict["taskId"])
+        )
+        # 在队列中等待时已经被取消的任务不再执行
+        if redis_handler.find_key(key=get_cancel_key(task_id=task_dict["taskId"])):
+            redis_handler.insert_key(
+                key=f"{redis_task_key_prefix}:{task_dict['taskId']}",
+                value=str(PROCESS_STATUS_EXIT),
+            )
+            logger.info(f"任务ID: {task_dict['taskId']}, 已取消!")
+            continue
+        if not credential:
+            redis_handler.insert_key(
+                key=f"{redis_task_key_prefix}:{task_dict['taskId']}",
+                value=str(PROCESS_STATUS_FAIL),
+            )
+            logger.error(
+                f"任务ID: {task_dict['taskId']}, 执行失败! 错误原因: 登录凭据不存在或者已经过期!"
+            )
+            continue
+        task_dict.update(credential)
+        try:
+            task_parser(task_dict=task_dict)
+        except Exception as err:
+            redis_handler.insert_key(
+                key=f"{redis_task_key_prefix}:{task_dict['taskId']}",
+                value=str(PROCESS_STATUS_FAIL),
+            )
+            logger.error(f"任务ID: {task_dict['taskId']}, 执行失败! 错误原因: {err}")
+
+    # 等待写入数据的线程以及正在执行的巡检任务结束
+    AsyncThreadTask().shutdown(wait=True)
+    AsyncSchedulerTask().shutdown(wait=True)
+    logger.info("爬虫进程退出!")
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, drain_signal_handler)
+    signal.signal(signal.SIGINT, drain_signal_handler)
+    spider_task_receiver()
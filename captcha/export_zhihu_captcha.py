@@ -0,0 +1,128 @@
+"""
+把知乎验证码模型的推理部分导出为冻结图(权重固化为常量)
+导出后可以用 captcha.zhihu_captcha_lite.ZhihuCaptchaLite 加载，不再需要训练图以及 checkpoint
+
+例：
+python -m captcha.export_zhihu_captcha --verify-dir ./imgs/val/
+"""
+
+import os
+import json
+import argparse
+from typing import Dict, List
+
+import tensorflow as tf
+from PIL import Image
+
+from captcha import zhihu_ocr_model as ocr_model
+from captcha.zhihu_captcha import checkpoint_dir
+from captcha.zhihu_captcha_lite import frozen_graph_path
+from captcha.zhihu_captcha_charset import list_labeled_images
+
+
+def export_frozen_graph(checkpoint: str, output_path: str) -> Dict:
+    """
+    在独立的计算图中只构建推理部分，从 checkpoint 恢复权重后固化成常量
+    :param checkpoint: checkpoint 目录
+    :param output_path: 冻结图的保存路径
+    :return: 导出信息
+    """
+    graph = tf.Graph()
+    with graph.as_default():
+        model = ocr_model.LSTMOCR("infer")
+        model.build_infer_graph()
+        with tf.compat.v1.Session(graph=graph) as sess:
+            ckpt = tf.train.latest_checkpoint(checkpoint)
+            if ckpt is None:
+                raise FileNotFoundError(f"{checkpoint} 目录下没有可用的 checkpoint")
+            saver = tf.compat.v1.train.Saver(tf.compat.v1.global_variables())
+            saver.restore(sess, ckpt)
+            frozen_graph_def = tf.compat.v1.graph_util.convert_variables_to_constants(
+                sess,
+                graph.as_graph_def(),
+                [ocr_model.dense_decoded_node_name],
+            )
+    # 去掉训练相关以及与输出无关的节点
+    frozen_graph_def = tf.compat.v1.graph_util.extract_sub_graph(
+        frozen_graph_def, [ocr_model.dense_decoded_node_name]
+    )
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(frozen_graph_def.SerializeToString())
+    return {
+        "checkpoint": ckpt,
+        "output": output_path,
+        "nodes": len(frozen_graph_def.node),
+        "bytes": os.path.getsize(output_path),
+    }
+
+
+def verify_frozen_graph(graph_path: str, image_dir: str, batch_size: int = 64) -> Dict:
+    """
+    在同一批图片上对比 checkpoint 与冻结图的识别结果
+    :param graph_path: 冻结图路径
+    :param image_dir: 数据集目录，图片命名格式为 <idx>_<code>.png
+    :param batch_size: 批次大小
+    :return: 对比结果
+    """
+    from captcha.zhihu_captcha import ZhihuCaptcha
+    from captcha.zhihu_captcha_lite import ZhihuCaptchaLite
+
+    ZhihuCaptchaLite.graph_path = graph_path
+    image_list = list_labeled_images(image_dir=image_dir)
+    checkpoint_model = ZhihuCaptcha()
+    frozen_model = ZhihuCaptchaLite()
+
+    mismatch_list: List[Dict] = []
+    checkpoint_correct: int = 0
+    frozen_correct: int = 0
+    for start in range(0, len(image_list), batch_size):
+        batch = image_list[start : start + batch_size]
+        img_list = [Image.open(path) for path, _ in batch]
+        checkpoint_codes = checkpoint_model.predict_batch(img_list=img_list)
+        frozen_codes = frozen_model.predict_batch(img_list=img_list)
+        for (path, code), checkpoint_code, frozen_code in zip(
+            batch, checkpoint_codes, frozen_codes
+        ):
+            checkpoint_correct += int(checkpoint_code == code)
+            frozen_correct += int(frozen_code == code)
+            if checkpoint_code != frozen_code:
+                mismatch_list.append(
+                    {
+                        "image": path,
+                        "checkpoint": checkpoint_code,
+                        "frozen": frozen_code,
+                    }
+                )
+
+    total: int = max(len(image_list), 1)
+    return {
+        "images": len(image_list),
+        "checkpointAccuracy": round(checkpoint_correct / total, 4),
+        "frozenAccuracy": round(frozen_correct / total, 4),
+        "mismatches": mismatch_list,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出知乎验证码模型的冻结图")
+    parser.add_argument("--checkpoint-dir", default=checkpoint_dir)
+    parser.add_argument("--output", default=frozen_graph_path)
+    parser.add_argument(
+        "--verify-dir", default=None, help="导出后在该目录的图片上对比识别结果"
+    )
+    args = parser.parse_args()
+
+    report: Dict = {
+        "export": export_frozen_graph(
+            checkpoint=args.checkpoint_dir, output_path=args.output
+        )
+    }
+    if args.verify_dir is not None:
+        report["verify"] = verify_frozen_graph(
+            graph_path=args.output, image_dir=args.verify_dir
+        )
+    print(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,133 @@
+"""
+知乎验证码模型的训练后量化(INT8 权重量化)
+把冻结图中的卷积核以及全连接权重按输出通道对称量化为 INT8，推理时反量化回 float32，
+其他节点保持不变，输入输出节点名称与冻结图一致
+
+例：
+python -m captcha.quantize_zhihu_captcha
+python benchmark/captcha_benchmark.py --image-dir ./imgs/val/ --variants frozen int8
+"""
+
+import os
+import json
+import argparse
+from typing import Dict, Tuple
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.python.framework import tensor_util
+
+from captcha.zhihu_captcha_lite import frozen_graph_path, int8_graph_path
+
+# 元素个数小于该值的常量(偏置、批标准化参数等)不量化
+quantize_min_elements: int = 1024
+
+
+def quantize_weight(weight: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按最后一个维度(输出通道)做对称量化
+    :param weight: float32 权重
+    :return: (int8 权重, 每个输出通道的缩放系数)
+    """
+    reduce_axis = tuple(range(weight.ndim - 1))
+    scale = np.max(np.abs(weight), axis=reduce_axis) / 127.0
+    scale = np.where(scale == 0, 1.0, scale).astype(np.float32)
+    quantized = np.clip(np.round(weight / scale), -127, 127).astype(np.int8)
+    return quantized, scale
+
+
+def _const_node(name: str, value: np.ndarray, dtype) -> tf.compat.v1.NodeDef:
+    node = tf.compat.v1.NodeDef(name=name, op="Const")
+    node.attr["dtype"].type = dtype.as_datatype_enum
+    node.attr["value"].tensor.CopyFrom(
+        tf.compat.v1.make_tensor_proto(value, dtype=dtype, shape=value.shape)
+    )
+    return node
+
+
+def quantize_graph_def(
+    graph_def: tf.compat.v1.GraphDef,
+) -> Tuple[tf.compat.v1.GraphDef, Dict]:
+    """
+    量化冻结图中的权重
+    原来的常量节点替换成 Mul(Cast(int8 权重), 缩放系数)，节点名称不变，下游节点不需要修改
+    :param graph_def: 冻结图
+    :return: (量化后的计算图, 量化信息)
+    """
+    quantized_graph_def = tf.compat.v1.GraphDef()
+    quantized_graph_def.versions.CopyFrom(graph_def.versions)
+    quantized_count: int = 0
+    float_bytes: int = 0
+    int8_bytes: int = 0
+    for node in graph_def.node:
+        if node.op != "Const" or node.attr["dtype"].type != tf.float32.as_datatype_enum:
+            quantized_graph_def.node.extend([node])
+            continue
+        weight = tensor_util.MakeNdarray(node.attr["value"].tensor)
+        if weight.ndim < 2 or weight.size < quantize_min_elements:
+            quantized_graph_def.node.extend([node])
+            continue
+
+        quantized, scale = quantize_weight(weight=weight)
+        quantized_node = _const_node(f"{node.name}/int8", quantized, tf.int8)
+        scale_node = _const_node(f"{node.name}/scale", scale, tf.float32)
+        cast_node = tf.compat.v1.NodeDef(
+            name=f"{node.name}/dequantize", op="Cast", input=[quantized_node.name]
+        )
+        cast_node.attr["SrcT"].type = tf.int8.as_datatype_enum
+        cast_node.attr["DstT"].type = tf.float32.as_datatype_enum
+        mul_node = tf.compat.v1.NodeDef(
+            name=node.name, op="Mul", input=[cast_node.name, scale_node.name]
+        )
+        mul_node.attr["T"].type = tf.float32.as_datatype_enum
+        quantized_graph_def.node.extend(
+            [quantized_node, scale_node, cast_node, mul_node]
+        )
+
+        quantized_count += 1
+        float_bytes += weight.nbytes
+        int8_bytes += quantized.nbytes + scale.nbytes
+    return quantized_graph_def, {
+        "quantizedNodes": quantized_count,
+        "floatWeightBytes": float_bytes,
+        "int8WeightBytes": int8_bytes,
+    }
+
+
+def quantize_frozen_graph(input_path: str, output_path: str) -> Dict:
+    """
+    :param input_path: 冻结图路径
+    :param output_path: 量化后的保存路径
+    :return: 量化信息
+    """
+    graph_def = tf.compat.v1.GraphDef()
+    with open(input_path, "rb") as f:
+        graph_def.ParseFromString(f.read())
+    quantized_graph_def, report = quantize_graph_def(graph_def=graph_def)
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(quantized_graph_def.SerializeToString())
+    report.update(
+        input=input_path,
+        output=output_path,
+        inputBytes=os.path.getsize(input_path),
+        outputBytes=os.path.getsize(output_path),
+    )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="知乎验证码模型 INT8 权重量化")
+    parser.add_argument("--input", default=frozen_graph_path)
+    parser.add_argument("--output", default=int8_graph_path)
+    args = parser.parse_args()
+
+    print(
+        json.dumps(
+            quantize_frozen_graph(input_path=args.input, output_path=args.output),
+            indent=2,
+        )
+    )
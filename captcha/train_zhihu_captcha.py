@@ -0,0 +1,212 @@
+"""
+知乎验证码模型训练
+图片目录会先用多进程解码打包成内存映射数据集(已经打包过的直接复用)，训练时后台线程预取批次，
+定期保存 checkpoint 以及在验证集上计算序列准确率，日志中输出每秒训练的图片数
+
+例：
+python -m captcha.train_zhihu_captcha --train ./imgs/train/ --val ./imgs/val/
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, Optional
+
+import tensorflow as tf
+
+from config import LOG_LEVEL
+from utils.logger_utils import LogManager
+from captcha import zhihu_ocr_model as ocr_model
+from captcha import zhihu_captcha_utils as utils
+from captcha.zhihu_captcha_dataset import (
+    PackedDataIterator,
+    get_dataset_paths,
+    pack_image_dir,
+)
+
+logger = LogManager(__name__).get_logger_and_add_handlers(
+    formatter_template=5, log_level_int=LOG_LEVEL
+)
+
+default_checkpoint_dir: str = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "checkpoint"
+)
+checkpoint_name: str = "ocr-model"
+
+
+def prepare_dataset(path: str, workers: int, repack: bool = False) -> str:
+    """
+    :param path: 图片目录或者数据集路径前缀
+    :param workers: 解码图片的进程数
+    :param repack: 是否重新打包
+    :return: 数据集路径前缀
+    """
+    if not os.path.isdir(path):
+        return path
+    prefix: str = path.rstrip(os.sep)
+    images_path, _ = get_dataset_paths(prefix=prefix)
+    if repack or not os.path.exists(images_path):
+        start_time = time.perf_counter()
+        report = pack_image_dir(image_dir=path, prefix=prefix, workers=workers)
+        logger.info(
+            f"数据集打包完成: {prefix}, 样本数: {report['size']}, "
+            f"耗时: {time.perf_counter() - start_time:.1f}s"
+        )
+    return prefix
+
+
+def validate(sess, model: ocr_model.LSTMOCR, val_iterator: PackedDataIterator):
+    """
+    在验证集上计算序列准确率
+    :return: 准确率
+    """
+    correct: float = 0.0
+    for batch_inputs, batch_seq_len, batch_codes in val_iterator:
+        feed: Dict = {model.inputs: batch_inputs, model.seq_len: batch_seq_len}
+        dense_decoded = sess.run(model.dense_decoded, feed)
+        accuracy = utils.accuracy_calculation(
+            batch_codes, dense_decoded, ignore_value=-1
+        )
+        correct += accuracy * len(batch_codes)
+    return correct / max(val_iterator.size, 1)
+
+
+def train(
+    train_prefix: str,
+    val_prefix: Optional[str],
+    checkpoint_dir: str,
+    *,
+    num_epochs: int,
+    batch_size: int,
+    prefetch: int,
+    restore: bool,
+    log_steps: int,
+) -> Dict:
+    """
+    :param train_prefix: 训练集路径前缀
+    :param val_prefix: 验证集路径前缀，为 None 时不验证
+    :param checkpoint_dir: checkpoint 目录
+    :param num_epochs: 训练的 epoch 数
+    :param batch_size: 批次大小
+    :param prefetch: 预取的批次数
+    :param restore: 是否从最新的 checkpoint 继续训练
+    :param log_steps: 每隔多少步输出一次日志
+    :return: 训练信息
+    """
+    train_iterator = PackedDataIterator(
+        prefix=train_prefix, batch_size=batch_size, prefetch=prefetch, drop_last=True
+    )
+    val_iterator: Optional[PackedDataIterator] = None
+    if val_prefix is not None:
+        val_iterator = PackedDataIterator(
+            prefix=val_prefix, batch_size=batch_size, shuffle=False, prefetch=prefetch
+        )
+
+    model = ocr_model.LSTMOCR("train")
+    model.build_graph()
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    checkpoint_path: str = os.path.join(checkpoint_dir, checkpoint_name)
+
+    config = tf.compat.v1.ConfigProto(allow_soft_placement=True)
+    best_accuracy: float = 0.0
+    total_images: int = 0
+    total_seconds: float = 0.0
+    step: int = 0
+    with tf.compat.v1.Session(config=config) as sess:
+        sess.run(tf.compat.v1.global_variables_initializer())
+        saver = tf.compat.v1.train.Saver(
+            tf.compat.v1.global_variables(), max_to_keep=100
+        )
+        ckpt = tf.train.latest_checkpoint(checkpoint_dir)
+        if restore and ckpt:
+            saver.restore(sess, ckpt)
+            logger.info(f"从 checkpoint 继续训练: {ckpt}")
+
+        for epoch in range(num_epochs):
+            interval_images: int = 0
+            interval_start_time = time.perf_counter()
+            epoch_start_time = time.perf_counter()
+            for batch_inputs, batch_seq_len, batch_codes in train_iterator:
+                feed: Dict = {
+                    model.inputs: batch_inputs,
+                    model.labels: utils.sparse_tuple_from_label(batch_codes),
+                    model.seq_len: batch_seq_len,
+                }
+                cost, step, _ = sess.run(
+                    [model.cost, model.global_step, model.train_op], feed
+                )
+                interval_images += len(batch_codes)
+                total_images += len(batch_codes)
+
+                if step % log_steps == 0:
+                    elapsed = time.perf_counter() - interval_start_time
+                    logger.info(
+                        f"epoch: {epoch}, step: {step}, cost: {cost:.4f}, "
+                        f"{interval_images / max(elapsed, 1e-9):.1f} images/s"
+                    )
+                    interval_images = 0
+                    interval_start_time = time.perf_counter()
+                if step % utils.FLAGS.save_steps == 0:
+                    saver.save(sess, checkpoint_path, global_step=step)
+                if (
+                    val_iterator is not None
+                    and step % utils.FLAGS.validation_steps == 0
+                ):
+                    accuracy = validate(sess, model, val_iterator)
+                    best_accuracy = max(best_accuracy, accuracy)
+                    logger.info(f"step: {step}, 验证集准确率: {accuracy:.4f}")
+            total_seconds += time.perf_counter() - epoch_start_time
+
+        saver.save(sess, checkpoint_path, global_step=step)
+        final_accuracy: Optional[float] = None
+        if val_iterator is not None:
+            final_accuracy = validate(sess, model, val_iterator)
+            best_accuracy = max(best_accuracy, final_accuracy)
+
+    return {
+        "steps": int(step),
+        "images": total_images,
+        "imagesPerSecond": round(total_images / max(total_seconds, 1e-9), 1),
+        "finalAccuracy": final_accuracy,
+        "bestAccuracy": best_accuracy if val_iterator is not None else None,
+        "checkpointDir": checkpoint_dir,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="知乎验证码模型训练")
+    parser.add_argument("--train", required=True, help="训练集图片目录或者数据集前缀")
+    parser.add_argument("--val", default=None, help="验证集图片目录或者数据集前缀")
+    parser.add_argument("--checkpoint-dir", default=default_checkpoint_dir)
+    parser.add_argument("--epochs", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--learning-rate", type=float, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--prefetch", type=int, default=4)
+    parser.add_argument("--log-steps", type=int, default=100)
+    parser.add_argument("--repack", action="store_true")
+    parser.add_argument("--no-restore", action="store_true")
+    args = parser.parse_args()
+
+    # 命令行参数由 argparse 处理，tf.app.flags 只使用默认值(避免解析到未定义的参数)
+    utils.FLAGS(sys.argv[:1])
+    if args.learning_rate is not None:
+        utils.FLAGS.initial_learning_rate = args.learning_rate
+
+    report = train(
+        train_prefix=prepare_dataset(args.train, args.workers, args.repack),
+        val_prefix=(
+            None
+            if args.val is None
+            else prepare_dataset(args.val, args.workers, args.repack)
+        ),
+        checkpoint_dir=args.checkpoint_dir,
+        num_epochs=args.epochs or utils.FLAGS.num_epochs,
+        batch_size=args.batch_size or utils.FLAGS.batch_size,
+        prefetch=args.prefetch,
+        restore=utils.FLAGS.restore and not args.no_restore,
+        log_steps=args.log_steps,
+    )
+    print(json.dumps(report, indent=2))
@@ -1,14 +1,23 @@
 import os
-import sys
-from typing import Dict
+import time
+from typing import Dict, List
 
 import numpy as np
 import tensorflow as tf
 
 from config import LOG_LEVEL
+from utils.decorator import synchronized
 from utils.logger_utils import LogManager
+from utils.metrics_utils import CAPTCHA_BATCH_SIZE, CAPTCHA_INFERENCE_LATENCY
 from captcha import zhihu_ocr_model as ocr_model
-from captcha import zhihu_captcha_utils as utils
+from captcha.zhihu_captcha_preprocess import get_input_buffer
+from captcha.zhihu_captcha_charset import (
+    image_width,
+    image_height,
+    image_channel,
+    build_seq_len,
+    decode_dense_code,
+)
 
 # 设置 tensorflow 日志等级
 tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
@@ -18,25 +27,44 @@ logger = LogManager("__name__").get_logger_and_add_handlers(
     formatter_template=5, log_level_int=LOG_LEVEL
 )
 
-try:
-    type(eval("model"))
-except NameError:
-    model = ocr_model.LSTMOCR("infer")
-    model.build_graph()
-
 # 知乎验证码调用类
 config = tf.compat.v1.ConfigProto(allow_soft_placement=True)
 checkpoint_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoint")
 
 
 class ZhihuCaptcha:
-    def __init__(self):
-        if sys.path[0]:
-            os.chdir(sys.path[0])  # 设置脚本所在目录为当前工作目录
+    """
+    知乎验证码识别 - 每个进程只有一个实例
+    第一次实例化时构建计算图、恢复权重并用空白图片预热，之后的实例化直接复用
+    tf.Session.run 本身是线程安全的，多个线程可以同时调用 predict
+    """
+
+    predictor = None
 
-        # 恢复权重
+    @synchronized
+    def __new__(cls, *args, **kwargs):
+        if cls.predictor is None:
+            predictor = super().__new__(cls)
+            predictor._init_predictor()
+            cls.predictor = predictor
+        return cls.predictor
+
+    def _init_predictor(self):
+        start_time = time.perf_counter()
+        # 构建计算图并恢复权重
+        self.__model = ocr_model.LSTMOCR("infer")
+        self.__model.build_infer_graph()
         self.__sess = self.__restore_session(checkpoint_dir)
 
+        # 预热，第一次 sess.run 会做图优化以及内存分配，避免算到第一个验证码的耗时里
+        self.__run(
+            image_input=np.zeros(
+                [1, image_height, image_width, image_channel], dtype=np.float32
+            ),
+            seq_len_input=build_seq_len(batch_size=1),
+        )
+        logger.debug(f"验证码模型加载完成，耗时: {time.perf_counter() - start_time:.3f}s")
+
     # 恢复权重
     @staticmethod
     def __restore_session(checkpoint: str = checkpoint_dir):
@@ -56,26 +84,39 @@ class ZhihuCaptcha:
             logger.warning(f"如果这不是你预期中的，请确保以下目录存在可用的 checkpoint:\n{checkpoint_dir}")
         return sess
 
+    def __run(self, image_input: np.ndarray, seq_len_input: np.ndarray):
+        """
+        :param image_input: 形状为 (n, 60, 150, 1) 的图片
+        :param seq_len_input: 形状为 (n,) 的序列长度
+        :return: 解码前的识别结果
+        """
+        feed: Dict = {
+            self.__model.inputs: image_input,
+            self.__model.seq_len: seq_len_input,
+        }
+        return self.__sess.run(self.__model.dense_decoded, feed)
+
+    @CAPTCHA_INFERENCE_LATENCY.time()
     def predict(self, img):
         """
         可以在线测试验证码识别功能
         参数：
             img 一个 (60, 150) 的图片
         """
-        im = np.array(img.convert("L")).astype(np.float32) / 255.0
-        im = np.reshape(im, [60, 150, 1])
-        inp = np.array([im])
-        seq_len_input = np.array([np.array([64 for _ in inp], dtype=np.int64)])
-        # seq_len_input = np.asarray(seq_len_input)
-        seq_len_input = np.reshape(seq_len_input, [-1])
-        image_input = np.asarray([im])
-        # 加载模型
-        feed: Dict = {model.inputs: image_input, model.seq_len: seq_len_input}
-        dense_decoded_code = self.__sess.run(model.dense_decoded, feed)
-        expression = ""
-        for i in dense_decoded_code[0]:
-            if i == -1:
-                expression += ""
-            else:
-                expression += utils.decode_maps[i]
-        return expression
+        image_input, seq_len_input = get_input_buffer().load_images(img_list=[img])
+        dense_decoded_code = self.__run(image_input, seq_len_input)
+        return decode_dense_code(dense_decoded_code[0])
+
+    @CAPTCHA_INFERENCE_LATENCY.time()
+    def predict_batch(self, img_list: List) -> List[str]:
+        """
+        一次 sess.run 识别多张验证码，结果与逐张调用 predict 相同
+        :param img_list: (60, 150) 的图片列表
+        :return: 识别结果列表，顺序与图片列表一致
+        """
+        if len(img_list) == 0:
+            return []
+        CAPTCHA_BATCH_SIZE.observe(len(img_list))
+        image_input, seq_len_input = get_input_buffer().load_images(img_list=img_list)
+        dense_decoded_code = self.__run(image_input, seq_len_input)
+        return [decode_dense_code(code) for code in dense_decoded_code]
@@ -0,0 +1,94 @@
+import json
+import time
+import hashlib
+from typing import Dict, Optional
+
+from utils.cache_utils import LRUCache
+from utils.decorator import synchronized
+from utils.logger_utils import LogManager
+from utils.metrics_utils import CAPTCHA_CACHE_COUNTER
+from pipeline.redis_pipeline import RedisPipelineHandler
+from config import LOG_LEVEL, CAPTCHA_CACHE_MAX_SIZE, CAPTCHA_CACHE_EXPIRE_SECONDS
+
+logger = LogManager(__name__).get_logger_and_add_handlers(
+    formatter_template=5, log_level_int=LOG_LEVEL
+)
+
+# 验证码识别结果的 Redis key 前缀
+redis_captcha_cache_key_prefix: str = "captcha_result_cache"
+
+
+def get_image_digest(img_bytes: bytes) -> str:
+    """
+    :param img_bytes: 验证码图片的二进制数据(Base64 解码后)
+    :return: 图片摘要
+    """
+    return hashlib.sha256(img_bytes).hexdigest()
+
+
+def get_cache_key(digest: str) -> str:
+    return f"{redis_captcha_cache_key_prefix}:{digest}"
+
+
+class CaptchaLocalCache:
+    """
+    进程内验证码识别结果缓存 - LRUCache
+    """
+
+    local_cache = None
+
+    @synchronized
+    def __new__(cls, *args, **kwargs):
+        if cls.local_cache is None:
+            cls.local_cache = LRUCache(
+                max_size=CAPTCHA_CACHE_MAX_SIZE,
+                ttl_seconds=CAPTCHA_CACHE_EXPIRE_SECONDS,
+            )
+        return cls.local_cache
+
+
+class CaptchaResultCache:
+    """
+    两级验证码识别结果缓存：进程内 LRUCache + Redis
+    缓存内容为 {"code": 验证码, "verified": 是否通过服务端校验, "updateTime": 时间戳}
+    """
+
+    def __init__(self):
+        self._local_cache = CaptchaLocalCache()
+        self._redis_instance = RedisPipelineHandler()
+
+    def get(self, digest: str) -> Optional[Dict]:
+        """
+        :param digest: 图片摘要
+        :return: 缓存的识别结果
+        """
+        key: str = get_cache_key(digest=digest)
+        result = self._local_cache.get(key=key)
+        if result is None:
+            value = self._redis_instance.find_key(key=key)
+            if value is not None:
+                result = json.loads(value)
+                self._local_cache.set(key=key, value=result)
+        CAPTCHA_CACHE_COUNTER.labels(result="miss" if result is None else "hit").inc()
+        return result
+
+    def set(self, digest: str, code: str, *, verified: bool) -> bool:
+        """
+        :param digest: 图片摘要
+        :param code: 验证码
+        :param verified: 是否通过服务端校验
+        """
+        key: str = get_cache_key(digest=digest)
+        result: Dict = {"code": code, "verified": verified, "updateTime": time.time()}
+        is_insert = self._redis_instance.insert_key(
+            key=key,
+            value=json.dumps(result),
+            expire_seconds=CAPTCHA_CACHE_EXPIRE_SECONDS,
+        )
+        self._local_cache.set(key=key, value=result)
+        return is_insert
+
+    def delete(self, digest: str) -> bool:
+        key: str = get_cache_key(digest=digest)
+        self._local_cache.delete(key=key)
+        return self._redis_instance.remove_keys(keys=[key])
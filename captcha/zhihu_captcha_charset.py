@@ -0,0 +1,99 @@
+"""
+知乎验证码模型的字符集、输入尺寸以及预处理/解码
+不依赖 TensorFlow，训练、推理以及导出后的轻量推理共用
+"""
+
+import os
+import string
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# 模型输入图片的尺寸
+image_height: int = 60
+image_width: int = 150
+image_channel: int = 1
+# LSTM 的最大步长，同时也是最后一层卷积的输出通道数
+max_stepsize: int = 64
+num_hidden: int = 128
+
+# 10 个数字 + 26 个小写字母 + 空白 + CTC blank
+num_classes: int = 38
+charset: str = string.digits + string.ascii_lowercase
+encode_maps: Dict = {}
+decode_maps: Dict = {}
+for i, char in enumerate(charset, 1):
+    encode_maps[char] = i
+    decode_maps[i] = char
+
+SPACE_INDEX: int = 0
+SPACE_TOKEN: str = ""
+encode_maps[SPACE_TOKEN] = SPACE_INDEX
+decode_maps[SPACE_INDEX] = SPACE_TOKEN
+
+
+def preprocess_image(img) -> np.ndarray:
+    """
+    把验证码图片转成模型输入
+    :param img: 一个 (60, 150) 的 Pillow 图片
+    :return: 形状为 (60, 150, 1) 的灰度图，取值 0~1
+    """
+    im = np.array(img.convert("L")).astype(np.float32) / 255.0
+    return np.reshape(im, [image_height, image_width, image_channel])
+
+
+def build_seq_len(batch_size: int) -> np.ndarray:
+    """
+    验证码图片的序列长度都是一样的
+    :param batch_size: 批次大小
+    """
+    return np.full([batch_size], max_stepsize, dtype=np.int64)
+
+
+def decode_dense_code(dense_decoded_code) -> str:
+    """
+    把解码结果(-1 为填充值)转成验证码字符串
+    :param dense_decoded_code: 一张图片的解码结果
+    :return: 验证码
+    """
+    expression = ""
+    for i in dense_decoded_code:
+        if i == -1:
+            expression += ""
+        else:
+            expression += decode_maps[i]
+    return expression
+
+
+def parse_code_from_filename(filename: str) -> str:
+    """
+    数据集图片的命名格式为 <idx>_<code>.png
+    :param filename: 文件名
+    :return: 验证码
+    """
+    return filename.split("_")[1].split(".")[0]
+
+
+def encode_code(code: str) -> List[int]:
+    """
+    :param code: 验证码
+    :return: 码字列表
+    """
+    return [SPACE_INDEX if code == SPACE_TOKEN else encode_maps[c] for c in list(code)]
+
+
+def list_labeled_images(image_dir: str) -> List[Tuple[str, str]]:
+    """
+    列出数据集目录中的图片以及对应的验证码(按文件名排序)
+    :param image_dir: 数据集目录
+    :return: [(图片路径, 验证码), ...]
+    """
+    image_list: List[Tuple[str, str]] = []
+    for root, _, file_list in os.walk(image_dir):
+        for filename in file_list:
+            if not filename.endswith(".png"):
+                continue
+            image_list.append(
+                (os.path.join(root, filename), parse_code_from_filename(filename))
+            )
+    return sorted(image_list)
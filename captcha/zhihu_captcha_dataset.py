@@ -0,0 +1,272 @@
+"""
+知乎验证码训练数据集 - 内存映射的打包格式
+图片目录只需要打包一次，训练时按批次从内存映射文件中读取，数据集大小不再受内存限制
+
+打包后的文件：
+<prefix>.images.npy  uint8，形状 (N, 60, 150)
+<prefix>.labels.npy  int8，形状 (N, max_code_length)，不足的部分填充 -1
+
+例：
+python -m captcha.zhihu_captcha_dataset --image-dir ./imgs/train/ --output ./imgs/train
+"""
+
+import os
+import json
+import queue
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, Iterator, Optional
+
+import numpy as np
+from PIL import Image
+
+from captcha.zhihu_captcha_charset import (
+    image_width,
+    image_height,
+    image_channel,
+    build_seq_len,
+    encode_code,
+    list_labeled_images,
+)
+
+# 验证码的最大长度(知乎验证码为 4 位)
+max_code_length: int = 8
+# 标签的填充值
+label_pad_value: int = -1
+
+
+def get_dataset_paths(prefix: str) -> Tuple[str, str]:
+    """
+    :param prefix: 数据集路径前缀
+    :return: (图片文件路径, 标签文件路径)
+    """
+    return f"{prefix}.images.npy", f"{prefix}.labels.npy"
+
+
+def create_packed_dataset(prefix: str, size: int) -> Tuple[np.memmap, np.memmap]:
+    """
+    创建指定大小的空数据集，多个进程可以通过 open_packed_dataset(mode="r+") 分段写入
+    :param prefix: 数据集路径前缀
+    :param size: 样本数
+    :return: (图片数组, 标签数组)
+    """
+    images_path, labels_path = get_dataset_paths(prefix=prefix)
+    images = np.lib.format.open_memmap(
+        images_path, mode="w+", dtype=np.uint8, shape=(size, image_height, image_width)
+    )
+    labels = np.lib.format.open_memmap(
+        labels_path, mode="w+", dtype=np.int8, shape=(size, max_code_length)
+    )
+    labels[:] = label_pad_value
+    return images, labels
+
+
+def open_packed_dataset(prefix: str, mode: str = "r") -> Tuple[np.memmap, np.memmap]:
+    """
+    :param prefix: 数据集路径前缀
+    :param mode: r 只读，r+ 读写
+    :return: (图片数组, 标签数组)
+    """
+    images_path, labels_path = get_dataset_paths(prefix=prefix)
+    return np.load(images_path, mmap_mode=mode), np.load(labels_path, mmap_mode=mode)
+
+
+def write_sample(images: np.ndarray, labels: np.ndarray, index: int, img, code: str):
+    """
+    写入一个样本
+    :param images: 图片数组
+    :param labels: 标签数组
+    :param index: 样本下标
+    :param img: (60, 150) 的 Pillow 图片
+    :param code: 验证码
+    """
+    code_list: List[int] = encode_code(code=code)
+    if len(code_list) > max_code_length:
+        raise ValueError(f"Captcha code {code} is longer than {max_code_length}!")
+    images[index] = np.asarray(img.convert("L"), dtype=np.uint8)
+    labels[index, : len(code_list)] = code_list
+    labels[index, len(code_list) :] = label_pad_value
+
+
+def _pack_image_chunk(prefix: str, start: int, image_list: List[Tuple[str, str]]):
+    images, labels = open_packed_dataset(prefix=prefix, mode="r+")
+    for offset, (path, code) in enumerate(image_list):
+        with Image.open(path) as img:
+            write_sample(
+                images=images, labels=labels, index=start + offset, img=img, code=code
+            )
+    images.flush()
+    labels.flush()
+
+
+def pack_image_dir(image_dir: str, prefix: str, workers: int = 1) -> Dict:
+    """
+    把 <idx>_<code>.png 格式的图片目录打包成数据集
+    :param image_dir: 图片目录
+    :param prefix: 数据集路径前缀
+    :param workers: 解码图片的进程数，每个进程写入数据集中不重叠的一段
+    :return: 打包信息
+    """
+    image_list = list_labeled_images(image_dir=image_dir)
+    images, labels = create_packed_dataset(prefix=prefix, size=len(image_list))
+    images.flush()
+    labels.flush()
+    del images, labels
+
+    chunk_size: int = max((len(image_list) + workers - 1) // max(workers, 1), 1)
+    chunk_starts = range(0, len(image_list), chunk_size)
+    if workers <= 1:
+        for start in chunk_starts:
+            _pack_image_chunk(prefix, start, image_list[start : start + chunk_size])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _pack_image_chunk,
+                    prefix,
+                    start,
+                    image_list[start : start + chunk_size],
+                )
+                for start in chunk_starts
+            ]
+            for future in futures:
+                future.result()
+    return {"prefix": prefix, "size": len(image_list)}
+
+
+class PackedDataIterator:
+    """
+    打包数据集的批次迭代器
+    每个 epoch 只打乱下标数组，按批次从内存映射文件中读取样本(批内下标排序后读取，减少随机 IO)，
+    可选在后台线程中预取批次
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        batch_size: int,
+        *,
+        shuffle: bool = True,
+        prefetch: int = 0,
+        drop_last: bool = False,
+        seed: Optional[int] = None,
+    ):
+        """
+        :param prefix: 数据集路径前缀
+        :param batch_size: 批次大小
+        :param shuffle: 每个 epoch 是否打乱顺序
+        :param prefetch: 预取的批次数，0 为不预取
+        :param drop_last: 是否丢弃最后一个不完整的批次
+        :param seed: 随机种子
+        """
+        self._images, self._labels = open_packed_dataset(prefix=prefix)
+        self._batch_size = batch_size
+        self._shuffle = shuffle
+        self._prefetch = prefetch
+        self._drop_last = drop_last
+        self._random = np.random.RandomState(seed)
+
+    @property
+    def size(self) -> int:
+        return self._labels.shape[0]
+
+    def _epoch_indexes(self) -> List[np.ndarray]:
+        indexes = np.arange(self.size)
+        if self._shuffle:
+            self._random.shuffle(indexes)
+        batch_list: List[np.ndarray] = [
+            indexes[start : start + self._batch_size]
+            for start in range(0, self.size, self._batch_size)
+        ]
+        if self._drop_last and batch_list and len(batch_list[-1]) < self._batch_size:
+            batch_list.pop()
+        return batch_list
+
+    def read_batch(
+        self, indexes: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, List[List[int]]]:
+        """
+        读取一个批次
+        :param indexes: 样本下标
+        :return: (图片 (n, 60, 150, 1) float32, 序列长度, 码字列表)
+        """
+        indexes = np.sort(indexes)
+        batch_inputs = self._images[indexes].astype(np.float32) / 255.0
+        batch_inputs = batch_inputs.reshape(
+            [len(indexes), image_height, image_width, image_channel]
+        )
+        batch_codes: List[List[int]] = [
+            [int(c) for c in label if c != label_pad_value]
+            for label in self._labels[indexes]
+        ]
+        return batch_inputs, build_seq_len(batch_size=len(indexes)), batch_codes
+
+    def _iter_batches(self) -> Iterator:
+        for indexes in self._epoch_indexes():
+            yield self.read_batch(indexes=indexes)
+
+    def _iter_prefetch(self) -> Iterator:
+        batch_queue: queue.Queue = queue.Queue(maxsize=self._prefetch)
+        stop_event = threading.Event()
+        end_flag = object()
+
+        def put(item) -> bool:
+            while not stop_event.is_set():
+                try:
+                    batch_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def producer():
+            try:
+                for batch in self._iter_batches():
+                    if not put(batch):
+                        return
+            except Exception as err:
+                put(err)
+            put(end_flag)
+
+        producer_thread = threading.Thread(
+            target=producer, name="captcha-dataset-prefetch", daemon=True
+        )
+        producer_thread.start()
+        try:
+            while True:
+                batch = batch_queue.get()
+                if batch is end_flag:
+                    return
+                if isinstance(batch, Exception):
+                    raise batch
+                yield batch
+        finally:
+            # 迭代提前结束时通知后台线程退出
+            stop_event.set()
+
+    def __iter__(self) -> Iterator:
+        """
+        迭代一个 epoch
+        """
+        if self._prefetch > 0:
+            return self._iter_prefetch()
+        return self._iter_batches()
+
+    def __len__(self) -> int:
+        if self._drop_last:
+            return self.size // self._batch_size
+        return (self.size + self._batch_size - 1) // self._batch_size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="打包知乎验证码训练数据集")
+    parser.add_argument("--image-dir", required=True)
+    parser.add_argument("--output", required=True, help="数据集路径前缀")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    report = pack_image_dir(
+        image_dir=args.image_dir, prefix=args.output, workers=args.workers
+    )
+    print(json.dumps(report))
@@ -0,0 +1,119 @@
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+import tensorflow as tf
+
+from config import LOG_LEVEL
+from utils.decorator import synchronized
+from utils.logger_utils import LogManager
+from utils.metrics_utils import CAPTCHA_BATCH_SIZE, CAPTCHA_INFERENCE_LATENCY
+from captcha.zhihu_captcha_preprocess import get_input_buffer
+from captcha.zhihu_captcha_charset import (
+    image_width,
+    image_height,
+    image_channel,
+    build_seq_len,
+    decode_dense_code,
+)
+
+logger = LogManager(__name__).get_logger_and_add_handlers(
+    formatter_template=5, log_level_int=LOG_LEVEL
+)
+
+model_dir: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model")
+# 导出的冻结图(captcha/export_zhihu_captcha.py 生成)
+frozen_graph_path: str = os.path.join(model_dir, "zhihu_captcha_frozen.pb")
+# INT8 权重量化后的冻结图(captcha/quantize_zhihu_captcha.py 生成)
+int8_graph_path: str = os.path.join(model_dir, "zhihu_captcha_int8.pb")
+
+
+def load_frozen_graph(graph_path: str) -> tf.Graph:
+    """
+    :param graph_path: 冻结图路径
+    :return: 计算图(节点名称不加前缀)
+    """
+    graph_def = tf.compat.v1.GraphDef()
+    with open(graph_path, "rb") as f:
+        graph_def.ParseFromString(f.read())
+    graph = tf.Graph()
+    with graph.as_default():
+        tf.compat.v1.import_graph_def(graph_def, name="")
+    return graph
+
+
+class ZhihuCaptchaLite:
+    """
+    知乎验证码识别 - 冻结图版本，每个进程只有一个实例
+    权重已经固化成常量，不需要构建训练图、定义 tf.app.flags 以及恢复 checkpoint
+    """
+
+    predictor = None
+    graph_path: str = frozen_graph_path
+
+    @synchronized
+    def __new__(cls, *args, **kwargs):
+        if cls.predictor is None:
+            predictor = super().__new__(cls)
+            predictor._init_predictor()
+            cls.predictor = predictor
+        return cls.predictor
+
+    def _init_predictor(self):
+        start_time = time.perf_counter()
+        self._graph = load_frozen_graph(graph_path=self.graph_path)
+        self._sess = tf.compat.v1.Session(
+            graph=self._graph,
+            config=tf.compat.v1.ConfigProto(allow_soft_placement=True),
+        )
+        self._inputs = self._graph.get_tensor_by_name("inputs:0")
+        self._seq_len = self._graph.get_tensor_by_name("seq_len:0")
+        self._dense_decoded = self._graph.get_tensor_by_name("dense_decoded:0")
+
+        # 预热
+        self._run(
+            image_input=np.zeros(
+                [1, image_height, image_width, image_channel], dtype=np.float32
+            ),
+            seq_len_input=build_seq_len(batch_size=1),
+        )
+        logger.debug(
+            f"验证码模型 {self.graph_path} 加载完成，耗时: {time.perf_counter() - start_time:.3f}s"
+        )
+
+    def _run(self, image_input: np.ndarray, seq_len_input: np.ndarray):
+        feed: Dict = {self._inputs: image_input, self._seq_len: seq_len_input}
+        return self._sess.run(self._dense_decoded, feed)
+
+    @CAPTCHA_INFERENCE_LATENCY.time()
+    def predict(self, img) -> str:
+        """
+        :param img: 一个 (60, 150) 的图片
+        :return: 识别结果
+        """
+        image_input, seq_len_input = get_input_buffer().load_images(img_list=[img])
+        dense_decoded_code = self._run(image_input, seq_len_input)
+        return decode_dense_code(dense_decoded_code[0])
+
+    @CAPTCHA_INFERENCE_LATENCY.time()
+    def predict_batch(self, img_list: List) -> List[str]:
+        """
+        :param img_list: (60, 150) 的图片列表
+        :return: 识别结果列表，顺序与图片列表一致
+        """
+        if len(img_list) == 0:
+            return []
+        CAPTCHA_BATCH_SIZE.observe(len(img_list))
+        image_input, seq_len_input = get_input_buffer().load_images(img_list=img_list)
+        dense_decoded_code = self._run(image_input, seq_len_input)
+        return [decode_dense_code(code) for code in dense_decoded_code]
+
+
+class ZhihuCaptchaInt8(ZhihuCaptchaLite):
+    """
+    知乎验证码识别 - INT8 权重量化版本，每个进程只有一个实例
+    """
+
+    predictor = None
+    graph_path: str = int8_graph_path
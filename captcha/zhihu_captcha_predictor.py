@@ -0,0 +1,24 @@
+import importlib
+from typing import Dict
+
+from config import CAPTCHA_MODEL_VARIANT
+
+# 模型名称 => 识别类
+captcha_variant_dict: Dict = {
+    "checkpoint": "captcha.zhihu_captcha.ZhihuCaptcha",
+    "frozen": "captcha.zhihu_captcha_lite.ZhihuCaptchaLite",
+    "int8": "captcha.zhihu_captcha_lite.ZhihuCaptchaInt8",
+}
+
+
+def get_captcha_predictor(variant: str = CAPTCHA_MODEL_VARIANT):
+    """
+    根据配置获取验证码识别实例(导入 TensorFlow 的开销在这里才产生)
+    :param variant: 模型名称 checkpoint、frozen 或者 int8
+    :return: 识别实例，提供 predict 以及 predict_batch
+    """
+    if variant not in captcha_variant_dict:
+        raise ValueError(f"Unknown captcha model variant: {variant}!")
+    module_name, class_name = captcha_variant_dict[variant].rsplit(".", 1)
+    predictor_class = getattr(importlib.import_module(module_name), class_name)
+    return predictor_class()
@@ -0,0 +1,104 @@
+"""
+知乎验证码模型输入的预处理
+图片(Base64 或者 Pillow 图片)直接写入预分配的 float32 批次缓冲区，不产生中间数组，
+结果与 zhihu_captcha_charset.preprocess_image 逐张处理后 np.stack 的结果完全一致
+"""
+
+import binascii
+import threading
+from io import BytesIO
+from typing import List, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from captcha.zhihu_captcha_charset import (
+    image_width,
+    image_height,
+    image_channel,
+    max_stepsize,
+)
+
+# 每个线程一个缓冲区(识别实例在多个线程之间共享)
+thread_local = threading.local()
+
+
+def fill_from_pillow(img, out: np.ndarray):
+    """
+    把图片转成灰度并归一化后写入 out
+    :param img: (60, 150) 的 Pillow 图片
+    :param out: 形状为 (60, 150, 1) 的 float32 数组
+    """
+    if img.mode != "L":
+        img = img.convert("L")
+    pixels = np.frombuffer(img.tobytes(), dtype=np.uint8)
+    np.divide(
+        pixels.reshape(out.shape), np.float32(255.0), out=out, casting="same_kind"
+    )
+
+
+def fill_from_base64(img_base64: Union[str, bytes], out: np.ndarray):
+    """
+    Base64 解码后直接交给 Pillow 解码，再写入 out
+    :param img_base64: 图片的 Base64
+    :param out: 形状为 (60, 150, 1) 的 float32 数组
+    """
+    with Image.open(BytesIO(binascii.a2b_base64(img_base64))) as img:
+        fill_from_pillow(img=img, out=out)
+
+
+class CaptchaInputBuffer:
+    """
+    预分配的模型输入缓冲区，批次超过容量时按 2 倍扩容
+    返回的数组是缓冲区的视图，下一次写入前有效
+    """
+
+    def __init__(self, capacity: int = 1):
+        self._capacity = 0
+        self._inputs = np.empty(
+            [0, image_height, image_width, image_channel], np.float32
+        )
+        self._seq_len = np.empty([0], dtype=np.int32)
+        self._ensure_capacity(size=capacity)
+
+    def _ensure_capacity(self, size: int):
+        if size <= self._capacity:
+            return
+        self._capacity = max(size, self._capacity * 2)
+        self._inputs = np.empty(
+            [self._capacity, image_height, image_width, image_channel],
+            dtype=np.float32,
+        )
+        self._seq_len = np.full([self._capacity], max_stepsize, dtype=np.int32)
+
+    def load_images(self, img_list: List) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param img_list: Pillow 图片列表
+        :return: (图片 (n, 60, 150, 1), 序列长度 (n,))
+        """
+        self._ensure_capacity(size=len(img_list))
+        for index, img in enumerate(img_list):
+            fill_from_pillow(img=img, out=self._inputs[index])
+        return self._inputs[: len(img_list)], self._seq_len[: len(img_list)]
+
+    def load_base64(self, img_base64_list: List) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param img_base64_list: 图片 Base64 列表
+        :return: (图片 (n, 60, 150, 1), 序列长度 (n,))
+        """
+        self._ensure_capacity(size=len(img_base64_list))
+        for index, img_base64 in enumerate(img_base64_list):
+            fill_from_base64(img_base64=img_base64, out=self._inputs[index])
+        count: int = len(img_base64_list)
+        return self._inputs[:count], self._seq_len[:count]
+
+
+def get_input_buffer() -> CaptchaInputBuffer:
+    """
+    :return: 当前线程的缓冲区
+    """
+    buffer = getattr(thread_local, "input_buffer", None)
+    if buffer is None:
+        buffer = CaptchaInputBuffer()
+        thread_local.input_buffer = buffer
+    return buffer
@@ -0,0 +1,231 @@
+"""
+知乎验证码识别服务
+独立进程加载模型，从 Redis 队列中读取识别请求，把短时间内的请求合并成一个批次推理，
+结果写入每个请求各自的结果队列。爬虫进程通过 ZhihuCaptchaClient 调用，不需要加载 TensorFlow
+
+启动：
+python -m captcha.zhihu_captcha_service
+"""
+
+import json
+import time
+import base64
+import uuid
+import signal
+import threading
+from typing import Dict, List, Optional
+
+from utils.metrics_dir_utils import init_metrics_multiproc_dir
+
+# 多进程指标目录需要在导入 utils.metrics_utils 之前设置，启动时清空这个容器上一次启动留下的指标文件
+# 作为模块导入时(例如爬虫进程导入 ZhihuCaptchaClient)不设置
+if __name__ == "__main__":
+    init_metrics_multiproc_dir(clear=True)
+
+from utils.logger_utils import LogManager
+from pipeline.redis_pipeline import RedisPipelineHandler
+from utils.image_utils import image_base64_to_pillow, image_bytes_to_pillow
+from captcha.zhihu_captcha_cache import CaptchaResultCache, get_image_digest
+from captcha.zhihu_captcha_predictor import get_captcha_predictor
+from config import (
+    LOG_LEVEL,
+    CAPTCHA_SERVICE_ENABLE,
+    CAPTCHA_SERVICE_REQUEST_KEY,
+    CAPTCHA_SERVICE_HEARTBEAT_KEY,
+    CAPTCHA_SERVICE_HEARTBEAT_EXPIRE_SECONDS,
+    CAPTCHA_SERVICE_TIMEOUT_SECONDS,
+    CAPTCHA_BATCH_MAX_SIZE,
+    CAPTCHA_BATCH_WAIT_MILLISECONDS,
+    CAPTCHA_MODEL_VARIANT,
+)
+
+logger = LogManager(__name__).get_logger_and_add_handlers(
+    formatter_template=5, log_level_int=LOG_LEVEL
+)
+
+# 识别结果队列的 key 前缀，每个请求一个队列
+redis_captcha_result_key_prefix: str = "captcha_result"
+# 收到退出信号后停止读取新的请求
+service_stop_event = threading.Event()
+
+
+def get_result_key(request_id: str) -> str:
+    return f"{redis_captcha_result_key_prefix}:{request_id}"
+
+
+class ZhihuCaptchaClient:
+    """
+    验证码识别服务的客户端
+    先查询识别结果缓存，识别服务不可用(没有心跳或者等待超时)时，在当前进程加载模型识别
+    """
+
+    def __init__(self):
+        self._redis_instance = RedisPipelineHandler()
+        self._result_cache = CaptchaResultCache()
+
+    def _is_service_alive(self) -> bool:
+        return (
+            self._redis_instance.find_key(key=CAPTCHA_SERVICE_HEARTBEAT_KEY) is not None
+        )
+
+    def _predict_by_service(self, img_base64: str) -> Optional[str]:
+        request_id: str = uuid.uuid4().hex
+        request: Dict = {
+            "requestId": request_id,
+            "image": img_base64,
+            "deadline": time.time() + CAPTCHA_SERVICE_TIMEOUT_SECONDS,
+        }
+        is_push = self._redis_instance.push_list(
+            key=CAPTCHA_SERVICE_REQUEST_KEY, values=[json.dumps(request)]
+        )
+        if not is_push:
+            return None
+        result = self._redis_instance.pop_list_blocking(
+            key=get_result_key(request_id=request_id),
+            timeout=CAPTCHA_SERVICE_TIMEOUT_SECONDS,
+        )
+        if result is None:
+            logger.warning(f"验证码识别服务超时，请求ID: {request_id}")
+            return None
+        result_dict: Dict = json.loads(result)
+        if result_dict.get("error") is not None:
+            logger.error(f"验证码识别服务识别失败!错误原因: {result_dict['error']}")
+            return None
+        return result_dict["code"]
+
+    @staticmethod
+    def _predict_local(img_bytes: bytes) -> str:
+        # 只有识别服务不可用时才在当前进程导入 TensorFlow
+        return get_captcha_predictor().predict(
+            img=image_bytes_to_pillow(byte_data=img_bytes)
+        )
+
+    def predict(self, img_base64: str) -> str:
+        """
+        识别验证码，同一张图片已经通过服务端校验的识别结果直接从缓存返回
+        :param img_base64: 验证码图片的 Base64
+        :return: 识别结果
+        """
+        img_bytes: bytes = base64.b64decode(img_base64)
+        cache_result = self._result_cache.get(digest=get_image_digest(img_bytes))
+        if cache_result is not None and cache_result["verified"]:
+            return cache_result["code"]
+
+        if CAPTCHA_SERVICE_ENABLE and self._is_service_alive():
+            captcha_code = self._predict_by_service(img_base64=img_base64)
+            if captcha_code is not None:
+                return captcha_code
+        return self._predict_local(img_bytes=img_bytes)
+
+    def report_result(self, img_base64: str, captcha_code: str, is_verified: bool):
+        """
+        记录服务端的校验结果，通过校验的识别结果写入缓存，没有通过的从缓存中删除
+        :param img_base64: 验证码图片的 Base64
+        :param captcha_code: 识别结果
+        :param is_verified: 是否通过服务端校验
+        """
+        digest: str = get_image_digest(base64.b64decode(img_base64))
+        if is_verified:
+            self._result_cache.set(digest=digest, code=captcha_code, verified=True)
+        else:
+            self._result_cache.delete(digest=digest)
+
+
+def _collect_batch(redis_instance: RedisPipelineHandler, first: str) -> List[str]:
+    """
+    收到第一个请求后，在 CAPTCHA_BATCH_WAIT_MILLISECONDS 内继续读取请求凑成一个批次
+    :param redis_instance: Redis
+    :param first: 第一个请求
+    :return: 请求列表
+    """
+    batch: List[str] = [first]
+    deadline: float = time.monotonic() + CAPTCHA_BATCH_WAIT_MILLISECONDS / 1000
+    while len(batch) < CAPTCHA_BATCH_MAX_SIZE and time.monotonic() < deadline:
+        items = redis_instance.pop_list(
+            key=CAPTCHA_SERVICE_REQUEST_KEY, count=CAPTCHA_BATCH_MAX_SIZE - len(batch)
+        )
+        if items:
+            batch.extend(items)
+        else:
+            time.sleep(0.001)
+    return batch
+
+
+def _handle_batch(
+    redis_instance: RedisPipelineHandler, captcha_model, batch: List[str]
+):
+    """
+    批量识别并把结果写入各个请求的结果队列
+    :param redis_instance: Redis
+    :param captcha_model: 验证码识别实例 get_captcha_predictor
+    :param batch: 请求列表
+    """
+    request_id_list: List[str] = []
+    img_list: List = []
+    now: float = time.time()
+    for item in batch:
+        request: Dict = json.loads(item)
+        # 客户端已经超时放弃的请求不再识别
+        if request["deadline"] < now:
+            continue
+        try:
+            img_list.append(image_base64_to_pillow(img_str=request["image"]))
+            request_id_list.append(request["requestId"])
+        except Exception as err:
+            _push_result(redis_instance, request["requestId"], {"error": str(err)})
+    if len(img_list) == 0:
+        return
+
+    try:
+        code_list: List[str] = captcha_model.predict_batch(img_list=img_list)
+        result_list: List[Dict] = [{"code": code} for code in code_list]
+    except Exception as err:
+        logger.error(f"验证码批量识别失败!错误原因: {err}")
+        result_list = [{"error": str(err)} for _ in request_id_list]
+    for request_id, result in zip(request_id_list, result_list):
+        _push_result(redis_instance, request_id, result)
+    logger.debug(f"验证码批量识别完成，批次大小: {len(img_list)}")
+
+
+def _push_result(redis_instance: RedisPipelineHandler, request_id: str, result: Dict):
+    redis_instance.push_list(
+        key=get_result_key(request_id=request_id),
+        values=[json.dumps(result)],
+        expire_seconds=CAPTCHA_SERVICE_TIMEOUT_SECONDS,
+    )
+
+
+def run_captcha_service():
+    """
+    识别服务主循环
+    """
+    captcha_model = get_captcha_predictor()
+    redis_instance = RedisPipelineHandler()
+    logger.info(f"验证码识别服务启动，模型: {CAPTCHA_MODEL_VARIANT}")
+    while not service_stop_event.is_set():
+        redis_instance.insert_key(
+            key=CAPTCHA_SERVICE_HEARTBEAT_KEY,
+            value=str(time.time()),
+            expire_seconds=CAPTCHA_SERVICE_HEARTBEAT_EXPIRE_SECONDS,
+        )
+        first = redis_instance.pop_list_blocking(
+            key=CAPTCHA_SERVICE_REQUEST_KEY, timeout=1
+        )
+        if first is None:
+            continue
+        batch = _collect_batch(redis_instance=redis_instance, first=first)
+        _handle_batch(
+            redis_instance=redis_instance, captcha_model=captcha_model, batch=batch
+        )
+    logger.info("验证码识别服务退出")
+
+
+def stop_signal_handler(signum, frame):
+    logger.info(f"收到信号: {signum}，验证码识别服务停止读取新的请求")
+    service_stop_event.set()
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, stop_signal_handler)
+    signal.signal(signal.SIGINT, stop_signal_handler)
+    run_captcha_service()
@@ -1,14 +1,19 @@
 import os
-import string
-from typing import Dict
 
 import numpy as np
 from PIL import Image
 import tensorflow as tf
 
-# +-* + () + 10 digit + blank + space
-# 3 + 2 + 10 + 1 + 1
-num_classes: int = 38
+# 字符集以及编码表与推理共用 zhihu_captcha_charset
+from captcha.zhihu_captcha_charset import (  # noqa: F401
+    charset,
+    num_classes,
+    encode_maps,
+    decode_maps,
+    SPACE_INDEX,
+    SPACE_TOKEN,
+)
+
 maxPrintLen: int = 100
 
 tf.app.flags.DEFINE_boolean(
@@ -48,20 +53,6 @@ tf.app.flags.DEFINE_integer("num_gpus", 1, "num of gpus")
 
 FLAGS = tf.app.flags.FLAGS
 
-# num_batches_per_epoch = int(num_train_samples/FLAGS.batch_size)
-# '0123456789+-*()'
-charset = string.digits + string.ascii_lowercase
-encode_maps: Dict = {}
-decode_maps: Dict = {}
-for i, char in enumerate(charset, 1):
-    encode_maps[char] = i
-    decode_maps[i] = char
-
-SPACE_INDEX = 0
-SPACE_TOKEN = ""
-encode_maps[SPACE_TOKEN] = SPACE_INDEX
-decode_maps[SPACE_INDEX] = SPACE_TOKEN
-
 
 class DataIterator:
     def __init__(self, data_dir):
@@ -2,9 +2,16 @@ import tensorflow as tf
 from tensorflow.python.training import moving_averages
 
 from captcha import zhihu_captcha_utils as utils
+from captcha import zhihu_captcha_charset as charset
 
+# 训练的超参数通过 tf.app.flags 配置，网络结构的参数与推理共用 zhihu_captcha_charset
 FLAGS = utils.FLAGS
-num_classes = utils.num_classes
+num_classes = charset.num_classes
+
+# 推理的输入输出节点名称
+inputs_node_name: str = "inputs"
+seq_len_node_name: str = "seq_len"
+dense_decoded_node_name: str = "dense_decoded"
 
 
 class LSTMOCR(object):
@@ -13,13 +20,16 @@ class LSTMOCR(object):
         # 图像输入
         self.inputs = tf.compat.v1.placeholder(
             tf.float32,
-            [None, FLAGS.image_height, FLAGS.image_width, FLAGS.image_channel],
+            [None, charset.image_height, charset.image_width, charset.image_channel],
+            name=inputs_node_name,
         )
 
         # ctc_loss 需要的是稀疏矩阵
         self.labels = tf.compat.v1.sparse_placeholder(tf.int32)
         # 一维数组，大小[batch_size]
-        self.seq_len = tf.compat.v1.placeholder(tf.int32, [None])
+        self.seq_len = tf.compat.v1.placeholder(
+            tf.int32, [None], name=seq_len_node_name
+        )
         # l2
         self._extra_train_ops = []  # 存储调整平滑均值，平滑方差的操作
 
@@ -31,11 +41,19 @@ class LSTMOCR(object):
 
         self.merged_summary = tf.compat.v1.summary.merge_all()
 
+    def build_infer_graph(self):
+        """
+        只构建推理需要的部分(不包含损失函数、优化器以及 global_step)
+        变量名与训练时一致，可以直接从训练的 checkpoint 恢复
+        """
+        self._build_model()
+        self._build_decoder()
+
     def _build_model(self):
         """
         构建模型，前两个卷积的卷积核size 分别是7，5 是很重要的，换成其他的效果会差很多
         """
-        filters = [32, 64, 128, 128, FLAGS.max_stepsize]
+        filters = [32, 64, 128, 128, charset.max_stepsize]
         strides = [1, 2]
 
         with tf.compat.v1.variable_scope("cnn"):
@@ -75,11 +93,11 @@ class LSTMOCR(object):
             shp = x.get_shape().as_list()
             x = tf.reshape(x, [-1, filters[4], shp[1] * shp[2]])
             # tf.nn.rnn_cell.RNNCell, tf.nn.rnn_cell.GRUCell
-            cell = tf.contrib.rnn.LSTMCell(FLAGS.num_hidden, state_is_tuple=True)
+            cell = tf.contrib.rnn.LSTMCell(charset.num_hidden, state_is_tuple=True)
             if self.mode == "train":
                 cell = tf.contrib.rnn.DropoutWrapper(cell=cell, output_keep_prob=0.8)
 
-            cell1 = tf.contrib.rnn.LSTMCell(FLAGS.num_hidden, state_is_tuple=True)
+            cell1 = tf.contrib.rnn.LSTMCell(charset.num_hidden, state_is_tuple=True)
             if self.mode == "train":
                 cell1 = tf.contrib.rnn.DropoutWrapper(cell=cell1, output_keep_prob=0.8)
 
@@ -90,11 +108,11 @@ class LSTMOCR(object):
             outputs, _ = tf.nn.dynamic_rnn(stack, x, self.seq_len, dtype=tf.float32)
 
             # reshape 使其满足模型的step长度
-            outputs = tf.reshape(outputs, [-1, FLAGS.num_hidden])
+            outputs = tf.reshape(outputs, [-1, charset.num_hidden])
 
             W = tf.compat.v1.get_variable(
                 name="W",
-                shape=[FLAGS.num_hidden, num_classes],
+                shape=[charset.num_hidden, num_classes],
                 dtype=tf.float32,
                 initializer=tf.contrib.layers.xavier_initializer(),
             )
@@ -146,6 +164,9 @@ class LSTMOCR(object):
         train_ops = [self.optimizer] + self._extra_train_ops
         self.train_op = tf.group(*train_ops)
 
+        self._build_decoder()
+
+    def _build_decoder(self):
         # Option 2: tf.contrib.ctc.ctc_beam_search_decoder
         # (it's slower but you'll get better results)
         # decoded, log_prob = tf.nn.ctc_greedy_decoder(logits, seq_len,merge_repeated=False)
@@ -153,8 +174,11 @@ class LSTMOCR(object):
         self.decoded, self.log_prob = tf.nn.ctc_beam_search_decoder(
             self.logits, self.seq_len, merge_repeated=False
         )
-        # 解码
-        self.dense_decoded = tf.sparse.to_dense(self.decoded[0], default_value=-1)
+        # 解码(固定输出节点的名称，导出冻结图时使用)
+        self.dense_decoded = tf.identity(
+            tf.sparse.to_dense(self.decoded[0], default_value=-1),
+            name=dense_decoded_node_name,
+        )
 
     # 卷积
     @staticmethod
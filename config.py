@@ -1,3 +1,4 @@
+import os
 from typing import Dict, List
 
 # 日志等级
@@ -6,9 +7,23 @@ LOG_LEVEL: int = 10
 # 设置 NPM 的路径
 NPM_ROOT_PATH: str = "/usr/local/lib/node_modules"
 
+# JS 签名进程池配置
+"""
+常驻的 Node.js 进程池，脚本在每个 node 进程中只加载一次，之后通过 stdin/stdout 调用
+登录加密已经使用 Python 实现，进程池只用于对比 JS 结果的单元测试以及 benchmark/js_sign_benchmark.py
+"""
+# Node.js 可执行文件
+NODE_BIN_PATH: str = "node"
+# 每个进程最多同时运行的 node 进程数(同时也是签名的并发上限)
+JS_WORKER_POOL_SIZE: int = 4
+# 单次调用的超时时间(秒)，超时的 node 进程会被结束，下次调用时重新启动
+JS_WORKER_CALL_TIMEOUT_SECONDS: int = 10
+
 # API Server 配置
 SERVER_HOST: str = "0.0.0.0"
 SERVER_PORT: int = 12580
+# API Server 的 worker 进程数，默认与 CPU 核数一致
+SERVER_WORKERS: int = os.cpu_count() or 1
 
 # 数据库配置
 
@@ -63,6 +78,130 @@ STATUS_TO_CODE: Dict = {
     "FAIL": 50,
 }
 
+"""
+任务进度配置
+TASK_PROGRESS_EXPIRE_SECONDS: 任务进度在 Redis 中的保留时间(秒)
+TASK_PROGRESS_HEARTBEAT_SECONDS: SSE 推送进度时的心跳间隔(秒)
+"""
+TASK_PROGRESS_EXPIRE_SECONDS: int = 86400
+TASK_PROGRESS_HEARTBEAT_SECONDS: int = 15
+
+"""
+任务追踪配置
+TASK_TRACE_EXPIRE_SECONDS: 任务追踪数据(各阶段以及子步骤的耗时)在 Redis 中的保留时间(秒)
+"""
+TASK_TRACE_EXPIRE_SECONDS: int = 86400
+
+"""
+Cookie 有效性巡检配置
+COOKIE_CHECK_INTERVAL_SECONDS: 单个账号 Cookie 的巡检间隔(秒)
+COOKIE_CHECK_JITTER_SECONDS: 巡检时间的随机抖动(秒)，避免所有账号在同一时刻被探测
+COOKIE_SWEEP_INTERVAL_SECONDS: 每个平台巡检定时任务的执行间隔(秒)
+COOKIE_SWEEP_BATCH_SIZE: 每次巡检最多取出的到期账号数
+COOKIE_SWEEP_CONCURRENCY: 每次巡检并发探测的账号数
+"""
+COOKIE_CHECK_INTERVAL_SECONDS: int = 200
+COOKIE_CHECK_JITTER_SECONDS: int = 60
+COOKIE_SWEEP_INTERVAL_SECONDS: int = 10
+COOKIE_SWEEP_BATCH_SIZE: int = 100
+COOKIE_SWEEP_CONCURRENCY: int = 10
+
+"""
+会话缓存配置
+SESSION_CACHE_MAX_SIZE: 进程内会话缓存的最大条数
+SESSION_CACHE_TTL_SECONDS: 进程内会话缓存的过期时间(秒)
+SESSION_VALIDATED_TTL_SECONDS: Cookie 探测通过后，在这段时间(秒)内不再重复探测
+"""
+SESSION_CACHE_MAX_SIZE: int = 10000
+SESSION_CACHE_TTL_SECONDS: int = 600
+SESSION_VALIDATED_TTL_SECONDS: int = 300
+
+"""
+API 配置
+BATCH_CHECK_MAX_SIZE: 批量查询任务状态时单次请求最多的任务数
+TASK_RESULT_BATCH_SIZE: 获取任务结果时每批从 MongoDB 游标拉取(以及输出)的条数
+"""
+BATCH_CHECK_MAX_SIZE: int = 1000
+TASK_RESULT_BATCH_SIZE: int = 500
+
+"""
+批量创建任务配置
+BATCH_CREATE_MAX_SIZE: 单次请求最多的任务数
+BATCH_CREATE_RATE_LIMIT: 批量创建接口的请求频率限制(与单个创建接口分开计数)
+BATCH_CREATE_QUOTA: 每个 IP 在 BATCH_CREATE_QUOTA_WINDOW_SECONDS 内最多可以创建的任务数
+"""
+BATCH_CREATE_MAX_SIZE: int = 1000
+BATCH_CREATE_RATE_LIMIT: str = "10/minute"
+BATCH_CREATE_QUOTA: int = 5000
+BATCH_CREATE_QUOTA_WINDOW_SECONDS: int = 3600
+
+"""
+API 限流的存储地址，多个 worker 以及多个实例之间共享限流计数
+slowapi 只支持同步的存储，限流计数在事件循环中同步读写 Redis，
+RATE_LIMIT_STORAGE_TIMEOUT_SECONDS 是读写限流计数的超时时间(秒)，Redis 变慢时限制阻塞事件循环的时间
+"""
+RATE_LIMIT_STORAGE_URI: str = (
+    f"redis://:{RedisConfig['password']}@{RedisConfig['host']}:{RedisConfig['port']}"
+    f"/{RedisConfig['database']}"
+)
+RATE_LIMIT_STORAGE_TIMEOUT_SECONDS: float = 0.5
+
+"""
+任务队列配置(Redis List，API 服务写入，爬虫进程消费)
+TASK_QUEUE_REDIS_KEY: 任务队列的 key
+TASK_QUEUE_POP_TIMEOUT_SECONDS: 爬虫进程阻塞等待任务的超时时间(秒)
+TASK_CREDENTIAL_EXPIRE_SECONDS: 任务登录凭据的保留时间(秒)，凭据不写入任务队列，单独保存在带过期时间的 key 中，
+                                爬虫进程读取后立即删除，在队列中等待超过这个时间的任务执行失败
+"""
+TASK_QUEUE_REDIS_KEY: str = "spider_task_queue"
+TASK_QUEUE_POP_TIMEOUT_SECONDS: int = 5
+TASK_CREDENTIAL_EXPIRE_SECONDS: int = 3600
+
+"""
+任务取消以及爬虫进程退出配置
+TASK_CANCEL_EXPIRE_SECONDS: 任务取消标记在 Redis 中的保留时间(秒)
+TASK_DRAIN_TIMEOUT_SECONDS: 爬虫进程收到退出信号后等待当前任务结束的时间(秒)，超时后中断任务并放回队列
+"""
+TASK_CANCEL_EXPIRE_SECONDS: int = 86400
+TASK_DRAIN_TIMEOUT_SECONDS: int = 60
+
+"""
+验证码识别服务配置(独立进程加载模型，把短时间内的识别请求合并成一个批次推理)
+CAPTCHA_SERVICE_ENABLE: 是否优先通过识别服务识别验证码，服务不可用时在爬虫进程内加载模型识别
+CAPTCHA_SERVICE_REQUEST_KEY: 识别请求队列的 key
+CAPTCHA_SERVICE_HEARTBEAT_KEY: 识别服务心跳的 key，key 不存在时认为服务不可用
+CAPTCHA_SERVICE_HEARTBEAT_EXPIRE_SECONDS: 心跳的过期时间(秒)
+CAPTCHA_SERVICE_TIMEOUT_SECONDS: 爬虫进程等待识别结果的超时时间(秒)
+CAPTCHA_BATCH_MAX_SIZE: 每个批次最多的图片数
+CAPTCHA_BATCH_WAIT_MILLISECONDS: 收到第一个请求后等待凑批的时间(毫秒)
+CAPTCHA_MODEL_VARIANT: 验证码模型，checkpoint(训练的 checkpoint)、frozen(冻结图)或者 int8(INT8 权重量化的冻结图)
+"""
+CAPTCHA_SERVICE_ENABLE: bool = True
+CAPTCHA_SERVICE_REQUEST_KEY: str = "captcha_request_queue"
+CAPTCHA_SERVICE_HEARTBEAT_KEY: str = "captcha_service_heartbeat"
+CAPTCHA_SERVICE_HEARTBEAT_EXPIRE_SECONDS: int = 10
+CAPTCHA_SERVICE_TIMEOUT_SECONDS: int = 5
+CAPTCHA_BATCH_MAX_SIZE: int = 32
+CAPTCHA_BATCH_WAIT_MILLISECONDS: int = 10
+CAPTCHA_MODEL_VARIANT: str = "checkpoint"
+
+"""
+验证码识别结果缓存配置(以图片摘要为 key，进程内 LRUCache + Redis)
+CAPTCHA_CACHE_MAX_SIZE: 进程内缓存的最大条数
+CAPTCHA_CACHE_EXPIRE_SECONDS: 识别结果的缓存时间(秒)
+"""
+CAPTCHA_CACHE_MAX_SIZE: int = 10000
+CAPTCHA_CACHE_EXPIRE_SECONDS: int = 604800
+
+"""
+监控指标配置
+METRICS_MULTIPROC_DIR: 多进程指标文件的根目录，API 服务与爬虫进程需要使用同一个目录(容器部署时挂载同一个数据卷)，
+                       每个容器写入以主机名命名的子目录，PROMETHEUS_MULTIPROC_DIR 由启动脚本设置，不需要手动配置
+"""
+METRICS_MULTIPROC_DIR: str = os.environ.get(
+    "METRICS_MULTIPROC_DIR", "/tmp/blogs_crawler_metrics"
+)
+
 # 爬虫配置
 """
 当前支持的爬虫类别
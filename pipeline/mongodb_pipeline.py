@@ -4,9 +4,11 @@ from bson import ObjectId
 from pymongo import MongoClient
 from pymongo.database import Database
 from pymongo.errors import BulkWriteError, ConnectionFailure
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCursor
 
 from utils.decorator import synchronized
 from utils.logger_utils import LogManager
+from utils.metrics_utils import MONGO_WRITE_LATENCY, MONGO_WRITE_BATCH_SIZE
 from config import LOG_LEVEL, MongoDBConfig
 
 logger = LogManager(__name__).get_logger_and_add_handlers(
@@ -66,7 +68,11 @@ class MongoDBHandler:
     def insert_one(self, col_name: str, doc: Dict) -> bool:
         try:
             col_instance = self._mongo_db_client[col_name]
-            col_instance.insert_one(document=doc)
+            with MONGO_WRITE_LATENCY.labels(
+                collection=col_name, operation="insert_one"
+            ).time():
+                col_instance.insert_one(document=doc)
+            MONGO_WRITE_BATCH_SIZE.labels(collection=col_name).observe(1)
             return True
         except Exception as err:
             logger.error(err)
@@ -85,7 +91,12 @@ class MongoDBHandler:
         try:
             doc_list_length: int = len(doc_list)
             col_instance = self._mongo_db_client[col_name]
-            insert_res = col_instance.insert_many(documents=doc_list)
+            MONGO_WRITE_BATCH_SIZE.labels(collection=col_name).observe(doc_list_length)
+            with MONGO_WRITE_LATENCY.labels(
+                collection=col_name, operation="insert_many"
+            ).time():
+                # ordered=False: 遇到重复数据(唯一索引冲突)时继续写入后面的数据
+                insert_res = col_instance.insert_many(documents=doc_list, ordered=False)
             return len(insert_res.inserted_ids) == doc_list_length
         except BulkWriteError as err:
             logger.warning(err)
@@ -193,3 +204,61 @@ class MongoDBHandler:
         except Exception as err:
             logger.error(err)
             return None
+
+
+class AsyncMongoDBPipeline:
+    """
+    进程内共享的异步 MongoDB 客户端 - motor(API 服务使用，不占用线程池)
+    motor 的客户端在第一次执行操作时才建立连接
+    """
+
+    mongo_client: Optional[AsyncIOMotorClient] = None
+
+    @synchronized
+    def __new__(cls, *args, **kwargs):
+        if cls.mongo_client is None:
+            cls.mongo_client = AsyncIOMotorClient(
+                host=MongoDBConfig["host"],
+                port=MongoDBConfig["port"],
+                username=MongoDBConfig["username"],
+                password=MongoDBConfig["password"],
+                maxPoolSize=MongoDBConfig["maxPoolSize"],
+                minPoolSize=MongoDBConfig["minPoolSize"],
+            )
+        return cls.mongo_client
+
+
+class AsyncMongoDBHandler:
+    def __init__(self):
+        self._mongo_client: AsyncIOMotorClient = AsyncMongoDBPipeline()
+        self._mongo_db_client = self._mongo_client[MongoDBConfig["database"]]
+
+    def find_cursor(
+        self,
+        col_name: str,
+        *,
+        query: Optional[Dict] = None,
+        col_show: Optional[Dict] = None,
+        skip: int = 0,
+        limit: int = 0,
+        batch_size: int = 0,
+    ) -> Optional[AsyncIOMotorCursor]:
+        """
+        返回异步的服务端游标，由调用方通过 async for 迭代并关闭
+        :param col_name: 集合名称
+        :param query: 查询条件
+        :param col_show: 返回的字段
+        :param skip: 跳过的条数
+        :param limit: 最多返回的条数，0 为不限制
+        :param batch_size: 每批拉取的条数，0 为使用服务端默认值
+        """
+        try:
+            col_instance = self._mongo_db_client[col_name]
+            if query is None:
+                query = {}
+            return col_instance.find(
+                query, col_show, skip=skip, limit=limit, batch_size=batch_size
+            )
+        except Exception as err:
+            logger.error(err)
+            return None
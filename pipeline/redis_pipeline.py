@@ -1,10 +1,14 @@
-from typing import Optional
+from typing import Dict, List, Tuple, Callable, Optional
 
 from redis import Redis, ConnectionPool
-from redis.exceptions import RedisError, ConnectionError
+from redis.client import PubSub
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.client import PubSub as AsyncPubSub
+from redis.exceptions import RedisError, ConnectionError, WatchError
 
 from utils.decorator import synchronized
 from utils.logger_utils import LogManager
+from utils.metrics_utils import observe_redis_latency
 from config import LOG_LEVEL, RedisConfig
 
 logger = LogManager(__name__).get_logger_and_add_handlers(
@@ -45,17 +49,35 @@ class RedisPipeline:
             return None
 
 
+class RedisClient:
+    """
+    进程内共享的 Redis 客户端(客户端本身是线程安全的，连接从连接池中获取)
+    """
+
+    redis_client: Optional[Redis] = None
+
+    @synchronized
+    def __new__(cls, *args, **kwargs):
+        if cls.redis_client is None:
+            cls.redis_client = cls._init_client()
+        return cls.redis_client
+
+    @staticmethod
+    def _init_client() -> Optional[Redis]:
+        pool = RedisPipeline()
+        if pool is None:
+            return None
+        return Redis(connection_pool=pool)
+
+
 class RedisPipelineHandler:
     def __init__(self):
-        self._pool = RedisPipeline()
+        self._client = RedisClient()
 
     def get_redis_instance(self) -> Optional[Redis]:
-        try:
-            return Redis(connection_pool=self._pool)
-        except Exception as err:
-            logger.error(err)
-            return None
+        return self._client
 
+    @observe_redis_latency
     def insert_key(
         self,
         key: str,
@@ -78,6 +100,7 @@ class RedisPipelineHandler:
             logger.error("从 Redis 连接池获取连接失败!")
             return False
 
+    @observe_redis_latency
     def find_key(self, key: str) -> Optional[str]:
         instance = self.get_redis_instance()
         if instance is not None:
@@ -89,3 +112,648 @@ class RedisPipelineHandler:
         else:
             logger.error("从 Redis 连接池获取连接失败!")
             return None
+
+    @observe_redis_latency
+    def insert_hash(
+        self, key: str, mapping: Dict, *, expire_seconds: Optional[int] = None
+    ) -> bool:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                pipe = instance.pipeline(transaction=False)
+                pipe.hset(name=key, mapping=mapping)
+                if expire_seconds is not None:
+                    pipe.expire(name=key, time=expire_seconds)
+                pipe.execute()
+                return True
+            except RedisError as err:
+                logger.error(err)
+                return False
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return False
+
+    @observe_redis_latency
+    def find_hash(self, key: str) -> Optional[Dict]:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                return instance.hgetall(name=key)
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    def pop_hash(self, key: str) -> Optional[Dict]:
+        """
+        在一个事务中读取并删除 hash(Redis 4.0 没有 GETDEL)
+        :param key: hash 的 key
+        :return: hash 的内容，key 不存在时为空字典，出错时为 None
+        """
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                pipe = instance.pipeline(transaction=True)
+                pipe.hgetall(name=key)
+                pipe.delete(key)
+                return pipe.execute()[0]
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    def publish_message(self, channel: str, message: str) -> bool:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                instance.publish(channel=channel, message=message)
+                return True
+            except RedisError as err:
+                logger.error(err)
+                return False
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return False
+
+    @observe_redis_latency
+    def subscribe_channel(self, channel: str) -> Optional[PubSub]:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                pubsub = instance.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                # 读到订阅确认后才返回，之后发布的消息都能收到
+                pubsub.get_message(timeout=5)
+                return pubsub
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    def insert_sorted_set(self, key: str, mapping: Dict) -> bool:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                instance.zadd(name=key, mapping=mapping)
+                return True
+            except RedisError as err:
+                logger.error(err)
+                return False
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return False
+
+    @observe_redis_latency
+    def claim_sorted_set_by_score(
+        self,
+        key: str,
+        max_score: float,
+        count: int,
+        score_func: Callable[[str], float],
+    ) -> Optional[List[str]]:
+        """
+        原子地取出分值不超过 max_score 的成员，并把它们的分值更新为 score_func(成员)
+        通过 WATCH/MULTI 实现，多个进程同时认领时同一个成员只会被一个进程取到
+        :param key: 有序集合的 key
+        :param max_score: 最大分值
+        :param count: 最多取出的成员数
+        :param score_func: 计算成员新分值的函数
+        :return: 取出的成员
+        """
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                with instance.pipeline(transaction=True) as pipe:
+                    while True:
+                        try:
+                            pipe.watch(key)
+                            members = pipe.zrangebyscore(
+                                name=key,
+                                min="-inf",
+                                max=max_score,
+                                start=0,
+                                num=count,
+                            )
+                            if not members:
+                                pipe.unwatch()
+                                return []
+                            pipe.multi()
+                            pipe.zadd(
+                                name=key,
+                                mapping={name: score_func(name) for name in members},
+                            )
+                            pipe.execute()
+                            return members
+                        except WatchError:
+                            # 其他进程同时修改了有序集合，重新认领
+                            continue
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    def remove_keys_and_members(
+        self, keys: List[str], *, sorted_set_key: str, members: List[str]
+    ) -> bool:
+        """
+        在一个 pipeline 中批量删除 key 以及有序集合中的成员
+        :param keys: 需要删除的 key
+        :param sorted_set_key: 有序集合的 key
+        :param members: 需要从有序集合中删除的成员
+        """
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                pipe = instance.pipeline(transaction=False)
+                if len(keys) > 0:
+                    pipe.delete(*keys)
+                if len(members) > 0:
+                    pipe.zrem(sorted_set_key, *members)
+                pipe.execute()
+                return True
+            except RedisError as err:
+                logger.error(err)
+                return False
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return False
+
+    @observe_redis_latency
+    def remove_keys(self, keys: List[str]) -> bool:
+        if len(keys) == 0:
+            return True
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                instance.delete(*keys)
+                return True
+            except RedisError as err:
+                logger.error(err)
+                return False
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return False
+
+    @observe_redis_latency
+    def find_keys(self, keys: List[str]) -> Optional[List[Optional[str]]]:
+        """
+        通过 MGET 批量查询
+        :param keys: key 列表
+        :return: 与 keys 一一对应的结果，不存在的 key 为 None
+        """
+        if len(keys) == 0:
+            return []
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                return instance.mget(keys)
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    def push_list(
+        self, key: str, values: List[str], *, expire_seconds: Optional[int] = None
+    ) -> bool:
+        """
+        从队列头部写入(LPUSH)，与 pop_list_blocking 配合实现先进先出队列
+        :param key: 队列的 key
+        :param values: 写入的数据
+        :param expire_seconds: 过期时间(秒)
+        """
+        if len(values) == 0:
+            return True
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                pipe = instance.pipeline(transaction=False)
+                pipe.lpush(key, *values)
+                if expire_seconds is not None:
+                    pipe.expire(name=key, time=expire_seconds)
+                pipe.execute()
+                return True
+            except RedisError as err:
+                logger.error(err)
+                return False
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return False
+
+    @observe_redis_latency
+    def insert_keys_and_push_list(
+        self,
+        mapping: Dict,
+        *,
+        list_key: str,
+        values: List[str],
+        hash_mapping: Optional[Dict[str, Dict]] = None,
+        hash_expire_seconds: Optional[int] = None,
+    ) -> bool:
+        """
+        在一个事务 pipeline 中批量写入 key、hash 并写入队列(LPUSH)
+        :param mapping: key-value
+        :param list_key: 队列的 key
+        :param values: 写入队列的数据
+        :param hash_mapping: {hash 的 key: hash 的内容}
+        :param hash_expire_seconds: hash 的过期时间(秒)
+        """
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                pipe = instance.pipeline(transaction=True)
+                if len(mapping) > 0:
+                    pipe.mset(mapping)
+                for hash_key, hash_value in (hash_mapping or {}).items():
+                    pipe.hset(name=hash_key, mapping=hash_value)
+                    if hash_expire_seconds is not None:
+                        pipe.expire(name=hash_key, time=hash_expire_seconds)
+                if len(values) > 0:
+                    pipe.lpush(list_key, *values)
+                pipe.execute()
+                return True
+            except RedisError as err:
+                logger.error(err)
+                return False
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return False
+
+    # 阻塞读取的耗时主要是等待任务的时间，不记录到 Redis 操作耗时中
+    def pop_list_blocking(self, key: str, timeout: int = 0) -> Optional[str]:
+        """
+        从队列尾部阻塞读取(BRPOP)
+        :param key: 队列的 key
+        :param timeout: 阻塞等待的超时时间(秒)，0 为一直等待
+        :return: 数据，超时或者出错时为 None
+        """
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                item = instance.brpop(key, timeout=timeout)
+                return None if item is None else item[1]
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    def pop_list(self, key: str, count: int) -> Optional[List[str]]:
+        """
+        从队列尾部非阻塞读取最多 count 条数据
+        RPOP 的 count 参数需要 Redis 6.2，这里通过 pipeline 兼容低版本
+        :param key: 队列的 key
+        :param count: 最多读取的条数
+        :return: 数据列表，队列为空时为空列表，出错时为 None
+        """
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                pipe = instance.pipeline(transaction=False)
+                for _ in range(count):
+                    pipe.rpop(key)
+                return [item for item in pipe.execute() if item is not None]
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    def find_list_length(self, key: str) -> Optional[int]:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                return instance.llen(key)
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+
+class AsyncRedisClient:
+    """
+    进程内共享的异步 Redis 客户端 - redis.asyncio(API 服务使用，不占用线程池)
+    客户端内部维护连接池，第一次执行命令时才建立连接
+    """
+
+    redis_client: Optional[AsyncRedis] = None
+
+    @synchronized
+    def __new__(cls, *args, **kwargs):
+        if cls.redis_client is None:
+            cls.redis_client = AsyncRedis(
+                host=RedisConfig["host"],
+                port=RedisConfig["port"],
+                password=RedisConfig["password"],
+                db=RedisConfig["database"],
+                decode_responses=True,
+            )
+        return cls.redis_client
+
+
+class AsyncRedisPipelineHandler:
+    def __init__(self):
+        self._client = AsyncRedisClient()
+
+    def get_redis_instance(self) -> Optional[AsyncRedis]:
+        return self._client
+
+    @observe_redis_latency
+    async def insert_key(
+        self,
+        key: str,
+        value: str,
+        *,
+        expire_seconds: Optional[int] = None,
+        expire_milliseconds: Optional[int] = None,
+    ) -> bool:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                await instance.set(
+                    name=key, value=value, ex=expire_seconds, px=expire_milliseconds
+                )
+                return True
+            except RedisError as err:
+                logger.error(err)
+                return False
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return False
+
+    @observe_redis_latency
+    async def find_key(self, key: str) -> Optional[str]:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                return await instance.get(name=key)
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    async def find_keys(self, keys: List[str]) -> Optional[List[Optional[str]]]:
+        """
+        通过 MGET 批量查询
+        :param keys: key 列表
+        :return: 与 keys 一一对应的结果，不存在的 key 为 None
+        """
+        if len(keys) == 0:
+            return []
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                return await instance.mget(keys)
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    async def find_hash(self, key: str) -> Optional[Dict]:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                return await instance.hgetall(name=key)
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    async def subscribe_channel(self, channel: str) -> Optional[AsyncPubSub]:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                pubsub = instance.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(channel)
+                return pubsub
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    async def incr_key(
+        self, key: str, amount: int = 1, *, expire_seconds: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        计数器自增，同时设置过期时间
+        :param key: 计数器的 key
+        :param amount: 自增的数量(可以为负数)
+        :param expire_seconds: 过期时间(秒)
+        :return: 自增后的值，出错时为 None
+        """
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                pipe = instance.pipeline(transaction=True)
+                pipe.incrby(key, amount)
+                if expire_seconds is not None:
+                    pipe.expire(name=key, time=expire_seconds)
+                result = await pipe.execute()
+                return result[0]
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    async def insert_keys_if_absent(
+        self,
+        keys: List[str],
+        value: str,
+        *,
+        replace_value: Optional[str] = None,
+        delete_keys: Optional[Dict[str, str]] = None,
+    ) -> Optional[List[str]]:
+        """
+        通过 WATCH/MULTI 批量写入不存在(或者值为 replace_value)的 key，
+        多个请求同时写入同一个 key 时只有一个请求写入成功
+        :param keys: key 列表
+        :param value: 写入的值
+        :param replace_value: 可以被覆盖的值
+        :param delete_keys: {key: 写入 key 时在同一个事务中删除的 key}
+        :return: 写入成功的 key，出错时为 None
+        """
+        if len(keys) == 0:
+            return []
+        if delete_keys is None:
+            delete_keys = {}
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                async with instance.pipeline(transaction=True) as pipe:
+                    while True:
+                        try:
+                            await pipe.watch(*keys)
+                            exist_values: List = await pipe.mget(keys)
+                            insert_keys: List[str] = [
+                                key
+                                for key, exist_value in zip(keys, exist_values)
+                                if exist_value is None or exist_value == replace_value
+                            ]
+                            if len(insert_keys) == 0:
+                                await pipe.unwatch()
+                                return []
+                            pipe.multi()
+                            pipe.mset({key: value for key in insert_keys})
+                            remove_keys: List[str] = [
+                                delete_keys[key]
+                                for key in insert_keys
+                                if key in delete_keys
+                            ]
+                            if len(remove_keys) > 0:
+                                pipe.delete(*remove_keys)
+                            await pipe.execute()
+                            return insert_keys
+                        except WatchError:
+                            # 其他请求同时修改了这些 key，重新检查
+                            continue
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    async def insert_key_if_value_in(
+        self,
+        key: str,
+        value: str,
+        *,
+        check_key: str,
+        check_values: List[str],
+        expire_seconds: Optional[int] = None,
+    ) -> Optional[Tuple[bool, Optional[str]]]:
+        """
+        通过 WATCH/MULTI 在 check_key 的值属于 check_values 时写入 key，
+        读取 check_key 与写入 key 之间 check_key 被修改时重新检查
+        :param key: 写入的 key
+        :param value: 写入的值
+        :param check_key: 检查的 key
+        :param check_values: 允许写入时 check_key 的值
+        :param expire_seconds: 过期时间(秒)
+        :return: (是否写入, 检查时 check_key 的值)，出错时为 None
+        """
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                async with instance.pipeline(transaction=True) as pipe:
+                    while True:
+                        try:
+                            await pipe.watch(check_key)
+                            check_value: Optional[str] = await pipe.get(check_key)
+                            if check_value not in check_values:
+                                await pipe.unwatch()
+                                return False, check_value
+                            pipe.multi()
+                            pipe.set(name=key, value=value, ex=expire_seconds)
+                            await pipe.execute()
+                            return True, check_value
+                        except WatchError:
+                            # 检查之后 check_key 被修改，重新检查
+                            continue
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    async def insert_keys_and_push_list(
+        self,
+        mapping: Dict,
+        *,
+        list_key: str,
+        values: List[str],
+        hash_mapping: Optional[Dict[str, Dict]] = None,
+        hash_expire_seconds: Optional[int] = None,
+    ) -> bool:
+        """
+        在一个事务 pipeline 中批量写入 key、hash 并写入队列(LPUSH)
+        :param mapping: key-value
+        :param list_key: 队列的 key
+        :param values: 写入队列的数据
+        :param hash_mapping: {hash 的 key: hash 的内容}
+        :param hash_expire_seconds: hash 的过期时间(秒)
+        """
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                pipe = instance.pipeline(transaction=True)
+                if len(mapping) > 0:
+                    pipe.mset(mapping)
+                for hash_key, hash_value in (hash_mapping or {}).items():
+                    pipe.hset(name=hash_key, mapping=hash_value)
+                    if hash_expire_seconds is not None:
+                        pipe.expire(name=hash_key, time=hash_expire_seconds)
+                if len(values) > 0:
+                    pipe.lpush(list_key, *values)
+                await pipe.execute()
+                return True
+            except RedisError as err:
+                logger.error(err)
+                return False
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return False
+
+    @observe_redis_latency
+    async def find_list_length(self, key: str) -> Optional[int]:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                return await instance.llen(key)
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
+
+    @observe_redis_latency
+    async def find_list(self, key: str) -> Optional[List[str]]:
+        instance = self.get_redis_instance()
+        if instance is not None:
+            try:
+                return await instance.lrange(key, 0, -1)
+            except RedisError as err:
+                logger.error(err)
+                return None
+        else:
+            logger.error("从 Redis 连接池获取连接失败!")
+            return None
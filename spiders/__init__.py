@@ -1,11 +1,26 @@
+import time
+import threading
+from contextlib import nullcontext
 from random import choice
-from typing import Any, Dict, List, Tuple, Union, Optional, AbstractSet
+from urllib.parse import urlparse
+from typing import Any, Set, Dict, List, Tuple, Union, Optional, AbstractSet
 
 import requests
 from requests import Response
 from requests_toolbelt import MultipartEncoder
 
 from utils.async_task_utils import AsyncTaskHandler
+from utils.metrics_utils import observe_http_request
+from utils.trace_utils import TaskTracer, trace_span
+from utils.exception_utils import TaskCancelException, TaskInterruptException
+from utils.task_control_utils import get_cancel_key, worker_interrupt_event
+from utils.progress_utils import TaskProgress, TaskProgressPhase
+from utils.session_cache_utils import SessionCacheHandler
+from utils.cookie_sweeper_utils import (
+    CookieSweeper,
+    cookie_data_key_suffix_list,
+    get_platform_by_spider_name,
+)
 from pipeline.mongodb_pipeline import MongoDBHandler
 from pipeline.redis_pipeline import RedisPipelineHandler
 
@@ -45,13 +60,28 @@ class BaseSpiderParseMethodType:
 
 
 class BaseSpider:
-    def __init__(self):
-        self.data_model = BlogsDataModel()
+    # 分页过程中保存数据的属性名称，任务取消或者中断时用于保存已经获取到的数据
+    _partial_data_attr_map: Dict = {
+        "personalBlogs": "_blogs_data",
+        "personalLikeBlogs": "_like_blogs_data",
+    }
+
+    def __init__(self, task_id: Optional[str] = None, platform: str = "unknown"):
+        self._task_id = task_id
+        # 追踪对象需要在记录任务进度之前激活
+        self.tracer = TaskTracer(task_id=task_id)
+        self.tracer.activate()
+        self.task_progress = TaskProgress(
+            task_id=task_id, platform=platform, tracer=self.tracer
+        )
+        self.data_model = BlogsDataModel(
+            task_id=task_id, task_progress=self.task_progress, tracer=self.tracer
+        )
         self._session = requests.Session()
         self._common_headers: Dict = {"User-Agent": UserAgentPool().get_user_agent()}
 
         self._redis_instance = RedisPipelineHandler()
-        self._async_task = AsyncTaskHandler()
+        self._session_cache = SessionCacheHandler()
 
     @staticmethod
     def make_request(
@@ -62,8 +92,9 @@ class BaseSpider:
         data: Union[str, dict, MultipartEncoder, None] = None,
         json: Union[str, dict, None] = None,
     ) -> Response:
-        return requests.request(
-            method=method, url=url, headers=headers, data=data, json=json
+        # requests 模块与 Session 一样提供 request 方法
+        return BaseSpider.make_request_with_session(
+            requests, url=url, headers=headers, method=method, data=data, json=json
         )
 
     @staticmethod
@@ -76,9 +107,23 @@ class BaseSpider:
         data: Union[str, dict, MultipartEncoder, None] = None,
         json: Union[str, dict, None] = None,
     ) -> Response:
-        return session.request(
-            method=method, url=url, headers=headers, data=data, json=json
+        start_time = time.perf_counter()
+        try:
+            with trace_span(name="http", detail=urlparse(url).netloc):
+                response = session.request(
+                    method=method, url=url, headers=headers, data=data, json=json
+                )
+        except requests.RequestException:
+            observe_http_request(
+                url=url, status="error", elapsed=time.perf_counter() - start_time
+            )
+            raise
+        observe_http_request(
+            url=url,
+            status=str(response.status_code),
+            elapsed=time.perf_counter() - start_time,
         )
+        return response
 
     @staticmethod
     def get_default_headers() -> Dict:
@@ -98,46 +143,87 @@ class BaseSpider:
         return child_method(data)
 
     def get_cookies(self, spider_name: str) -> Optional[str]:
-        find_result = self._redis_instance.find_key(key=spider_name)
+        self.task_progress.start_phase(phase=TaskProgressPhase.Cookies)
+        # Cookie 以及登录数据(:params、:token、:user_url 等)通过一次 MGET 一起加载
+        with trace_span(name="cookie_lookup"):
+            self._session_cache.prefetch(
+                keys=[spider_name]
+                + [f"{spider_name}{suffix}" for suffix in cookie_data_key_suffix_list]
+            )
+            find_result = self._session_cache.get(key=spider_name)
         if find_result is not None:
+            # 最近探测通过的 Cookie 直接使用，不再重复探测
+            if self._session_cache.is_recently_validated(spider_name=spider_name):
+                return find_result
+
             # 测试这个 cookie 是否可用
-            if self._call_children_method(data=find_result):
-                # 在有 Cookie 的时候，重新启动时先调用 get_cookies -> self._call_children_method
-                # 此时没有定时任务存在，因此需要插入一个定时任务探测 Cookie 的有效性
-                self._async_task.make_async_scheduler_task_by_interval(
-                    job_id=spider_name,
-                    interval_seconds=200,
-                    callback=self._call_children_method,
-                )
+            cookie_sweeper = CookieSweeper(
+                platform=get_platform_by_spider_name(spider_name=spider_name)
+            )
+            with trace_span(name="cookie_probe"):
+                is_valid = self._call_children_method(data=find_result)
+            if is_valid:
+                # Cookie 有效时登记到所属平台的巡检队列，由平台的巡检任务统一探测有效性
+                self._session_cache.mark_validated(spider_name=spider_name)
+                cookie_sweeper.schedule(spider_names=[spider_name])
                 return find_result
             else:
-                # TODO 当返回 False 的时候需要清空当前 spider_name 下的所有 key-value
-                # TODO 然后通过 getattr 去调用 login 方法
+                # Cookie 失效时清空当前 spider_name 下的所有 key-value，后续由 login 重新登录
+                cookie_sweeper.evict(spider_names=[spider_name])
                 return None
         return None
 
     def set_cookies(self, spider_name: str, cookies: str) -> bool:
-        is_insert = self._redis_instance.insert_key(key=spider_name, value=cookies)
+        is_insert = self._session_cache.set(key=spider_name, value=cookies)
         if is_insert:
-            # 通过一个定时任务去定时轮训这个 cookie 是否有效
-            self._async_task.make_async_scheduler_task_by_interval(
-                job_id=spider_name,
-                interval_seconds=200,
-                callback=self._call_children_method,
-            )
+            self._session_cache.mark_validated(spider_name=spider_name)
+            # 登记到所属平台的巡检队列，定时探测这个 cookie 是否有效
+            CookieSweeper(
+                platform=get_platform_by_spider_name(spider_name=spider_name)
+            ).schedule(spider_names=[spider_name])
             return True
         else:
             return False
 
     def get_data(self, spider_name: str) -> Optional[str]:
-        return self._redis_instance.find_key(key=spider_name)
+        return self._session_cache.get(key=spider_name)
 
     def set_data(self, spider_name: str, data: str) -> bool:
-        return self._redis_instance.insert_key(key=spider_name, value=data)
-
-    def send_data(self):
-        # 发送数据
-        self.data_model.push_data()
+        return self._session_cache.set(key=spider_name, value=data)
+
+    def send_data(self, is_interrupted: bool = False):
+        """
+        发送数据，数据写入完成之后由写入数据的线程发布 Finish(或者 Interrupted)阶段
+        :param is_interrupted: 任务是否被中断，中断的任务会放回任务队列，不发布 Finish 阶段
+        """
+        self.task_progress.start_phase(phase=TaskProgressPhase.SendData)
+        self.data_model.push_data(is_interrupted=is_interrupted)
+
+    def check_task_cancelled(self):
+        """
+        分页之间检查任务是否被取消或者爬虫进程是否需要中断任务
+        """
+        if worker_interrupt_event.is_set():
+            raise TaskInterruptException()
+        if self._task_id is None:
+            return
+        if self._redis_instance.find_key(key=get_cancel_key(task_id=self._task_id)):
+            raise TaskCancelException()
+
+    def save_partial_data(self, is_interrupted: bool = False):
+        """
+        任务被取消或者中断时，保存已经获取到的数据
+        :param is_interrupted: 任务是否被中断(爬虫进程退出，任务放回任务队列)
+        """
+        partial_data_model: Dict = self.data_model.to_dict()
+        for data_type, attr_name in self._partial_data_attr_map.items():
+            partial_data = getattr(self, attr_name, None)
+            if partial_data and not partial_data_model[data_type]:
+                if data_type == "personalBlogs":
+                    self.data_model.set_personal_blogs_data(data=partial_data)
+                else:
+                    self.data_model.set_personal_like_blogs_data(data=partial_data)
+        self.send_data(is_interrupted=is_interrupted)
 
     def remove_cookie_scheduler(self, spider_name: str):
         pass
@@ -146,20 +232,37 @@ class BaseSpider:
         return self._redis_instance.insert_key(key=f"spider_task:{task_id}", value=data)
 
 
+# 数据类型和 MongoDB 集合名称的对应关系
+blogs_collection_name_map: Dict = {
+    "personal": "c_personal",
+    "personalBlogs": "c_personal_blogs",
+    "personalLikeBlogs": "c_personal_like_blogs",
+}
+
+# 当前进程已经检查过索引的集合，索引的迁移以及创建每个进程每个集合只执行一次
+mongo_index_col_name_set: Set[str] = set()
+mongo_index_lock = threading.Lock()
+
+
 # 数据封装类
 class BlogsDataModel:
-    def __init__(self):
+    def __init__(
+        self,
+        task_id: Optional[str] = None,
+        task_progress: Optional[TaskProgress] = None,
+        tracer: Optional[TaskTracer] = None,
+    ):
+        self._task_id = task_id
+        self._task_progress = task_progress
+        # 数据在线程池中写入，需要显式传入追踪对象
+        self._tracer = tracer
         self._personal_data: dict = {}
         self._personal_blogs_data: dict = {}
         self._personal_like_blogs_data: dict = {}
 
         self._async_task = AsyncTaskHandler()
         self._mongo_instance = MongoDBHandler()
-        self._mongo_collection_name: Dict = {
-            "personal": "c_personal",
-            "personalBlogs": "c_personal_blogs",
-            "personalLikeBlogs": "c_personal_like_blogs",
-        }
+        self._mongo_collection_name: Dict = blogs_collection_name_map
 
     def set_personal_data(self, data: dict):
         self._personal_data = data
@@ -184,30 +287,76 @@ class BlogsDataModel:
         return self._show_model()
 
     def _deal_mongo_index(self, col_name: str, is_unique: bool = True):
-        index_query: List = []
-        # [("索引字段名", 1)]
+        if col_name in mongo_index_col_name_set:
+            return
+        with mongo_index_lock:
+            if col_name in mongo_index_col_name_set:
+                return
+            self._create_mongo_index(col_name=col_name, is_unique=is_unique)
+            mongo_index_col_name_set.add(col_name)
+
+    def _create_mongo_index(self, col_name: str, is_unique: bool):
+        # 每个集合中标识一条数据的字段
         if col_name == "c_personal":
-            index_query = [("username", 1)]
-        elif col_name == "c_personal_blogs":
-            index_query = [("blogId", 1)]
-        elif col_name == "c_personal_like_blogs":
-            index_query = [("blogId", 1)]
-
-        self._mongo_instance.get_mongo_instance()[col_name].create_index(
-            index_query, unique=is_unique
-        )
+            key_field: str = "username"
+        else:
+            key_field = "blogId"
+
+        col_instance = self._mongo_instance.get_mongo_instance()[col_name]
+        # 旧版本只在数据字段上建唯一索引，不同任务(或者不同账号)写入同一篇文章时会冲突
+        legacy_index_name: str = f"{key_field}_1"
+        if legacy_index_name in col_instance.index_information():
+            col_instance.drop_index(legacy_index_name)
+        # 数据在任务内唯一，同时用于任务结果接口通过 taskId 查询数据
+        col_instance.create_index([("taskId", 1), (key_field, 1)], unique=is_unique)
+
+    def _deal_data(self, is_interrupted: bool = False) -> bool:
+        try:
+            self._write_data()
+        finally:
+            # 数据写入之后再发布 Finish，收到 Finish 的客户端可以读取到全部数据
+            if self._task_progress is not None:
+                if is_interrupted:
+                    self._task_progress.interrupt()
+                else:
+                    self._task_progress.finish()
+        return True
+
+    def _trace_span(self, name: str, detail: Optional[str] = None):
+        if self._tracer is None:
+            return nullcontext()
+        return self._tracer.span(name=name, detail=detail)
 
-    def _deal_data(self) -> bool:
+    def _write_data(self):
         for key, data in self.to_dict().items():
             col_name: str = self._mongo_collection_name[key]
             self._deal_mongo_index(col_name=col_name)
 
             if data != {} and data is not None:
-                if isinstance(data, list):
-                    self._mongo_instance.insert_many(col_name=col_name, doc_list=data)
-                else:
-                    self._mongo_instance.insert_one(col_name=col_name, doc=data)
-        return True
-
-    def push_data(self):
-        self._async_task.make_async_task_by_thread(self._deal_data)
+                # 每条数据记录所属的任务 ID
+                if self._task_id is not None:
+                    if isinstance(data, list):
+                        data = [dict(doc, taskId=self._task_id) for doc in data]
+                    else:
+                        data = dict(data, taskId=self._task_id)
+
+                with self._trace_span(name="mongo_write", detail=col_name):
+                    if isinstance(data, list):
+                        is_insert = self._mongo_instance.insert_many(
+                            col_name=col_name, doc_list=data
+                        )
+                        written_count: int = len(data) if is_insert else 0
+                    else:
+                        is_insert = self._mongo_instance.insert_one(
+                            col_name=col_name, doc=data
+                        )
+                        written_count = 1 if is_insert else 0
+
+                if self._task_progress is not None:
+                    self._task_progress.add_counters(written=written_count)
+
+    def push_data(self, is_interrupted: bool = False):
+        """
+        :param is_interrupted: 任务是否被中断
+        """
+        self._async_task.make_async_task_by_thread(self._deal_data, is_interrupted)
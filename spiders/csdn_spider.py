@@ -8,7 +8,12 @@ from utils.str_utils import check_is_json
 from config import LOG_LEVEL, PROCESS_STATUS_FAIL
 from utils.time_utils import datetime_str_change_fmt
 from utils.encrypt_utils import hmac_encrypt_sha256_base64
-from utils.exception_utils import LoginException, ParseDataException
+from utils.exception_utils import (
+    LoginException,
+    ParseDataException,
+    TaskCancelException,
+)
+from utils.progress_utils import TaskProgressPhase
 from spiders import BaseSpider, BaseSpiderParseMethodType, CookieUtils
 
 logger = LogManager(__name__).get_logger_and_add_handlers(
@@ -98,6 +103,8 @@ LOGIN_DATA_WEB_UMID_TOKEN: str = "T1FE96933802C3FDF25B8F260ED7E83A847014FDE2B370
 
 
 class CSDNSpider(BaseSpider):
+    _personal_main_url: str = "https://me.csdn.net"
+
     def __init__(self, task_id: str, username: str, password: str):
         self._task_id = task_id
         self._login_username = username
@@ -108,9 +115,8 @@ class CSDNSpider(BaseSpider):
 
         self._blog_main_url: str = "https://blog.csdn.net"
         self._login_main_url: str = "https://passport.csdn.net"
-        self._personal_main_url: str = "https://me.csdn.net"
 
-        super().__init__()
+        super().__init__(task_id=task_id, platform="csdn")
 
         self._check_hvc_data: Dict = {
             "nvcValue": json.dumps(LOGIN_NVC_VALUE),
@@ -139,14 +145,18 @@ class CSDNSpider(BaseSpider):
 
     def parse_data_with_method(self, method: str):
         if method == BaseSpiderParseMethodType.LoginResult:
+            self.task_progress.start_phase(phase=TaskProgressPhase.PersonalData)
             self._parse_login_data()
         elif method == BaseSpiderParseMethodType.PersonalBlogs:
+            self.task_progress.start_phase(phase=TaskProgressPhase.PersonalBlogs)
             self._parse_personal_blogs()
+            self.task_progress.start_phase(phase=TaskProgressPhase.PersonalLikeBlogs)
             self._parse_personal_like_blogs()
         elif method == BaseSpiderParseMethodType.Finish:
             self.send_data()
 
     def login(self):
+        self.task_progress.start_phase(phase=TaskProgressPhase.Login)
         if self._login_cookies is None:
             hvc_response = self.make_request_with_session(
                 session=self._session,
@@ -358,6 +368,7 @@ class CSDNSpider(BaseSpider):
             raise ParseDataException()
 
         blogs_list_data = api_json_response["data"]["list"]
+        self.task_progress.add_counters(pages=1, parsed=len(blogs_list_data))
         if len(blogs_list_data) > 0:
             for blogs in blogs_list_data:
                 # https://blog.csdn.net/sinat_28177969/article/details/54138163
@@ -378,6 +389,7 @@ class CSDNSpider(BaseSpider):
 
             # 文章有不同状态的，只取 enable 的，其他状态的文章，外部无法访问
             if api_json_response["data"]["count"]["enable"] > 20:
+                self.check_task_cancelled()
                 time.sleep(1)
                 page_no += 1
                 self._parse_personal_blogs(page_no=page_no)
@@ -408,6 +420,9 @@ class CSDNSpider(BaseSpider):
                     inner_json_response = inner_response.json()
                     if inner_json_response["message"] == "成功":
                         collection_data_list = inner_json_response["data"]["list"]
+                        self.task_progress.add_counters(
+                            pages=1, parsed=len(collection_data_list)
+                        )
                         if len(collection_data_list) > 0:
                             logger.info(f"正在获取收藏夹: {collection_id} 的第 {page_no} 的数据!")
                             for collection_data in collection_data_list:
@@ -421,12 +436,15 @@ class CSDNSpider(BaseSpider):
                                 self._like_blogs_data.append(blog_data)
 
                             # 请求下一页
+                            self.check_task_cancelled()
                             page_no += 1
                             time.sleep(0.5)
                             inner_spider(c_id=c_id, page_no=page_no)
 
                 try:
                     inner_spider(c_id=collection_id)
+                except TaskCancelException:
+                    raise
                 except (ParseDataException, Exception):
                     logger.error("获取个人收藏博客失败!")
                     break
@@ -438,24 +456,36 @@ class CSDNSpider(BaseSpider):
         self.parse_data_with_method(method=BaseSpiderParseMethodType.Finish)
 
     def _test_cookies(self, cookies: Optional[str] = None) -> bool:
-        test_url: str = f"{self._personal_main_url}/api/favorite/folderList"
-        test_request_headers: Dict = self.get_default_headers()
         test_request_cookies = self._login_cookies
         if cookies is not None:
             test_request_cookies = cookies
-        test_request_headers.update(Cookie=test_request_cookies)
-        test_response = self.make_request(url=test_url, headers=test_request_headers)
+        return self.probe_cookies(
+            spider_name=self._spider_name, cookies=test_request_cookies
+        )
+
+    @classmethod
+    def probe_cookies(cls, spider_name: str, cookies: str) -> bool:
+        """
+        探测 Cookie 是否有效(CookieSweeper 巡检时直接调用，不需要创建爬虫实例)
+        :param spider_name: 爬虫名称
+        :param cookies: Cookie
+        :return: 是否有效
+        """
+        username: str = spider_name.split(":", 1)[-1]
+        test_url: str = f"{cls._personal_main_url}/api/favorite/folderList"
+        test_request_headers: Dict = cls.get_default_headers()
+        test_request_headers.update(Cookie=cookies)
+        test_response = cls.make_request(url=test_url, headers=test_request_headers)
         if (
             test_response.status_code != 200
             or check_is_json(test_response.content.decode()) is not True
         ):
             logger.error(f"当前 CSDN 账号登录状态: 已退出!")
-            self._async_task.remove_async_scheduler(job_id=self._spider_name)
             return False
 
         test_json_response = test_response.json()
         if test_json_response["code"] == 200:
-            logger.info(f"当前 CSDN 账号为: {self._login_username}, 状态: 已登录")
+            logger.info(f"当前 CSDN 账号为: {username}, 状态: 已登录")
             return True
         else:
             logger.error(f"当前 CSDN 账号登录状态: 已退出!")
@@ -5,7 +5,13 @@ from utils.logger_utils import LogManager
 from utils.str_utils import check_is_json
 from config import LOG_LEVEL, PROCESS_STATUS_FAIL
 from utils.time_utils import datetime_str_change_fmt
-from utils.exception_utils import LoginException, ParseDataException
+from utils.exception_utils import (
+    LoginException,
+    ParseDataException,
+    TaskCancelException,
+)
+from utils.progress_utils import TaskProgressPhase
+from pipeline.redis_pipeline import RedisPipelineHandler
 from spiders import BaseSpider, BaseSpiderParseMethodType, CookieUtils
 from utils.str_utils import check_is_phone_number, check_is_email_address
 
@@ -37,7 +43,7 @@ class JuejinSpider(BaseSpider):
         self._like_blogs_data: List = []
         self._like_blogs_total_page: int = 0
 
-        super().__init__()
+        super().__init__(task_id=task_id, platform="juejin")
 
         self._login_cookies = self.get_cookies(spider_name=self._spider_name)
 
@@ -65,14 +71,18 @@ class JuejinSpider(BaseSpider):
 
     def parse_data_with_method(self, method: str):
         if method == BaseSpiderParseMethodType.LoginResult:
+            self.task_progress.start_phase(phase=TaskProgressPhase.PersonalData)
             self._parse_login_data()
         elif method == BaseSpiderParseMethodType.PersonalBlogs:
+            self.task_progress.start_phase(phase=TaskProgressPhase.PersonalBlogs)
             self._parse_personal_blogs()
+            self.task_progress.start_phase(phase=TaskProgressPhase.PersonalLikeBlogs)
             self._parse_personal_like_blogs()
         elif method == BaseSpiderParseMethodType.Finish:
             self.send_data()
 
     def login(self):
+        self.task_progress.start_phase(phase=TaskProgressPhase.Login)
         if self._login_cookies is None:
             login_url, login_data = self._check_username()
             response = self.make_request(
@@ -118,6 +128,8 @@ class JuejinSpider(BaseSpider):
                     self.parse_data_with_method(
                         method=BaseSpiderParseMethodType.PersonalBlogs
                     )
+                except TaskCancelException:
+                    raise
                 except Exception as err:
                     logger.error(f"解析 Redis 返回数据失败! 错误原因: {err}")
                     self.parse_data_with_method(
@@ -181,6 +193,7 @@ class JuejinSpider(BaseSpider):
             if self._response_data is not None and self._response_data["m"] == "ok":
                 next_page_variable = None
                 entry_list = self._response_data["d"]["entrylist"]
+                self.task_progress.add_counters(pages=1, parsed=len(entry_list))
                 if len(entry_list) > 0:
                     for personal_blog in entry_list:
                         blog_create_time = datetime_str_change_fmt(
@@ -199,6 +212,7 @@ class JuejinSpider(BaseSpider):
                         next_page_variable = personal_blog["verifyCreatedAt"]
 
                 if self._response_data["d"]["total"] > 20:
+                    self.check_task_cancelled()
                     time.sleep(0.5)
                     self._parse_personal_blogs(next_params=next_page_variable)
                 else:
@@ -239,6 +253,7 @@ class JuejinSpider(BaseSpider):
                     self._like_blogs_total_page = total_pages
 
                 entry_list = self._response_data["d"]["entryList"]
+                self.task_progress.add_counters(pages=1, parsed=len(entry_list))
                 if len(entry_list) > 0:
                     for entry_data in entry_list:
                         if entry_data is None:
@@ -258,6 +273,7 @@ class JuejinSpider(BaseSpider):
                 page_no += 1
                 if page_no <= self._like_blogs_total_page:
                     # TODO 后面考虑多线程进行任务拆分，并发获取数据
+                    self.check_task_cancelled()
                     time.sleep(0.5)
                     self._parse_personal_like_blogs(page_no=page_no)
                 else:
@@ -277,12 +293,24 @@ class JuejinSpider(BaseSpider):
             raise ParseDataException()
 
     def _test_cookies(self, cookies: Optional[str] = None) -> bool:
-        params = self.get_data(spider_name=f"{self._spider_name}:params")
+        return self.probe_cookies(spider_name=self._spider_name, cookies=cookies)
+
+    @classmethod
+    def probe_cookies(cls, spider_name: str, cookies: Optional[str] = None) -> bool:
+        """
+        探测登录状态是否有效(CookieSweeper 巡检时直接调用，不需要创建爬虫实例)
+        掘金通过持久化的登录参数探测，不依赖 Cookie
+        :param spider_name: 爬虫名称
+        :param cookies: Cookie
+        :return: 是否有效
+        """
+        username: str = spider_name.split(":", 1)[-1]
+        params = RedisPipelineHandler().find_key(key=f"{spider_name}:params")
         if params is None:
             return False
         test_user_url: str = f"https://user-storage-api-ms.juejin.im/v1/getUserInfo{params}"
-        test_request_headers: Dict = self.get_default_headers()
-        test_response = self.make_request(
+        test_request_headers: Dict = cls.get_default_headers()
+        test_response = cls.make_request(
             url=test_user_url, headers=test_request_headers
         )
         if (
@@ -290,12 +318,11 @@ class JuejinSpider(BaseSpider):
             or check_is_json(test_response.content.decode()) is not True
         ):
             logger.error(f"当前掘金账号登录状态: 已退出!")
-            self._async_task.remove_async_scheduler(job_id=self._spider_name)
             return False
 
         test_json_response = test_response.json()
         if test_json_response["s"] == 1:
-            logger.info(f"当前掘金账号为: {self._login_username}, 状态: 已登录")
+            logger.info(f"当前掘金账号为: {username}, 状态: 已登录")
             return True
         else:
             logger.error(f"当前掘金账号登录状态: 已退出!")
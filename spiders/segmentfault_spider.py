@@ -7,7 +7,13 @@ from lxml import etree
 from utils.logger_utils import LogManager
 from config import LOG_LEVEL, PROCESS_STATUS_FAIL
 from utils.time_utils import handle_different_time_str
-from utils.exception_utils import LoginException, ParseDataException
+from utils.exception_utils import (
+    LoginException,
+    ParseDataException,
+    TaskCancelException,
+)
+from utils.progress_utils import TaskProgressPhase
+from pipeline.redis_pipeline import RedisPipelineHandler
 from spiders import BaseSpider, BaseSpiderParseMethodType, CookieUtils
 
 logger = LogManager(__name__).get_logger_and_add_handlers(
@@ -16,9 +22,9 @@ logger = LogManager(__name__).get_logger_and_add_handlers(
 
 
 class SegmentfaultSpider(BaseSpider):
-    def __init__(self, task_id: str, username: str, password: str):
-        self._main_url = "https://segmentfault.com"
+    _main_url: str = "https://segmentfault.com"
 
+    def __init__(self, task_id: str, username: str, password: str):
         self._task_id = task_id
         self._login_username = username
         self._login_password = password
@@ -27,7 +33,7 @@ class SegmentfaultSpider(BaseSpider):
 
         self._cookies: Optional[str] = None
 
-        super().__init__()
+        super().__init__(task_id=task_id, platform="segmentfault")
 
         self._cookies = self.get_cookies(spider_name=self._spider_name)
         self._user_url: Optional[str] = self.get_data(
@@ -67,13 +73,16 @@ class SegmentfaultSpider(BaseSpider):
 
     def parse_data_with_method(self, method: str):
         if method == BaseSpiderParseMethodType.LoginResult:
+            self.task_progress.start_phase(phase=TaskProgressPhase.PersonalData)
             self._parse_login_data()
         elif method == BaseSpiderParseMethodType.PersonalBlogs:
+            self.task_progress.start_phase(phase=TaskProgressPhase.PersonalBlogs)
             self._parse_personal_blogs()
         elif method == BaseSpiderParseMethodType.Finish:
             self.send_data()
 
     def login(self):
+        self.task_progress.start_phase(phase=TaskProgressPhase.Login)
         if self._cookies is None:
             token = self._get_token(url=self._main_url)
             if token is None:
@@ -215,7 +224,11 @@ class SegmentfaultSpider(BaseSpider):
         if blogs_response.status_code == 200:
             selector = etree.HTML(blogs_response.content.decode())
             try:
-                for blog in selector.xpath("//ul[@class='profile-mine__content']/li"):
+                blog_elements = selector.xpath(
+                    "//ul[@class='profile-mine__content']/li"
+                )
+                self.task_progress.add_counters(pages=1, parsed=len(blog_elements))
+                for blog in blog_elements:
                     # TODO 思否获取文章阅读量需要进入文章解析，暂不做支持
                     # count = (
                     #     blog.xpath(
@@ -246,6 +259,7 @@ class SegmentfaultSpider(BaseSpider):
 
                 next_page_element = selector.xpath("//li[@class='next']")
                 if len(next_page_element) > 0:
+                    self.check_task_cancelled()
                     time.sleep(1.5)
                     next_params += 1
                     self._parse_personal_blogs(next_params=next_params)
@@ -255,6 +269,8 @@ class SegmentfaultSpider(BaseSpider):
                     logger.info("获取个人博客数据成功!")
                 # 任务末尾
                 self.parse_data_with_method(method=BaseSpiderParseMethodType.Finish)
+            except TaskCancelException:
+                raise
             except (IndexError, Exception):
                 logger.error("解析个人博客数据异常!")
                 self.update_task_status(
@@ -269,28 +285,44 @@ class SegmentfaultSpider(BaseSpider):
             raise LoginException()
 
     def _test_cookies(self, cookies: Optional[str] = None) -> bool:
-        user_url = self.get_data(spider_name=f"{self._spider_name}:user_url")
-        test_user_url: str = f"{user_url}/about"
-        test_request_headers: Dict = self.get_default_headers()
         test_request_cookies = self._cookies
         if cookies is not None:
             test_request_cookies = cookies
+        return self.probe_cookies(
+            spider_name=self._spider_name, cookies=test_request_cookies
+        )
+
+    @classmethod
+    def probe_cookies(cls, spider_name: str, cookies: str) -> bool:
+        """
+        探测 Cookie 是否有效(CookieSweeper 巡检时直接调用，不需要创建爬虫实例)
+        :param spider_name: 爬虫名称
+        :param cookies: Cookie
+        :return: 是否有效
+        """
+        username: str = spider_name.split(":", 1)[-1]
+        user_url = RedisPipelineHandler().find_key(key=f"{spider_name}:user_url")
+        if user_url is None:
+            # 没有用户主页地址时无法探测，视为失效，重新登录后会重新保存
+            logger.info(f"当前思否账号为: {username}, 缺少用户主页地址, 视为未登录")
+            return False
+        test_user_url: str = f"{user_url}/about"
+        test_request_headers: Dict = cls.get_default_headers()
         test_request_headers.update(
             {
-                "cookie": test_request_cookies,
-                "origin": self._main_url,
-                "referer": self._main_url + "/",
+                "cookie": cookies,
+                "origin": cls._main_url,
+                "referer": cls._main_url + "/",
                 "x-requested-with": "XMLHttpRequest",
             }
         )
-        test_response = self.make_request(
+        test_response = cls.make_request(
             url=test_user_url, headers=test_request_headers
         )
         selector = etree.HTML(test_response.content.decode())
         title = "".join(selector.xpath("//title/text()"))
         if "登录" not in title:
-            logger.info(f"当前思否账号为: {self._login_username}, 状态: 已登录")
+            logger.info(f"当前思否账号为: {username}, 状态: 已登录")
             return True
         logger.error(f"当前思否登录状态: 已退出!")
-        self._async_task.remove_async_scheduler(job_id=self._spider_name)
         return False
@@ -1,5 +1,5 @@
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Union, Optional
 
 from urllib.parse import urlencode
 from requests.utils import dict_from_cookiejar
@@ -8,14 +8,17 @@ from requests_toolbelt import MultipartEncoder
 from utils.encrypt_utils import md5_str
 from utils.logger_utils import LogManager
 from utils.str_utils import check_is_json
-from captcha.zhihu_captcha import ZhihuCaptcha
 from config import LOG_LEVEL, PROCESS_STATUS_FAIL
 from utils.encrypt_utils import hmac_encrypt_sha1
-from utils.image_utils import image_base64_to_pillow
+from captcha.zhihu_captcha_service import ZhihuCaptchaClient
 from utils.exception_utils import LoginException, ParseDataException
+from utils.progress_utils import TaskProgressPhase
+from utils.trace_utils import trace_span
+from utils.metrics_utils import JS_SIGN_LATENCY
 from spiders import BaseSpider, BaseSpiderParseMethodType, CookieUtils
 from utils.time_utils import datetime_str_change_fmt, timestamp_to_datetime_str
-from utils.js_utils import compile_js, zhihu_encrypt_js_code, zhihu_zse86_js_code
+from utils.js_utils import call_js, zhihu_zse86_js_code
+from utils.zhihu_encrypt_utils import zhihu_encrypt
 
 logger = LogManager(__name__).get_logger_and_add_handlers(
     formatter_template=5, log_level_int=LOG_LEVEL
@@ -23,12 +26,17 @@ logger = LogManager(__name__).get_logger_and_add_handlers(
 
 
 class ZhiHuSpider(BaseSpider):
+    _main_url: str = "https://www.zhihu.com"
+    _partial_data_attr_map: Dict = {
+        "personalBlogs": "_blogs_data",
+        "personalLikeBlogs": "_blogs_collection_data",
+    }
+
     def __init__(self, task_id: str, username: str, password: str):
         self._task_id: str = task_id
         self._login_username: str = username
         self._login_password: str = password
 
-        self._main_url: str = "https://www.zhihu.com"
         self._signin_url: str = f"{self._main_url}/signin"
         self._login_url: str = f"{self._main_url}/api/v3/oauth/sign_in"
         self._captcha_url: str = f"{self._main_url}/api/v3/oauth/captcha?lang=en"
@@ -36,7 +44,7 @@ class ZhiHuSpider(BaseSpider):
         self._spider_name: str = f"zhihu:{self._login_username}"
         self._login_cookies: Optional[str] = None
 
-        super().__init__()
+        super().__init__(task_id=task_id, platform="zhihu")
 
         self._common_headers.update(
             {
@@ -68,9 +76,12 @@ class ZhiHuSpider(BaseSpider):
 
     def parse_data_with_method(self, method: str):
         if method == BaseSpiderParseMethodType.LoginResult:
+            self.task_progress.start_phase(phase=TaskProgressPhase.PersonalData)
             self._parse_login_data()
         elif method == BaseSpiderParseMethodType.PersonalBlogs:
+            self.task_progress.start_phase(phase=TaskProgressPhase.PersonalBlogs)
             self._parse_personal_blogs()
+            self.task_progress.start_phase(phase=TaskProgressPhase.PersonalLikeBlogs)
             self._parse_personal_collect_blogs()
         elif method == BaseSpiderParseMethodType.Finish:
             self.send_data()
@@ -99,11 +110,10 @@ class ZhiHuSpider(BaseSpider):
                 if check_is_json(data=response.content.decode()):
                     img_base64 = response.json()["img_base64"].replace("\\n", "")
 
-                    # 验证码识别
-                    captcha_model = ZhihuCaptcha()
-                    captcha_code = captcha_model.predict(
-                        img=image_base64_to_pillow(img_str=img_base64)
-                    )
+                    # 验证码识别(优先交给识别服务批量识别，服务不可用时在当前进程识别)
+                    captcha_client = ZhihuCaptchaClient()
+                    with trace_span(name="captcha"):
+                        captcha_code = captcha_client.predict(img_base64=img_base64)
                     post_data: dict = {"input_text": captcha_code}
                     data = MultipartEncoder(
                         fields=post_data, boundary="----WebKitFormBoundary"
@@ -125,7 +135,13 @@ class ZhiHuSpider(BaseSpider):
                         method="POST",
                     )
                     if check_is_json(response.content.decode()):
-                        if response.json().get("success"):
+                        is_verified: bool = bool(response.json().get("success"))
+                        captcha_client.report_result(
+                            img_base64=img_base64,
+                            captcha_code=captcha_code,
+                            is_verified=is_verified,
+                        )
+                        if is_verified:
                             return True
                         else:
                             logger.error(
@@ -148,6 +164,7 @@ class ZhiHuSpider(BaseSpider):
             return False
 
     def login(self):
+        self.task_progress.start_phase(phase=TaskProgressPhase.Login)
         if self._login_cookies is None:
             if self._init_login():
                 grant_type: str = "password"
@@ -171,8 +188,10 @@ class ZhiHuSpider(BaseSpider):
                     "timestamp": timestamp,
                     "signature": signature,
                 }
-                js_code = compile_js(js_str=zhihu_encrypt_js_code)
-                data = js_code.call("encrypt", urlencode(post_data))
+                with JS_SIGN_LATENCY.labels(function="encrypt").time(), trace_span(
+                    name="js_sign", detail="encrypt"
+                ):
+                    data = zhihu_encrypt(data=urlencode(post_data))
                 response = self.make_request_with_session(
                     session=self._session,
                     url=self._login_url,
@@ -269,8 +288,9 @@ class ZhiHuSpider(BaseSpider):
                 )
             )
 
-            js_code = compile_js(js_str=zhihu_zse86_js_code)
-            sign = js_code.call("b", md5_str(encrypt_str=f))
+            # x-zse-86 的 Python 实现还没有和真实 jsdom 的结果对比过，仍然执行原始脚本
+            with trace_span(name="js_sign", detail="b"):
+                sign = call_js(zhihu_zse86_js_code, "b", md5_str(encrypt_str=f))
 
             headers.update(
                 {
@@ -327,6 +347,9 @@ class ZhiHuSpider(BaseSpider):
         )
         if check_is_json(response.content.decode()):
             json_response = response.json()
+            self.task_progress.add_counters(
+                pages=1, parsed=len(json_response["data"])
+            )
             for blogs in json_response["data"]:
                 # 知乎的浏览者数据用赞同数代替
                 blog_data: Dict = {
@@ -341,6 +364,7 @@ class ZhiHuSpider(BaseSpider):
                 self._blogs_data.append(blog_data)
 
             if json_response["paging"]["is_end"] is not True:
+                self.check_task_cancelled()
                 time.sleep(0.5)
                 self._parse_personal_blogs(next_params=json_response["paging"]["next"])
             else:
@@ -382,6 +406,9 @@ class ZhiHuSpider(BaseSpider):
                     )
                     if check_is_json(data=inner_response.content.decode()):
                         inner_json_response = inner_response.json()
+                        self.task_progress.add_counters(
+                            pages=1, parsed=len(inner_json_response["data"])
+                        )
                         for data in inner_json_response["data"]:
                             create_time = datetime_str_change_fmt(
                                 time_str=data["created"], prev_fmt="%Y-%m-%dT%H:%M:%SZ"
@@ -408,6 +435,7 @@ class ZhiHuSpider(BaseSpider):
                             self._blogs_collection_data.append(blog_data)
 
                         if inner_json_response["paging"]["is_end"] is not True:
+                            self.check_task_cancelled()
                             time.sleep(1.5)
                             return inner_spider(
                                 c_id=c_id,
@@ -438,20 +466,33 @@ class ZhiHuSpider(BaseSpider):
             raise ParseDataException()
 
     def _test_cookies(self, cookies: Optional[str] = None) -> bool:
-        params: str = "visits_count"
-        test_user_url: str = f"{self._main_url}/api/v4/me?include={params}"
-        test_request_headers: Dict = self.get_default_headers()
         test_request_cookies = self._login_cookies
         if cookies is not None:
             test_request_cookies = cookies
+        return self.probe_cookies(
+            spider_name=self._spider_name, cookies=test_request_cookies
+        )
+
+    @classmethod
+    def probe_cookies(cls, spider_name: str, cookies: Union[str, Dict]) -> bool:
+        """
+        探测 Cookie 是否有效(CookieSweeper 巡检时直接调用，不需要创建爬虫实例)
+        :param spider_name: 爬虫名称
+        :param cookies: Cookie
+        :return: 是否有效
+        """
+        username: str = spider_name.split(":", 1)[-1]
+        params: str = "visits_count"
+        test_user_url: str = f"{cls._main_url}/api/v4/me?include={params}"
+        test_request_headers: Dict = cls.get_default_headers()
 
-        if isinstance(test_request_cookies, dict):
+        if isinstance(cookies, dict):
             test_request_headers.update(
-                Cookie=CookieUtils(cookie_list=test_request_cookies.items()).to_str()
+                Cookie=CookieUtils(cookie_list=cookies.items()).to_str()
             )
-        elif isinstance(test_request_cookies, str):
-            test_request_headers.update(Cookie=test_request_cookies)
-        test_response = self.make_request(
+        elif isinstance(cookies, str):
+            test_request_headers.update(Cookie=cookies)
+        test_response = cls.make_request(
             url=test_user_url, headers=test_request_headers
         )
         if (
@@ -459,7 +500,6 @@ class ZhiHuSpider(BaseSpider):
             or check_is_json(test_response.content.decode()) is not True
         ):
             logger.error(f"当前知乎登录状态: 已退出!")
-            self._async_task.remove_async_scheduler(job_id=self._spider_name)
             return False
 
         test_json_response = test_response.json()
@@ -468,6 +508,6 @@ class ZhiHuSpider(BaseSpider):
             return False
         else:
             logger.info(
-                f"当前知乎账号为: {self._login_username} 用户 ID: {test_json_response['id']}, 状态: 已登录"
+                f"当前知乎账号为: {username} 用户 ID: {test_json_response['id']}, 状态: 已登录"
             )
             return True
@@ -0,0 +1,22 @@
+import fakeredis
+from redis import ConnectionPool
+
+from pipeline.redis_pipeline import RedisPipeline, RedisClient, AsyncRedisClient
+
+
+def use_fake_redis() -> fakeredis.FakeServer:
+    """
+    把进程内共享的 Redis 连接池以及异步客户端替换成 fakeredis，每次调用都是一个新的空 Redis
+    :return: fakeredis 服务端
+    """
+    server = fakeredis.FakeServer()
+    RedisPipeline.redis_pool = ConnectionPool(
+        connection_class=fakeredis.FakeConnection,
+        server=server,
+        decode_responses=True,
+    )
+    RedisClient.redis_client = None
+    AsyncRedisClient.redis_client = fakeredis.FakeAsyncRedis(
+        server=server, decode_responses=True
+    )
+    return server
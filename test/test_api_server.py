@@ -0,0 +1,334 @@
+import json
+import asyncio
+
+from unittest import mock
+
+from nose.tools import assert_equal, assert_true
+from starlette.requests import Request
+from pymongo.errors import ServerSelectionTimeoutError
+
+from fake_redis import use_fake_redis
+from pipeline.redis_pipeline import RedisPipelineHandler, AsyncRedisPipelineHandler
+from utils.task_control_utils import get_cancel_key, get_credential_key
+from config import (
+    PROCESS_STATUS_FAIL,
+    PROCESS_STATUS_PENDING,
+    PROCESS_STATUS_RUNNING,
+    TASK_QUEUE_REDIS_KEY,
+    CODE_TO_STATUS_MAP,
+    BATCH_CHECK_MAX_SIZE,
+)
+import api_server
+from api_server import TaskRequest, parse_create_task_args
+
+
+def use_fake_app_redis() -> RedisPipelineHandler:
+    """
+    API 服务在导入时已经创建了异步 Redis 客户端，替换成 fakeredis 之后需要重新创建
+    """
+    use_fake_redis()
+    api_server.app_redis_handler = AsyncRedisPipelineHandler()
+    return RedisPipelineHandler()
+
+
+def cancel(job_id: str):
+    return asyncio.run(
+        api_server.cancel_task(
+            TaskRequest(taskType="cancel", taskArgs={"job_id": job_id})
+        )
+    )
+
+
+def test_cancel_task():
+    redis_handler = use_fake_app_redis()
+
+    # 不存在的任务
+    response = cancel("missing")
+    assert_equal(response.message, "Non exist task!")
+    assert_true(redis_handler.find_key(key=get_cancel_key(task_id="missing")) is None)
+
+    # 已经开始执行的任务
+    redis_handler.insert_key(
+        key="spider_task:running", value=str(PROCESS_STATUS_RUNNING)
+    )
+    response = cancel("running")
+    assert_equal(response.message, "Task is finished! Can not cancel!")
+    assert_true(redis_handler.find_key(key=get_cancel_key(task_id="running")) is None)
+
+    # 还在队列中的任务
+    redis_handler.insert_key(
+        key="spider_task:pending", value=str(PROCESS_STATUS_PENDING)
+    )
+    response = cancel("pending")
+    assert_equal(response.taskId, "pending")
+    assert_equal(redis_handler.find_key(key=get_cancel_key(task_id="pending")), "1")
+
+
+def test_create_task_clears_cancel_key():
+    redis_handler = use_fake_app_redis()
+    # 上一次执行被取消之后失败的任务
+    redis_handler.insert_key(key="spider_task:old", value=str(PROCESS_STATUS_FAIL))
+    redis_handler.insert_key(key=get_cancel_key(task_id="old"), value="1")
+    # 正在执行的任务的取消标记不能被删除
+    redis_handler.insert_key(
+        key="spider_task:running", value=str(PROCESS_STATUS_RUNNING)
+    )
+    redis_handler.insert_key(key=get_cancel_key(task_id="running"), value="1")
+
+    admit_keys = asyncio.run(
+        api_server.app_redis_handler.insert_keys_if_absent(
+            keys=["spider_task:old", "spider_task:running"],
+            value=str(PROCESS_STATUS_PENDING),
+            replace_value=str(PROCESS_STATUS_FAIL),
+            delete_keys={
+                "spider_task:old": get_cancel_key(task_id="old"),
+                "spider_task:running": get_cancel_key(task_id="running"),
+            },
+        )
+    )
+    assert_equal(admit_keys, ["spider_task:old"])
+    assert_true(redis_handler.find_key(key=get_cancel_key(task_id="old")) is None)
+    assert_equal(redis_handler.find_key(key=get_cancel_key(task_id="running")), "1")
+
+
+class FailingCursor:
+    """
+    迭代时连接 MongoDB 失败的游标
+    """
+
+    def __init__(self, docs):
+        self._docs = list(docs)
+        self.is_closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if len(self._docs) == 0:
+            raise ServerSelectionTimeoutError("No servers found")
+        return self._docs.pop(0)
+
+    async def close(self):
+        self.is_closed = True
+
+
+class FailingMongoHandler:
+    def __init__(self):
+        self.cursors = []
+
+    def find_cursor(self, col_name, **kwargs):
+        cursor = FailingCursor(docs=[{"blogId": 1}])
+        self.cursors.append(cursor)
+        return cursor
+
+
+def test_task_result_stream_mongo_error():
+    mongo_handler = FailingMongoHandler()
+    api_server.app_mongo_handler = mongo_handler
+
+    async def read_stream():
+        return [
+            chunk
+            async for chunk in api_server.task_result_stream(
+                task_id="task-1",
+                data_types=["personalBlogs", "personalLikeBlogs"],
+                col_show={"_id": 0},
+                skip=0,
+                limit=0,
+            )
+        ]
+
+    try:
+        lines = "".join(asyncio.run(read_stream())).splitlines()
+    finally:
+        api_server.app_mongo_handler = None
+    # 已经读取到的数据之后输出一行错误信息，然后继续输出下一种数据
+    assert_equal(
+        [json.loads(line) for line in lines],
+        [
+            {"dataType": "personalBlogs", "data": {"blogId": 1}},
+            {"dataType": "personalBlogs", "error": "MongoDB error!"},
+            {"dataType": "personalLikeBlogs", "data": {"blogId": 1}},
+            {"dataType": "personalLikeBlogs", "error": "MongoDB error!"},
+        ],
+    )
+    assert_true(all(cursor.is_closed for cursor in mongo_handler.cursors))
+
+
+def get_task_id(spider_name: str, username: str, password: str) -> str:
+    task_dict, _ = parse_create_task_args(
+        task_args={
+            "spiderName": spider_name,
+            "username": username,
+            "password": password,
+        }
+    )
+    return task_dict["taskId"]
+
+
+def batch_create(tasks):
+    request = Request(
+        scope={"type": "http", "client": ("127.0.0.1", 12345), "headers": []}
+    )
+    # 限流依赖 Redis 的 Lua 脚本，这里只测试接口本身
+    with mock.patch.object(api_server.limiter, "enabled", False):
+        return asyncio.run(
+            api_server.batch_create_task(
+                request, TaskRequest(taskType="batchCreate", taskArgs={"tasks": tasks})
+            )
+        )
+
+
+def find_quota_used(redis_handler: RedisPipelineHandler) -> int:
+    keys = redis_handler.get_redis_instance().keys("batch_create_quota:127.0.0.1:*")
+    if len(keys) == 0:
+        return 0
+    return int(redis_handler.find_key(key=keys[0]))
+
+
+def test_batch_create_mixed_tasks():
+    redis_handler = use_fake_app_redis()
+    running_id = get_task_id("juejin", "running", "pwd")
+    fail_id = get_task_id("juejin", "fail", "pwd")
+    redis_handler.insert_key(
+        key=f"spider_task:{running_id}", value=str(PROCESS_STATUS_RUNNING)
+    )
+    redis_handler.insert_key(
+        key=f"spider_task:{fail_id}", value=str(PROCESS_STATUS_FAIL)
+    )
+
+    tasks = [
+        {"spiderName": "juejin", "username": "new", "password": "pwd"},
+        {"spiderName": "unknown", "username": "new", "password": "pwd"},
+        {"spiderName": "JueJin", "username": "new", "password": "pwd"},
+        {"spiderName": "juejin", "username": "running", "password": "pwd"},
+        {"spiderName": "juejin", "username": "fail", "password": "pwd"},
+        {"spiderName": "juejin", "username": "no-password"},
+    ]
+    response = batch_create(tasks)
+    new_id = get_task_id("juejin", "new", "pwd")
+    assert_equal(response.code, "000000")
+    assert_equal(response.data["created"], 2)
+    assert_equal(
+        [(result["taskId"], result["result"]) for result in response.data["results"]],
+        [
+            (new_id, "created"),
+            (None, "ErrorTaskArgs - spiderName is Error"),
+            (new_id, "duplicate"),
+            (running_id, "exist"),
+            (fail_id, "created"),
+            (None, "ErrorTaskArgs"),
+        ],
+    )
+    assert_equal(
+        redis_handler.find_key(key=f"spider_task:{new_id}"), str(PROCESS_STATUS_PENDING)
+    )
+    assert_equal(
+        redis_handler.find_key(key=f"spider_task:{running_id}"),
+        str(PROCESS_STATUS_RUNNING),
+    )
+    assert_equal(
+        redis_handler.find_key(key=f"spider_task:{fail_id}"),
+        str(PROCESS_STATUS_PENDING),
+    )
+    # 只有创建的任务写入任务队列以及占用配额
+    assert_equal(redis_handler.find_list_length(key=TASK_QUEUE_REDIS_KEY), 2)
+    assert_equal(find_quota_used(redis_handler), 2)
+    assert_equal(
+        redis_handler.find_hash(key=get_credential_key(task_id=new_id)),
+        {"username": "new", "password": "pwd"},
+    )
+
+
+def test_batch_create_quota_exceeded():
+    redis_handler = use_fake_app_redis()
+    with mock.patch.object(api_server, "BATCH_CREATE_QUOTA", 3):
+        response = batch_create(
+            [
+                {"spiderName": "csdn", "username": f"user{i}", "password": "pwd"}
+                for i in range(2)
+            ]
+        )
+        assert_equal(response.data["created"], 2)
+
+        response = batch_create(
+            [
+                {"spiderName": "csdn", "username": f"user{i}", "password": "pwd"}
+                for i in range(2, 4)
+            ]
+        )
+    assert_true(response.message.startswith("Quota exceeded!"))
+    # 超出配额时回滚预扣的配额，不创建任何任务
+    assert_equal(find_quota_used(redis_handler), 2)
+    for i in range(2, 4):
+        task_id = get_task_id("csdn", f"user{i}", "pwd")
+        assert_equal(redis_handler.find_key(key=f"spider_task:{task_id}"), None)
+    assert_equal(redis_handler.find_list_length(key=TASK_QUEUE_REDIS_KEY), 2)
+
+
+def test_batch_create_push_failed():
+    redis_handler = use_fake_app_redis()
+    push = api_server.app_redis_handler.insert_keys_and_push_list
+
+    async def fail_on_queue(mapping, **kwargs):
+        if len(kwargs["values"]) > 0:
+            return False
+        return await push(mapping, **kwargs)
+
+    with mock.patch.object(
+        api_server.app_redis_handler, "insert_keys_and_push_list", fail_on_queue
+    ):
+        response = batch_create(
+            [{"spiderName": "zhihu", "username": "user", "password": "pwd"}]
+        )
+    assert_equal(response.message, "Redis error!")
+    # 写入队列失败的任务设置为失败(可以重新创建)，配额退回
+    task_id = get_task_id("zhihu", "user", "pwd")
+    assert_equal(
+        redis_handler.find_key(key=f"spider_task:{task_id}"), str(PROCESS_STATUS_FAIL)
+    )
+    assert_equal(find_quota_used(redis_handler), 0)
+
+
+def batch_check(job_ids):
+    return asyncio.run(
+        api_server.batch_check_task(
+            TaskRequest(taskType="batchCheck", taskArgs={"job_ids": job_ids})
+        )
+    )
+
+
+def test_batch_check_task():
+    redis_handler = use_fake_app_redis()
+    for code in CODE_TO_STATUS_MAP:
+        redis_handler.insert_key(key=f"spider_task:task-{code}", value=str(code))
+
+    job_ids = [f"task-{code}" for code in CODE_TO_STATUS_MAP] + ["missing"]
+    response = batch_check(job_ids)
+    assert_equal(response.code, "000000")
+    expected = {
+        f"task-{code}": {"code": str(code), "status": status}
+        for code, status in CODE_TO_STATUS_MAP.items()
+    }
+    # 不存在的任务为 null
+    expected["missing"] = None
+    assert_equal(response.data, expected)
+    assert_equal(
+        [response.data[f"task-{code}"]["status"] for code in (20, 50)],
+        ["PENDING", "FAIL"],
+    )
+
+
+def test_batch_check_task_size_limit():
+    use_fake_app_redis()
+    response = batch_check([f"task-{i}" for i in range(BATCH_CHECK_MAX_SIZE)])
+    assert_equal(response.code, "000000")
+    assert_equal(len(response.data), BATCH_CHECK_MAX_SIZE)
+
+    response = batch_check([f"task-{i}" for i in range(BATCH_CHECK_MAX_SIZE + 1)])
+    assert_equal(
+        response.message,
+        f"ErrorTaskArgs - job_ids is limited to {BATCH_CHECK_MAX_SIZE}",
+    )
+    assert_equal(response.data, None)
+    assert_equal(batch_check([]).message, "ErrorTaskArgs")
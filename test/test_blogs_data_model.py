@@ -0,0 +1,93 @@
+import mongomock
+from nose.tools import assert_equal
+
+from fake_redis import use_fake_redis
+from pipeline.mongodb_pipeline import MongoDBPipeline
+from spiders import BlogsDataModel, mongo_index_col_name_set
+from utils.progress_utils import TaskProgress, TaskProgressPhase
+from utils.trace_utils import TaskTracer, get_trace_key, parse_trace_spans
+from pipeline.redis_pipeline import RedisPipelineHandler
+from config import MongoDBConfig
+
+
+def use_mongomock() -> mongomock.MongoClient:
+    client = mongomock.MongoClient()
+    MongoDBPipeline.mongo_client = client
+    mongo_index_col_name_set.clear()
+    return client
+
+
+def test_mongo_index_once_per_collection():
+    use_fake_redis()
+    client = use_mongomock()
+    col_instance = client[MongoDBConfig["database"]]["c_personal_blogs"]
+    # 旧版本的唯一索引
+    col_instance.create_index([("blogId", 1)], unique=True)
+
+    data_model = BlogsDataModel(task_id="task-1")
+    data_model.set_personal_blogs_data(data=[{"blogId": 1}, {"blogId": 2}])
+    data_model._deal_data()
+    assert_equal(
+        sorted(col_instance.index_information().keys()), ["_id_", "taskId_1_blogId_1"]
+    )
+
+    # 之后的写入不再检查索引
+    col_instance.create_index([("blogId", 1)], unique=True)
+    data_model = BlogsDataModel(task_id="task-2")
+    data_model.set_personal_blogs_data(data=[{"blogId": 1}])
+    data_model._deal_data()
+    assert_equal(
+        sorted(col_instance.index_information().keys()),
+        ["_id_", "blogId_1", "taskId_1_blogId_1"],
+    )
+    assert_equal(col_instance.count_documents({}), 2)
+
+
+def test_finish_after_data_written():
+    use_fake_redis()
+    client = use_mongomock()
+    col_instance = client[MongoDBConfig["database"]]["c_personal_blogs"]
+    task_progress = TaskProgress(task_id="task-1")
+    published_phases = []
+
+    def start_phase(phase):
+        published_phases.append((phase, col_instance.count_documents({})))
+
+    task_progress.start_phase = start_phase
+    data_model = BlogsDataModel(task_id="task-1", task_progress=task_progress)
+    data_model.set_personal_blogs_data(data=[{"blogId": 1}, {"blogId": 2}])
+    data_model.push_data()
+    # 发布 Finish 时数据已经写入
+    assert_equal(published_phases, [(TaskProgressPhase.Finish, 2)])
+
+    task_progress = TaskProgress(task_id="task-2")
+    published_phases = []
+    task_progress.start_phase = start_phase
+    data_model = BlogsDataModel(task_id="task-2", task_progress=task_progress)
+    data_model.set_personal_blogs_data(data=[{"blogId": 1}])
+    data_model.push_data(is_interrupted=True)
+    assert_equal(published_phases, [(TaskProgressPhase.Interrupted, 3)])
+
+
+def test_mongo_write_span():
+    use_fake_redis()
+    use_mongomock()
+    tracer = TaskTracer(task_id="task-1")
+    tracer.start_phase(phase=TaskProgressPhase.SendData)
+    data_model = BlogsDataModel(task_id="task-1", tracer=tracer)
+    data_model.set_personal_blogs_data(data=[{"blogId": 1}])
+    data_model.push_data()
+    tracer.finish()
+    trace = parse_trace_spans(
+        raw_spans=RedisPipelineHandler()
+        .get_redis_instance()
+        .lrange(get_trace_key(task_id="task-1"), 0, -1)
+    )
+    # 写入数据的线程中记录的 span 属于 SendData 阶段
+    assert_equal(
+        [(span["name"], span.get("detail")) for span in trace["spans"]],
+        [
+            (TaskProgressPhase.SendData, None),
+            ("mongo_write", "c_personal_blogs"),
+        ],
+    )
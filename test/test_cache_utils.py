@@ -0,0 +1,26 @@
+import time
+
+from nose.tools import assert_equal
+
+from utils.cache_utils import LRUCache
+
+
+def test_lru_cache_evict_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set(key="a", value="1")
+    cache.set(key="b", value="2")
+    # 访问 a 之后 b 变成最久未使用的数据
+    assert_equal(cache.get(key="a"), "1")
+    cache.set(key="c", value="3")
+    assert_equal(cache.get(key="b"), None)
+    assert_equal(cache.get(key="a"), "1")
+    assert_equal(cache.get(key="c"), "3")
+
+
+def test_lru_cache_expire():
+    cache = LRUCache(max_size=10, ttl_seconds=0.05)
+    cache.set(key="a", value="1")
+    cache.set(key="b", value="2", ttl_seconds=10)
+    time.sleep(0.1)
+    assert_equal(cache.get(key="a"), None)
+    assert_equal(cache.get(key="b"), "2")
@@ -0,0 +1,87 @@
+import time
+import threading
+from unittest import mock
+
+from nose.tools import assert_equal, assert_true
+
+from fake_redis import use_fake_redis
+from pipeline.redis_pipeline import RedisPipelineHandler
+from utils import cookie_sweeper_utils
+from utils.cookie_sweeper_utils import CookieSweeper, redis_cookie_check_key_prefix
+
+sorted_set_key: str = f"{redis_cookie_check_key_prefix}:juejin"
+
+
+def setup_due_accounts(spider_names) -> RedisPipelineHandler:
+    use_fake_redis()
+    redis_handler = RedisPipelineHandler()
+    for name in spider_names:
+        redis_handler.insert_key(key=name, value=f"cookie-{name}")
+        redis_handler.insert_key(key=f"{name}:params", value="params")
+        redis_handler.insert_key(key=f"{name}:token", value="token")
+    # 已经到期的巡检记录
+    redis_handler.insert_sorted_set(
+        key=sorted_set_key, mapping={name: time.time() - 1 for name in spider_names}
+    )
+    return redis_handler
+
+
+def test_concurrent_sweepers_claim_once():
+    spider_names = [f"juejin:user{i}" for i in range(20)]
+    setup_due_accounts(spider_names)
+    probed_names = []
+    lock = threading.Lock()
+
+    def probe(spider_name: str, cookies: str) -> bool:
+        with lock:
+            probed_names.append(spider_name)
+        return True
+
+    sweepers = [CookieSweeper(platform="juejin", probe=probe) for _ in range(2)]
+    # 每次只认领几个账号，两个巡检进程交替认领
+    with mock.patch.object(cookie_sweeper_utils, "COOKIE_SWEEP_BATCH_SIZE", 3):
+
+        def sweep_all(sweeper: CookieSweeper):
+            while sweeper.sweep() > 0:
+                pass
+
+        threads = [
+            threading.Thread(target=sweep_all, args=(sweeper,)) for sweeper in sweepers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+    assert_equal(sorted(probed_names), sorted(spider_names))
+
+
+def test_invalid_cookie_evicted_with_data():
+    redis_handler = setup_due_accounts(["juejin:valid", "juejin:invalid"])
+    sweeper = CookieSweeper(
+        platform="juejin", probe=lambda name, cookies: name == "juejin:valid"
+    )
+    assert_equal(sweeper.sweep(), 2)
+
+    for key in ["juejin:invalid", "juejin:invalid:params", "juejin:invalid:token"]:
+        assert_equal(redis_handler.find_key(key=key), None)
+    redis_instance = redis_handler.get_redis_instance()
+    assert_equal(redis_instance.zscore(sorted_set_key, "juejin:invalid"), None)
+
+    # 有效的账号保留登录数据，推迟到下一次巡检
+    assert_equal(redis_handler.find_key(key="juejin:valid"), "cookie-juejin:valid")
+    assert_equal(redis_handler.find_key(key="juejin:valid:token"), "token")
+    assert_true(redis_instance.zscore(sorted_set_key, "juejin:valid") > time.time())
+
+
+def test_probe_exception_counts_as_valid():
+    redis_handler = setup_due_accounts(["juejin:user"])
+
+    def probe(spider_name: str, cookies: str) -> bool:
+        raise ConnectionError("network error")
+
+    assert_equal(CookieSweeper(platform="juejin", probe=probe).sweep(), 1)
+    # 探测异常时不清理 Cookie，等待下一次巡检
+    assert_equal(redis_handler.find_key(key="juejin:user"), "cookie-juejin:user")
+    assert_equal(redis_handler.find_key(key="juejin:user:params"), "params")
+    redis_instance = redis_handler.get_redis_instance()
+    assert_true(redis_instance.zscore(sorted_set_key, "juejin:user") > time.time())
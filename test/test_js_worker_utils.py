@@ -0,0 +1,148 @@
+import os
+import time
+import shutil
+import unittest
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from nose.tools import assert_equal, assert_true, assert_raises
+
+from config import NODE_BIN_PATH, NPM_ROOT_PATH, JS_WORKER_POOL_SIZE
+from utils.js_utils import call_js, zhihu_zse86_js_code
+from utils.js_worker_utils import NodeWorker, JSWorkerPool
+from utils.encrypt_utils import md5_str
+from utils.exception_utils import JSWorkerException
+
+# 只输出半行然后卡住的脚本
+half_line_js_code: str = """
+function hang() {
+    require("process").stdout.write('{"id": 1, "res');
+    while (true) {}
+}
+function add(a, b) { return a + b; }
+"""
+
+
+def skip_without_node():
+    if shutil.which(NODE_BIN_PATH) is None:
+        raise unittest.SkipTest("Node.js is not installed")
+
+
+def test_node_worker_half_line_timeout():
+    skip_without_node()
+    worker = NodeWorker()
+    try:
+        assert_equal(worker.call(half_line_js_code, "add", [1, 2], timeout=10), 3)
+        start_time = time.monotonic()
+        with assert_raises(JSWorkerException):
+            worker.call(half_line_js_code, "hang", [], timeout=1)
+        # 半行输出不会让读取阻塞到超时之后
+        assert_true(time.monotonic() - start_time < 5)
+        assert_true(worker.is_broken)
+    finally:
+        worker.close()
+
+
+worker_js_code: str = """
+function pid() { return require("process").pid; }
+function add(a, b) { return a + b; }
+function fail() { throw new Error("boom"); }
+function crash() { require("process").exit(3); }
+function garbage() {
+    require("process").stdout.write("not json\\n");
+    return 1;
+}
+function slow(ms) {
+    const start = Date.now();
+    while (Date.now() - start < ms) {}
+    return [start, Date.now()];
+}
+"""
+
+
+def test_node_worker_js_exception_keeps_worker():
+    skip_without_node()
+    worker = NodeWorker()
+    try:
+        # 第一次调用就抛出异常时脚本也已经加载，之后的调用不再发送脚本
+        with assert_raises(JSWorkerException) as context:
+            worker.call(worker_js_code, "fail", [], timeout=10)
+        assert_true("boom" in context.exception.message)
+        assert_true(worker.is_alive and not worker.is_broken)
+        assert_equal(len(worker._loaded_scripts), 1)
+        assert_equal(worker.call(worker_js_code, "add", [1, 2], timeout=10), 3)
+    finally:
+        worker.close()
+
+
+def test_node_worker_invalid_output():
+    skip_without_node()
+    worker = NodeWorker()
+    try:
+        with assert_raises(JSWorkerException):
+            worker.call(worker_js_code, "garbage", [], timeout=10)
+        assert_true(worker.is_broken)
+    finally:
+        worker.close()
+
+
+def test_pool_js_exception_keeps_worker():
+    skip_without_node()
+    pool = JSWorkerPool()
+    worker_pid = pool.call(worker_js_code, "pid")
+    with assert_raises(JSWorkerException):
+        pool.call(worker_js_code, "fail")
+    # 抛出异常的进程放回进程池继续使用
+    assert_equal(pool.call(worker_js_code, "pid"), worker_pid)
+
+
+def test_pool_restart_after_crash():
+    skip_without_node()
+    pool = JSWorkerPool()
+    worker_pid = pool.call(worker_js_code, "pid")
+    with assert_raises(JSWorkerException):
+        pool.call(worker_js_code, "crash")
+    # 退出的进程被丢弃，下一次调用启动新的进程
+    new_worker_pid = pool.call(worker_js_code, "pid")
+    assert_true(new_worker_pid != worker_pid)
+    assert_equal(pool.call(worker_js_code, "add", 1, 2), 3)
+
+
+def test_pool_concurrency_limit():
+    skip_without_node()
+    pool = JSWorkerPool()
+    call_count: int = JS_WORKER_POOL_SIZE * 3
+    with ThreadPoolExecutor(max_workers=call_count) as executor:
+        spans = list(
+            executor.map(
+                lambda _: pool.call(worker_js_code, "slow", 200, timeout=60),
+                range(call_count),
+            )
+        )
+    # 任意时刻同时执行的调用不超过进程池大小
+    max_running: int = max(
+        sum(1 for start, end in spans if start <= point < end) for point, _ in spans
+    )
+    assert_true(max_running <= JS_WORKER_POOL_SIZE)
+    assert_true(pool._idle_workers.qsize() <= JS_WORKER_POOL_SIZE)
+
+
+def test_pool_loads_zse86_script_like_execjs():
+    """
+    在 vm 上下文中加载需要 jsdom 的 x-zse-86 脚本，结果需要和 execjs 执行的结果一致
+    """
+    skip_without_node()
+    env = dict(os.environ, NODE_PATH=NPM_ROOT_PATH)
+    if (
+        subprocess.run(
+            [NODE_BIN_PATH, "-e", 'require.resolve("jsdom")'], env=env
+        ).returncode
+        != 0
+    ):
+        raise unittest.SkipTest("jsdom is not installed")
+    cases = [md5_str(encrypt_str=str(i)) for i in range(20)]
+    pool = JSWorkerPool()
+    assert_equal(
+        [pool.call(zhihu_zse86_js_code, "b", case) for case in cases],
+        [call_js(zhihu_zse86_js_code, "b", case) for case in cases],
+    )
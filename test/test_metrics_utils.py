@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+import subprocess
+
+from nose.tools import assert_equal
+
+project_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 模拟一个容器启动：主机名为 hostname 的进程清空目录后记录一次指标
+container_code = """
+import socket
+socket.gethostname = lambda: {hostname!r}
+
+from utils.metrics_dir_utils import init_metrics_multiproc_dir
+
+init_metrics_multiproc_dir(clear=True)
+
+from utils.metrics_utils import JS_WORKER_START_COUNTER
+
+JS_WORKER_START_COUNTER.inc()
+"""
+
+collect_code = """
+from utils.metrics_utils import generate_metrics
+
+for line in generate_metrics().decode().splitlines():
+    if line.startswith("blogs_crawler_js_worker_starts_total"):
+        print(line.split()[-1])
+"""
+
+
+def run_python(code: str, metrics_dir: str) -> str:
+    env = dict(os.environ, METRICS_MULTIPROC_DIR=metrics_dir)
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=project_path,
+        env=env,
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout.decode()
+
+
+def test_metrics_multiproc_dir_per_container():
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        run_python(container_code.format(hostname="web"), metrics_dir)
+        run_python(container_code.format(hostname="worker"), metrics_dir)
+        # 容器重启时清空自己上一次留下的指标文件，不影响其他容器
+        run_python(container_code.format(hostname="worker"), metrics_dir)
+        assert_equal(sorted(os.listdir(metrics_dir)), ["web", "worker"])
+        assert_equal(run_python(collect_code, metrics_dir).strip(), "2.0")
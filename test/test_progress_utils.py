@@ -0,0 +1,41 @@
+import json
+
+from nose.tools import assert_equal
+
+from fake_redis import use_fake_redis
+from pipeline.redis_pipeline import RedisPipelineHandler
+from utils.progress_utils import (
+    TaskProgress,
+    TaskProgressPhase,
+    get_progress_key,
+    parse_progress_snapshot,
+)
+
+
+def test_task_progress_interrupt():
+    use_fake_redis()
+    redis_handler = RedisPipelineHandler()
+    task_progress = TaskProgress(task_id="task-1", platform="juejin")
+    task_progress.start_phase(phase=TaskProgressPhase.SendData)
+    task_progress.interrupt()
+    snapshot = redis_handler.find_hash(key=get_progress_key(task_id="task-1"))
+    # 中断的任务放回了任务队列，不能发布 Finish
+    assert_equal(snapshot["phase"], TaskProgressPhase.Interrupted)
+    task_progress.finish()
+    snapshot = redis_handler.find_hash(key=get_progress_key(task_id="task-1"))
+    assert_equal(snapshot["phase"], TaskProgressPhase.Finish)
+
+
+def test_progress_snapshot_types():
+    use_fake_redis()
+    redis_handler = RedisPipelineHandler()
+    task_progress = TaskProgress(task_id="task-1", platform="juejin")
+    task_progress.start_phase(phase=TaskProgressPhase.PersonalBlogs)
+    task_progress.add_counters(pages=1, parsed=20)
+    task_progress.start_phase(phase=TaskProgressPhase.SendData)
+    snapshot = redis_handler.find_hash(key=get_progress_key(task_id="task-1"))
+    # 快照与发布的进度(JSON)类型一致
+    assert_equal(
+        parse_progress_snapshot(snapshot=snapshot),
+        json.loads(json.dumps(task_progress.to_dict())),
+    )
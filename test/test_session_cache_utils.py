@@ -0,0 +1,116 @@
+import json
+import time
+
+from nose.tools import assert_equal, assert_true
+
+from fake_redis import use_fake_redis
+from pipeline.redis_pipeline import RedisPipelineHandler
+from utils.session_cache_utils import (
+    SessionLocalCache,
+    SessionCacheHandler,
+    process_cache_id,
+    redis_session_invalidate_channel,
+)
+
+
+def setup_session_cache():
+    use_fake_redis()
+    SessionLocalCache.local_cache = None
+    return SessionCacheHandler(), RedisPipelineHandler()
+
+
+def wait_until(condition, timeout: float = 3.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def publish(redis_handler, origin: str, keys):
+    redis_handler.publish_message(
+        channel=redis_session_invalidate_channel,
+        message=json.dumps({"origin": origin, "keys": keys}),
+    )
+
+
+def test_session_cache_set_get_layering():
+    cache, redis_handler = setup_session_cache()
+    assert_true(cache.set(key="juejin:a", value="cookie-a"))
+    assert_equal(redis_handler.find_key(key="juejin:a"), "cookie-a")
+    # 直接修改 Redis 之后仍然读到本地缓存中的值
+    redis_handler.insert_key(key="juejin:a", value="cookie-b")
+    assert_equal(cache.get(key="juejin:a"), "cookie-a")
+    # 本地缓存没有时从 Redis 读取并写回本地缓存
+    redis_handler.insert_key(key="juejin:b", value="cookie-b")
+    assert_equal(cache.get(key="juejin:b"), "cookie-b")
+    redis_handler.remove_keys(keys=["juejin:b"])
+    assert_equal(cache.get(key="juejin:b"), "cookie-b")
+
+
+def test_session_cache_prefetch():
+    cache, redis_handler = setup_session_cache()
+    redis_handler.insert_key(key="zhihu:a", value="1")
+    redis_handler.insert_key(key="zhihu:b", value="2")
+    cache.prefetch(keys=["zhihu:a", "zhihu:b", "zhihu:c"])
+    redis_handler.remove_keys(keys=["zhihu:a", "zhihu:b"])
+    assert_equal(cache.get(key="zhihu:a"), "1")
+    assert_equal(cache.get(key="zhihu:b"), "2")
+    assert_equal(cache.get(key="zhihu:c"), None)
+
+
+def test_session_cache_invalidate_from_other_process():
+    cache, redis_handler = setup_session_cache()
+    cache.set(key="csdn:a", value="old")
+    redis_handler.insert_key(key="csdn:a", value="new")
+    publish(redis_handler, origin="other-process", keys=["csdn:a"])
+    assert_true(wait_until(lambda: cache.get(key="csdn:a") == "new"))
+
+
+def test_session_cache_ignore_own_invalidate():
+    cache, redis_handler = setup_session_cache()
+    cache.set(key="csdn:a", value="old")
+    redis_handler.insert_key(key="csdn:a", value="new")
+    publish(redis_handler, origin=process_cache_id, keys=["csdn:a"])
+    # 其他进程的通知在自己的通知之后发出，处理完它说明自己的通知已经被忽略
+    redis_handler.insert_key(key="csdn:b", value="new")
+    cache.set(key="csdn:b", value="old")
+    redis_handler.insert_key(key="csdn:b", value="new")
+    publish(redis_handler, origin="other-process", keys=["csdn:b"])
+    assert_true(wait_until(lambda: cache.get(key="csdn:b") == "new"))
+    assert_equal(cache.get(key="csdn:a"), "old")
+
+
+def test_session_cache_invalidate_publish():
+    cache, redis_handler = setup_session_cache()
+    pubsub = redis_handler.subscribe_channel(channel=redis_session_invalidate_channel)
+    cache.set(key="segmentfault:a", value="1")
+    cache.invalidate(keys=["segmentfault:a", "segmentfault:a:user_url"])
+    data_list = []
+    deadline = time.time() + 3
+    while len(data_list) < 2 and time.time() < deadline:
+        message = pubsub.get_message(timeout=0.1)
+        if message is not None:
+            data_list.append(json.loads(message["data"]))
+    pubsub.close()
+    assert_equal(
+        data_list,
+        [
+            {"origin": process_cache_id, "keys": ["segmentfault:a"]},
+            {
+                "origin": process_cache_id,
+                "keys": ["segmentfault:a", "segmentfault:a:user_url"],
+            },
+        ],
+    )
+
+
+def test_session_cache_clear_on_listener_error():
+    cache, redis_handler = setup_session_cache()
+    cache.set(key="juejin:a", value="old")
+    redis_handler.insert_key(key="juejin:a", value="new")
+    redis_handler.publish_message(
+        channel=redis_session_invalidate_channel, message="not json"
+    )
+    assert_true(wait_until(lambda: cache.get(key="juejin:a") == "new"))
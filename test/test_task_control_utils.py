@@ -0,0 +1,73 @@
+import json
+import asyncio
+
+from nose.tools import assert_equal, assert_true
+
+from fake_redis import use_fake_redis
+from pipeline.redis_pipeline import RedisPipelineHandler, AsyncRedisPipelineHandler
+from utils.task_control_utils import get_credential_key, split_task_credential
+from config import TASK_QUEUE_REDIS_KEY, TASK_CREDENTIAL_EXPIRE_SECONDS
+
+
+def test_task_credential_not_in_queue():
+    use_fake_redis()
+    redis_handler = RedisPipelineHandler()
+    task_dict = {
+        "taskId": "task-1",
+        "spider": "juejin",
+        "username": "user",
+        "password": "secret",
+    }
+    task_message, credential = split_task_credential(task_dict=task_dict)
+    credential_key = get_credential_key(task_id="task-1")
+    assert_true(
+        redis_handler.insert_keys_and_push_list(
+            mapping={"spider_task:task-1": "0"},
+            list_key=TASK_QUEUE_REDIS_KEY,
+            values=[task_message],
+            hash_mapping={credential_key: credential},
+            hash_expire_seconds=TASK_CREDENTIAL_EXPIRE_SECONDS,
+        )
+    )
+
+    queued = redis_handler.pop_list_blocking(key=TASK_QUEUE_REDIS_KEY, timeout=1)
+    assert_true("secret" not in queued)
+    queued_dict = json.loads(queued)
+    assert_equal(queued_dict["taskId"], "task-1")
+    assert_equal(queued_dict["spider"], "juejin")
+    assert_true("username" not in queued_dict and "password" not in queued_dict)
+    assert_true(0 < redis_handler.get_redis_instance().ttl(credential_key))
+
+    # 读取之后凭据立即删除
+    assert_equal(
+        redis_handler.pop_hash(key=credential_key),
+        {"username": "user", "password": "secret"},
+    )
+    assert_equal(redis_handler.pop_hash(key=credential_key), {})
+
+
+def test_insert_keys_if_absent():
+    use_fake_redis()
+    redis_handler = RedisPipelineHandler()
+    async_redis_handler = AsyncRedisPipelineHandler()
+    redis_handler.insert_key(key="spider_task:running", value="2")
+    redis_handler.insert_key(key="spider_task:fail", value="-1")
+
+    async def admit(keys):
+        return await async_redis_handler.insert_keys_if_absent(
+            keys=keys, value="0", replace_value="-1"
+        )
+
+    admit_keys = asyncio.run(
+        admit(["spider_task:new", "spider_task:running", "spider_task:fail"])
+    )
+    assert_equal(sorted(admit_keys), ["spider_task:fail", "spider_task:new"])
+    assert_equal(redis_handler.find_key(key="spider_task:running"), "2")
+    assert_equal(redis_handler.find_key(key="spider_task:fail"), "0")
+
+    # 同时创建同一个任务时只有一个请求成功
+    async def admit_concurrently():
+        return await asyncio.gather(*[admit(["spider_task:same"]) for _ in range(10)])
+
+    results = asyncio.run(admit_concurrently())
+    assert_equal(sum(len(result) for result in results), 1)
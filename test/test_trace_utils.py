@@ -0,0 +1,100 @@
+import json
+
+from nose.tools import assert_equal, assert_true
+
+from fake_redis import use_fake_redis
+from pipeline.redis_pipeline import RedisPipelineHandler
+from utils.trace_utils import (
+    TaskTracer,
+    trace_span,
+    trace_phase,
+    get_trace_key,
+    parse_trace_spans,
+)
+
+
+def find_spans(redis_handler: RedisPipelineHandler, task_id: str):
+    return redis_handler.get_redis_instance().lrange(
+        get_trace_key(task_id=task_id), 0, -1
+    )
+
+
+def test_task_tracer_spans():
+    use_fake_redis()
+    redis_handler = RedisPipelineHandler()
+    tracer = TaskTracer(task_id="task-1")
+    tracer.activate()
+    trace_phase(phase="Login")
+    with trace_span(name="http", detail="example.com"):
+        with trace_span(name="captcha"):
+            pass
+    trace_phase(phase="SendData")
+    with tracer.span(name="mongo_write", detail="c_personal"):
+        pass
+    tracer.finish()
+    # 结束之后当前线程不再记录
+    with trace_span(name="http"):
+        pass
+
+    trace = parse_trace_spans(raw_spans=find_spans(redis_handler, "task-1"))
+    spans = {span["name"]: span for span in trace["spans"]}
+    assert_equal(
+        [span["name"] for span in trace["spans"]],
+        ["Login", "http", "captcha", "SendData", "mongo_write"],
+    )
+    assert_equal(spans["Login"]["parentId"], -1)
+    assert_equal(spans["http"]["parentId"], spans["Login"]["id"])
+    assert_equal(spans["http"]["detail"], "example.com")
+    assert_equal(spans["captcha"]["parentId"], spans["http"]["id"])
+    assert_equal(spans["mongo_write"]["parentId"], spans["SendData"]["id"])
+    # 汇总只统计子 span
+    assert_equal(sorted(trace["summary"].keys()), ["captcha", "http", "mongo_write"])
+    assert_equal(trace["summary"]["http"]["count"], 1)
+
+
+def test_task_tracer_without_task_id():
+    use_fake_redis()
+    tracer = TaskTracer(task_id=None)
+    tracer.activate()
+    trace_phase(phase="Login")
+    with trace_span(name="http"):
+        pass
+    # 没有任务 ID 时不缓存 span
+    assert_equal(tracer._pending_spans, [])
+    tracer.finish()
+
+
+def test_task_tracer_requeue_resets_trace():
+    use_fake_redis()
+    redis_handler = RedisPipelineHandler()
+    tracer = TaskTracer(task_id="task-1")
+    tracer.activate()
+    trace_phase(phase="PersonalBlogs")
+    tracer.finish()
+    assert_equal(len(find_spans(redis_handler, "task-1")), 1)
+
+    # 中断之后重新执行的任务只保留这一次执行的 span
+    tracer = TaskTracer(task_id="task-1")
+    tracer.activate()
+    trace_phase(phase="Login")
+    tracer.finish()
+    raw_spans = find_spans(redis_handler, "task-1")
+    assert_equal([json.loads(raw_span)[2] for raw_span in raw_spans], ["Login"])
+    assert_true(0 < redis_handler.get_redis_instance().ttl(get_trace_key("task-1")))
+
+
+def test_parse_trace_spans():
+    raw_spans = [
+        json.dumps(span)
+        for span in [
+            [2, 0, "http", 5.0, 3.25, "example.com"],
+            [0, -1, "Login", 0.0, 10.0],
+            [1, 0, "http", 1.0, 2.0, "example.com"],
+            [3, -1, "SendData", 10.0, 1.0],
+        ]
+    ]
+    trace = parse_trace_spans(raw_spans=raw_spans)
+    assert_equal([span["id"] for span in trace["spans"]], [0, 1, 2, 3])
+    assert_equal(trace["spans"][1]["detail"], "example.com")
+    assert_true("detail" not in trace["spans"][0])
+    assert_equal(trace["summary"], {"http": {"count": 2, "duration": 5.2}})
@@ -0,0 +1,99 @@
+"""
+共享的验证码识别实例与原来每个验证码创建一个 ZhihuCaptcha 的对比
+需要安装 TensorFlow 并且 captcha/checkpoint 中有训练好的权重，否则跳过
+
+nosetests -s test/test_zhihu_captcha.py 会输出两种方式每个验证码的平均耗时
+"""
+
+import time
+import unittest
+from typing import List
+
+import numpy as np
+from nose.tools import assert_equal, assert_true
+
+from captcha.generate_zhihu_captcha import CaptchaGenerator
+from captcha.zhihu_captcha_charset import decode_maps
+
+try:
+    import tensorflow as tf
+except ImportError:
+    tf = None
+
+image_count: int = 20
+
+
+def get_fixed_images() -> List:
+    generator = CaptchaGenerator(seed=20200101)
+    return [generator.generate()[0] for _ in range(image_count)]
+
+
+class PreChangeZhihuCaptcha:
+    """
+    原来的识别方式：模型构建一次，每个验证码新建 Session 并从 checkpoint 恢复权重，
+    预处理以及解码也与原来的实现一致
+    """
+
+    def __init__(self, checkpoint_dir: str):
+        from captcha import zhihu_ocr_model as ocr_model
+
+        self._checkpoint_dir = checkpoint_dir
+        self._graph = tf.Graph()
+        with self._graph.as_default():
+            self._model = ocr_model.LSTMOCR("infer")
+            self._model.build_graph()
+            self._saver = tf.compat.v1.train.Saver(
+                tf.compat.v1.global_variables(), max_to_keep=100
+            )
+            self._init_op = tf.compat.v1.global_variables_initializer()
+
+    def predict(self, img) -> str:
+        with tf.compat.v1.Session(graph=self._graph) as sess:
+            sess.run(self._init_op)
+            self._saver.restore(sess, tf.train.latest_checkpoint(self._checkpoint_dir))
+            im = np.array(img.convert("L")).astype(np.float32) / 255.0
+            im = np.reshape(im, [60, 150, 1])
+            seq_len_input = np.reshape(np.array([np.array([64], dtype=np.int64)]), [-1])
+            feed = {
+                self._model.inputs: np.asarray([im]),
+                self._model.seq_len: seq_len_input,
+            }
+            dense_decoded_code = sess.run(self._model.dense_decoded, feed)
+        return "".join(decode_maps[i] for i in dense_decoded_code[0] if i != -1)
+
+
+def test_shared_predictor_matches_pre_change():
+    if tf is None:
+        raise unittest.SkipTest("TensorFlow is not installed")
+    from captcha.zhihu_captcha import ZhihuCaptcha, checkpoint_dir
+
+    # 仓库中只有 checkpoint 的 index 以及 meta，权重文件需要自行训练或者下载
+    checkpoint_path = tf.train.latest_checkpoint(checkpoint_dir)
+    if checkpoint_path is None or not tf.io.gfile.glob(f"{checkpoint_path}.data-*"):
+        raise unittest.SkipTest("No captcha checkpoint")
+
+    img_list = get_fixed_images()
+    pre_change_predictor = PreChangeZhihuCaptcha(checkpoint_dir=checkpoint_dir)
+    pre_change_latency: List[float] = []
+    pre_change_codes: List[str] = []
+    for img in img_list:
+        start_time = time.perf_counter()
+        pre_change_codes.append(pre_change_predictor.predict(img))
+        pre_change_latency.append(time.perf_counter() - start_time)
+
+    predictor = ZhihuCaptcha()
+    latency: List[float] = []
+    codes: List[str] = []
+    for img in img_list:
+        start_time = time.perf_counter()
+        codes.append(predictor.predict(img))
+        latency.append(time.perf_counter() - start_time)
+
+    print(
+        f"每个验证码平均耗时: 原来 {np.mean(pre_change_latency) * 1000:.2f}ms, "
+        f"共享实例 {np.mean(latency) * 1000:.2f}ms"
+    )
+    assert_equal(codes, pre_change_codes)
+    assert_true(ZhihuCaptcha() is predictor)
+    assert_equal(predictor.predict_batch(img_list), pre_change_codes)
+    assert_true(np.mean(latency) < np.mean(pre_change_latency))
@@ -0,0 +1,72 @@
+import base64
+from unittest import mock
+
+from nose.tools import assert_equal, assert_true
+
+from fake_redis import use_fake_redis
+from pipeline.redis_pipeline import RedisPipelineHandler
+from captcha.zhihu_captcha_service import ZhihuCaptchaClient
+from captcha.zhihu_captcha_cache import (
+    CaptchaLocalCache,
+    CaptchaResultCache,
+    get_cache_key,
+    get_image_digest,
+)
+from config import CAPTCHA_SERVICE_HEARTBEAT_KEY
+
+img_bytes = b"fake captcha image"
+img_base64 = base64.b64encode(img_bytes).decode()
+digest = get_image_digest(img_bytes)
+
+
+def setup_captcha_cache():
+    use_fake_redis()
+    CaptchaLocalCache.local_cache = None
+    redis_handler = RedisPipelineHandler()
+    # 识别服务在线，缓存没有命中时会调用识别服务
+    redis_handler.insert_key(key=CAPTCHA_SERVICE_HEARTBEAT_KEY, value="1")
+    return ZhihuCaptchaClient(), CaptchaResultCache(), redis_handler
+
+
+def test_verified_cache_skips_service():
+    client, cache, _ = setup_captcha_cache()
+    cache.set(digest=digest, code="abcd", verified=True)
+    with mock.patch.object(
+        ZhihuCaptchaClient, "_predict_by_service"
+    ) as predict_by_service, mock.patch.object(
+        ZhihuCaptchaClient, "_predict_local"
+    ) as predict_local:
+        assert_equal(client.predict(img_base64=img_base64), "abcd")
+    assert_equal(predict_by_service.call_count, 0)
+    assert_equal(predict_local.call_count, 0)
+
+
+def test_unverified_cache_is_ignored():
+    client, cache, _ = setup_captcha_cache()
+    cache.set(digest=digest, code="abcd", verified=False)
+    with mock.patch.object(
+        ZhihuCaptchaClient, "_predict_by_service", return_value="efgh"
+    ) as predict_by_service:
+        assert_equal(client.predict(img_base64=img_base64), "efgh")
+    assert_equal(predict_by_service.call_count, 1)
+
+
+def test_failed_verification_deletes_cache():
+    client, cache, redis_handler = setup_captcha_cache()
+    client.report_result(img_base64=img_base64, captcha_code="abcd", is_verified=True)
+    assert_true(redis_handler.find_key(key=get_cache_key(digest=digest)) is not None)
+    client.report_result(img_base64=img_base64, captcha_code="abcd", is_verified=False)
+    assert_equal(redis_handler.find_key(key=get_cache_key(digest=digest)), None)
+    assert_equal(cache.get(digest=digest), None)
+
+
+def test_redis_hit_fills_local_cache():
+    _, cache, redis_handler = setup_captcha_cache()
+    cache.set(digest=digest, code="abcd", verified=True)
+    # 新的进程：本地缓存为空，从 Redis 读取
+    CaptchaLocalCache.local_cache = None
+    cache = CaptchaResultCache()
+    assert_equal(cache.get(digest=digest)["code"], "abcd")
+    # 删除 Redis 中的结果之后仍然从本地缓存读到
+    redis_handler.remove_keys(keys=[get_cache_key(digest=digest)])
+    assert_equal(cache.get(digest=digest)["code"], "abcd")
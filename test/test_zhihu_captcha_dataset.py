@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+from PIL import Image
+from nose.tools import assert_equal
+
+from captcha.zhihu_captcha_charset import encode_code
+from captcha.zhihu_captcha_dataset import PackedDataIterator, pack_image_dir
+
+CODE_LIST = ["ab12", "cd34", "ef56", "gh78", "ij90"]
+
+
+def _pack_fake_dataset(tmp_dir: str) -> str:
+    image_dir = os.path.join(tmp_dir, "imgs")
+    os.makedirs(image_dir)
+    for index, code in enumerate(CODE_LIST):
+        # 用像素值区分不同的图片
+        img = Image.new("L", (150, 60), color=index * 10)
+        img.save(os.path.join(image_dir, f"{index:05d}_{code}.png"))
+    prefix = os.path.join(tmp_dir, "train")
+    pack_image_dir(image_dir=image_dir, prefix=prefix)
+    return prefix
+
+
+def _collect_samples(iterator: PackedDataIterator) -> dict:
+    samples = {}
+    for batch_inputs, batch_seq_len, batch_codes in iterator:
+        assert_equal(batch_inputs.shape[1:], (60, 150, 1))
+        assert_equal(len(batch_seq_len), len(batch_codes))
+        for im, code in zip(batch_inputs, batch_codes):
+            samples[int(round(im[0, 0, 0] * 255))] = code
+    return samples
+
+
+def test_packed_data_iterator_read_every_sample_once():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prefix = _pack_fake_dataset(tmp_dir=tmp_dir)
+        expected = {
+            index * 10: encode_code(code) for index, code in enumerate(CODE_LIST)
+        }
+        for prefetch in (0, 2):
+            iterator = PackedDataIterator(
+                prefix=prefix, batch_size=2, prefetch=prefetch, seed=1
+            )
+            assert_equal(len(iterator), 3)
+            assert_equal(_collect_samples(iterator=iterator), expected)
+
+
+def test_packed_data_iterator_drop_last():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prefix = _pack_fake_dataset(tmp_dir=tmp_dir)
+        iterator = PackedDataIterator(prefix=prefix, batch_size=2, drop_last=True)
+        batch_sizes = [len(batch[2]) for batch in iterator]
+        assert_equal(batch_sizes, [2, 2])
+        assert_equal(len(iterator), 2)
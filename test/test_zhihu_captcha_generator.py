@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+from nose.tools import assert_equal, assert_true
+
+from captcha.zhihu_captcha_charset import charset, decode_dense_code
+from captcha.zhihu_captcha_dataset import PackedDataIterator
+from captcha.generate_zhihu_captcha import CaptchaGenerator, generate_dataset
+
+
+def test_generate_captcha_image():
+    img, code = CaptchaGenerator(seed=1).generate()
+    assert_equal(img.size, (150, 60))
+    assert_equal(img.mode, "L")
+    assert_equal(len(code), 4)
+    assert_true(all(c in charset for c in code))
+    # 相同的随机种子生成相同的验证码
+    assert_equal(CaptchaGenerator(seed=1).generate()[1], code)
+
+
+def test_generate_packed_dataset():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prefix = os.path.join(tmp_dir, "synthetic")
+        generate_dataset(count=10, prefix=prefix, chunk_size=4, seed=1)
+        iterator = PackedDataIterator(prefix=prefix, batch_size=4, shuffle=False)
+        codes = [decode_dense_code(code) for batch in iterator for code in batch[2]]
+        assert_equal(len(codes), 10)
+        assert_true(all(len(code) == 4 for code in codes))
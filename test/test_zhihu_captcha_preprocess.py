@@ -0,0 +1,33 @@
+import base64
+from io import BytesIO
+
+import numpy as np
+from nose.tools import assert_equal, assert_true
+
+from captcha.zhihu_captcha_charset import build_seq_len, preprocess_image
+from captcha.zhihu_captcha_preprocess import CaptchaInputBuffer
+from captcha.generate_zhihu_captcha import CaptchaGenerator
+
+
+def test_input_buffer_matches_preprocess_image():
+    generator = CaptchaGenerator(seed=1)
+    img_list = [generator.generate()[0] for _ in range(3)]
+    expected = np.stack([preprocess_image(img) for img in img_list])
+
+    input_buffer = CaptchaInputBuffer(capacity=2)
+    image_input, seq_len_input = input_buffer.load_images(img_list=img_list)
+    assert_equal(image_input.dtype, np.float32)
+    assert_true(np.array_equal(image_input, expected))
+    assert_true(np.array_equal(seq_len_input, build_seq_len(batch_size=3)))
+
+
+def test_input_buffer_load_base64():
+    img, _ = CaptchaGenerator(seed=2).generate()
+    output = BytesIO()
+    img.save(output, format="PNG")
+    img_base64 = base64.b64encode(output.getvalue()).decode()
+
+    image_input, seq_len_input = CaptchaInputBuffer().load_base64([img_base64])
+    assert_equal(image_input.shape, (1, 60, 150, 1))
+    assert_equal(seq_len_input.shape, (1,))
+    assert_true(np.array_equal(image_input[0], preprocess_image(img)))
@@ -0,0 +1,187 @@
+import json
+import time
+import base64
+import threading
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
+from nose.tools import assert_equal, assert_true
+
+from fake_redis import use_fake_redis
+from pipeline.redis_pipeline import RedisPipelineHandler
+from captcha import zhihu_captcha_service
+from captcha.zhihu_captcha_cache import CaptchaLocalCache
+from captcha.zhihu_captcha_service import (
+    ZhihuCaptchaClient,
+    get_result_key,
+    _collect_batch,
+    _handle_batch,
+    run_captcha_service,
+    service_stop_event,
+)
+from config import CAPTCHA_SERVICE_REQUEST_KEY, CAPTCHA_SERVICE_HEARTBEAT_KEY
+
+
+class StubPredictor:
+    """
+    用图片左上角的灰度值作为识别结果，记录每个批次的大小
+    """
+
+    def __init__(self):
+        self.batch_size_list = []
+
+    @staticmethod
+    def predict(img) -> str:
+        return str(img.convert("L").getpixel((0, 0)))
+
+    def predict_batch(self, img_list) -> list:
+        self.batch_size_list.append(len(img_list))
+        return [self.predict(img) for img in img_list]
+
+
+def make_image_base64(color: int) -> str:
+    buffer = BytesIO()
+    Image.new("L", (150, 60), color=color).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def make_request(request_id: str, color: int, deadline_offset: float = 5) -> str:
+    return json.dumps(
+        {
+            "requestId": request_id,
+            "image": make_image_base64(color=color),
+            "deadline": time.time() + deadline_offset,
+        }
+    )
+
+
+def setup_captcha_service() -> RedisPipelineHandler:
+    use_fake_redis()
+    CaptchaLocalCache.local_cache = None
+    return RedisPipelineHandler()
+
+
+def test_collect_batch():
+    redis_handler = setup_captcha_service()
+    requests = [make_request(request_id=str(i), color=i) for i in range(5)]
+    redis_handler.push_list(key=CAPTCHA_SERVICE_REQUEST_KEY, values=requests[1:])
+    with mock.patch.object(zhihu_captcha_service, "CAPTCHA_BATCH_MAX_SIZE", 3):
+        batch = _collect_batch(redis_instance=redis_handler, first=requests[0])
+    # 批次大小不超过 CAPTCHA_BATCH_MAX_SIZE，按请求的先后顺序读取
+    assert_equal(batch, requests[:3])
+    assert_equal(redis_handler.find_list_length(key=CAPTCHA_SERVICE_REQUEST_KEY), 2)
+
+    # 等待凑批的时间内没有新的请求时只识别第一个请求
+    redis_handler.pop_list(key=CAPTCHA_SERVICE_REQUEST_KEY, count=2)
+    start_time = time.monotonic()
+    assert_equal(
+        _collect_batch(redis_instance=redis_handler, first=requests[0]), requests[:1]
+    )
+    assert_true(time.monotonic() - start_time < 1)
+
+
+def test_handle_batch_results_per_request():
+    redis_handler = setup_captcha_service()
+    predictor = StubPredictor()
+    batch = [
+        make_request(request_id="a", color=10),
+        make_request(request_id="b", color=20),
+        # 客户端已经放弃的请求
+        make_request(request_id="expired", color=30, deadline_offset=-1),
+        json.dumps(
+            {"requestId": "broken", "image": "bm90IGFuIGltYWdl", "deadline": 1e12}
+        ),
+    ]
+    _handle_batch(redis_instance=redis_handler, captcha_model=predictor, batch=batch)
+    assert_equal(predictor.batch_size_list, [2])
+    assert_equal(
+        json.loads(redis_handler.pop_list_blocking(key=get_result_key("a"), timeout=1)),
+        {"code": "10"},
+    )
+    assert_equal(
+        json.loads(redis_handler.pop_list_blocking(key=get_result_key("b"), timeout=1)),
+        {"code": "20"},
+    )
+    assert_equal(redis_handler.find_list_length(key=get_result_key("expired")), 0)
+    # 结果队列带过期时间，客户端超时之后不会残留
+    assert_true(0 < redis_handler.get_redis_instance().ttl(get_result_key("broken")))
+    broken_result = json.loads(
+        redis_handler.pop_list_blocking(key=get_result_key("broken"), timeout=1)
+    )
+    assert_true("error" in broken_result)
+
+
+def test_handle_batch_predict_error():
+    redis_handler = setup_captcha_service()
+    predictor = StubPredictor()
+    predictor.predict_batch = mock.Mock(side_effect=RuntimeError("model error"))
+    batch = [make_request(request_id=str(i), color=i) for i in range(2)]
+    _handle_batch(redis_instance=redis_handler, captcha_model=predictor, batch=batch)
+    for i in range(2):
+        result = redis_handler.pop_list_blocking(key=get_result_key(str(i)), timeout=1)
+        assert_equal(json.loads(result), {"error": "model error"})
+
+
+def test_service_heartbeat_and_client():
+    redis_handler = setup_captcha_service()
+    predictor = StubPredictor()
+    with mock.patch.object(
+        zhihu_captcha_service, "get_captcha_predictor", return_value=predictor
+    ):
+        service_thread = threading.Thread(target=run_captcha_service, daemon=True)
+        service_thread.start()
+        try:
+            deadline = time.monotonic() + 5
+            while redis_handler.find_key(key=CAPTCHA_SERVICE_HEARTBEAT_KEY) is None:
+                assert_true(time.monotonic() < deadline)
+                time.sleep(0.01)
+            assert_true(
+                0
+                < redis_handler.get_redis_instance().ttl(CAPTCHA_SERVICE_HEARTBEAT_KEY)
+            )
+
+            client = ZhihuCaptchaClient()
+            with mock.patch.object(
+                ZhihuCaptchaClient, "_predict_local"
+            ) as predict_local:
+                codes = [
+                    client.predict(img_base64=make_image_base64(color=color))
+                    for color in (40, 50)
+                ]
+            assert_equal(codes, ["40", "50"])
+            assert_equal(predict_local.call_count, 0)
+        finally:
+            service_stop_event.set()
+            service_thread.join(timeout=5)
+            service_stop_event.clear()
+    assert_true(not service_thread.is_alive())
+
+
+def test_client_fallback_when_service_down():
+    setup_captcha_service()
+    predictor = StubPredictor()
+    client = ZhihuCaptchaClient()
+    # 没有心跳时不发送请求，直接在当前进程识别
+    with mock.patch.object(
+        zhihu_captcha_service, "get_captcha_predictor", return_value=predictor
+    ), mock.patch.object(
+        ZhihuCaptchaClient, "_predict_by_service"
+    ) as predict_by_service:
+        assert_equal(client.predict(img_base64=make_image_base64(color=60)), "60")
+    assert_equal(predict_by_service.call_count, 0)
+
+
+def test_client_fallback_when_service_timeout():
+    redis_handler = setup_captcha_service()
+    # 有心跳但是识别服务没有处理请求
+    redis_handler.insert_key(key=CAPTCHA_SERVICE_HEARTBEAT_KEY, value="1")
+    predictor = StubPredictor()
+    client = ZhihuCaptchaClient()
+    with mock.patch.object(
+        zhihu_captcha_service, "get_captcha_predictor", return_value=predictor
+    ), mock.patch.object(zhihu_captcha_service, "CAPTCHA_SERVICE_TIMEOUT_SECONDS", 1):
+        start_time = time.monotonic()
+        assert_equal(client.predict(img_base64=make_image_base64(color=70)), "70")
+    assert_true(time.monotonic() - start_time < 3)
+    assert_equal(redis_handler.find_list_length(key=CAPTCHA_SERVICE_REQUEST_KEY), 1)
@@ -0,0 +1,121 @@
+import os
+import json
+import random
+import shutil
+import string
+import tempfile
+import unittest
+import subprocess
+
+from nose.tools import assert_equal
+
+from config import NODE_BIN_PATH, NPM_ROOT_PATH
+from utils.js_worker_utils import JSWorkerPool
+from utils.js_utils import zhihu_encrypt_js_code, zhihu_zse86_js_code
+from utils.zhihu_encrypt_utils import zhihu_encrypt, zhihu_zse86_sign
+
+# 随机用例的数量以及最大长度
+random_case_count: int = 500
+random_case_max_length: int = 128
+
+# 用 jsdom 运行原始的 zhihu_zse86_js_code 得到的结果(golden vectors)
+# 在安装了 jsdom 的环境中执行 PYTHONPATH=. python test/test_zhihu_encrypt.py 生成
+zse86_golden_path: str = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "zhihu_zse86_golden.json"
+)
+# 脚本加载以及调用 b 时会用 console.log 输出调试信息
+zse86_golden_prefix_js_code: str = "console.log = function() {};\n"
+zse86_golden_js_code: str = """
+const fs = require("fs");
+const cases = JSON.parse(fs.readFileSync(process.argv[2], "utf8"));
+fs.writeFileSync(process.argv[3], JSON.stringify(cases.map(b)));
+"""
+
+# x-zse-86 脚本依赖 jsdom，测试时替换成只包含脚本用到的属性的 window
+# (与 jsdom 一致：name 为空，userAgent 定义在 navigator 的原型上)
+zse86_window_code: str = """
+window = {
+    name: "",
+    navigator: Object.create({
+        userAgent: "Mozilla/5.0 (linux) AppleWebKit/537.36 (KHTML, like Gecko) jsdom"
+    }),
+    atob: function(str) { return Buffer.from(str, "base64").toString("binary"); }
+};
+"""
+
+
+def build_cases():
+    rng = random.Random(0)
+    alphabet = string.printable + "中文测试éü😀　"
+    cases = ["", "a", "ab", "abc", "a=1&b=2", "0123456789abcdef" * 2]
+    for _ in range(random_case_count):
+        length = rng.randint(0, random_case_max_length)
+        cases.append("".join(rng.choice(alphabet) for _ in range(length)))
+    return cases
+
+
+def call_js_batch(js_str: str, function: str, cases):
+    if shutil.which(NODE_BIN_PATH) is None:
+        raise unittest.SkipTest("Node.js is not installed")
+    js_str += f"\nfunction batchCall(list) {{ return list.map({function}); }}\n"
+    return JSWorkerPool().call(js_str, "batchCall", cases, timeout=120)
+
+
+def test_zhihu_encrypt_known_value():
+    assert_equal(zhihu_encrypt("a=1&b=2"), "aTt92478ST2tr_e0zXNx")
+    assert_equal(zhihu_zse86_sign(""), "")
+
+
+def test_zhihu_encrypt_matches_js():
+    cases = build_cases()
+    expected = call_js_batch(zhihu_encrypt_js_code, "encrypt", cases)
+    assert_equal([zhihu_encrypt(case) for case in cases], expected)
+
+
+def test_zhihu_zse86_sign_matches_js():
+    cases = build_cases()
+    js_str = zse86_window_code + zhihu_zse86_js_code.split("XMLHttpRequest;", 1)[1]
+    expected = call_js_batch(js_str, "b", cases)
+    assert_equal([zhihu_zse86_sign(case) for case in cases], expected)
+
+
+def test_zhihu_zse86_sign_matches_jsdom_golden():
+    if not os.path.exists(zse86_golden_path):
+        raise unittest.SkipTest("x-zse-86 golden vectors are not generated")
+    with open(zse86_golden_path, encoding="utf-8") as f:
+        golden = json.load(f)
+    assert_equal(
+        [zhihu_zse86_sign(case) for case in golden["cases"]], golden["expected"]
+    )
+
+
+def generate_zse86_golden():
+    """
+    用 node + jsdom 运行未经修改的 zhihu_zse86_js_code，结果写入 zse86_golden_path
+    """
+    cases = build_cases()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        script_path = os.path.join(tmp_dir, "zse86.js")
+        cases_path = os.path.join(tmp_dir, "cases.json")
+        expected_path = os.path.join(tmp_dir, "expected.json")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(
+                zse86_golden_prefix_js_code + zhihu_zse86_js_code + zse86_golden_js_code
+            )
+        with open(cases_path, "w", encoding="utf-8") as f:
+            json.dump(cases, f)
+        subprocess.run(
+            [NODE_BIN_PATH, script_path, cases_path, expected_path],
+            cwd=NPM_ROOT_PATH,
+            env=dict(os.environ, NODE_PATH=NPM_ROOT_PATH),
+            check=True,
+        )
+        with open(expected_path, encoding="utf-8") as f:
+            expected = json.load(f)
+    with open(zse86_golden_path, "w", encoding="utf-8") as f:
+        json.dump({"cases": cases, "expected": expected}, f, ensure_ascii=False)
+    print(f"已生成 {len(cases)} 组 x-zse-86 结果: {zse86_golden_path}")
+
+
+if __name__ == "__main__":
+    generate_zse86_golden()
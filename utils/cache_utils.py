@@ -0,0 +1,53 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class LRUCache:
+    """
+    进程内 LRU 缓存(线程安全)，支持过期时间
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: Optional[float] = None):
+        """
+        :param max_size: 最大缓存条数，超出后淘汰最久未使用的数据
+        :param ttl_seconds: 默认过期时间(秒)，为 None 时不过期
+        """
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expire_time = item
+            if expire_time is not None and expire_time <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, *, ttl_seconds: Optional[float] = None):
+        if ttl_seconds is None:
+            ttl_seconds = self._ttl_seconds
+        expire_time = None if ttl_seconds is None else time.monotonic() + ttl_seconds
+        with self._lock:
+            self._data[key] = (value, expire_time)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,142 @@
+import time
+import random
+from typing import Dict, List, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logger_utils import LogManager
+from pipeline.redis_pipeline import RedisPipelineHandler
+from utils.session_cache_utils import SessionCacheHandler
+from config import (
+    LOG_LEVEL,
+    COOKIE_SWEEP_BATCH_SIZE,
+    COOKIE_SWEEP_CONCURRENCY,
+    COOKIE_CHECK_JITTER_SECONDS,
+    COOKIE_CHECK_INTERVAL_SECONDS,
+)
+
+logger = LogManager(__name__).get_logger_and_add_handlers(
+    formatter_template=5, log_level_int=LOG_LEVEL
+)
+
+# 记录每个平台账号下一次巡检时间的有序集合 key 前缀
+redis_cookie_check_key_prefix: str = "cookie_check"
+# 账号 Cookie 失效时需要一起清理的登录数据 key 后缀
+cookie_data_key_suffix_list: List = [":params", ":token", ":user_url", ":validated_at"]
+
+
+def get_platform_by_spider_name(spider_name: str) -> str:
+    """
+    通过爬虫名称获取平台名称
+    :param spider_name: 爬虫名称，格式为 <平台>:<用户名>
+    :return: 平台名称
+    """
+    return spider_name.split(":", 1)[0]
+
+
+class CookieSweeper:
+    """
+    Cookie 有效性巡检
+    每个平台一个有序集合 cookie_check:{platform}，成员为爬虫名称，分值为下一次巡检的时间戳
+    巡检时分批取出到期的账号，有限并发地探测 Cookie，失效的账号批量清理
+    """
+
+    def __init__(
+        self, platform: str, probe: Optional[Callable[[str, str], bool]] = None
+    ):
+        """
+        :param platform: 平台名称
+        :param probe: Cookie 探测函数，参数为爬虫名称和 Cookie，返回 Cookie 是否有效
+        """
+        self._platform = platform
+        self._probe = probe
+        self._redis_instance = RedisPipelineHandler()
+        self._session_cache = SessionCacheHandler()
+        self._sorted_set_key: str = f"{redis_cookie_check_key_prefix}:{platform}"
+
+    @staticmethod
+    def _next_check_time(now: float) -> float:
+        return (
+            now
+            + COOKIE_CHECK_INTERVAL_SECONDS
+            + random.uniform(0, COOKIE_CHECK_JITTER_SECONDS)
+        )
+
+    def schedule(self, spider_names: List[str]) -> bool:
+        """
+        登记(或推迟)账号的下一次巡检时间
+        :param spider_names: 爬虫名称列表
+        """
+        if len(spider_names) == 0:
+            return True
+        now: float = time.time()
+        mapping: Dict = {name: self._next_check_time(now) for name in spider_names}
+        return self._redis_instance.insert_sorted_set(
+            key=self._sorted_set_key, mapping=mapping
+        )
+
+    def evict(self, spider_names: List[str]) -> bool:
+        """
+        批量清理失效账号的 Cookie、登录数据以及巡检记录
+        :param spider_names: 爬虫名称列表
+        """
+        if len(spider_names) == 0:
+            return True
+        keys: List = []
+        for name in spider_names:
+            keys.append(name)
+            keys.extend([f"{name}{suffix}" for suffix in cookie_data_key_suffix_list])
+        logger.info(f"平台: {self._platform}, 清理失效 Cookie 的账号: {spider_names}")
+        is_remove = self._redis_instance.remove_keys_and_members(
+            keys=keys, sorted_set_key=self._sorted_set_key, members=spider_names
+        )
+        self._session_cache.invalidate(keys=keys)
+        return is_remove
+
+    def _probe_one(self, spider_name: str, cookies: Optional[str]) -> bool:
+        if cookies is None:
+            return False
+        try:
+            is_valid = self._probe(spider_name, cookies)
+            if is_valid:
+                self._session_cache.mark_validated(spider_name=spider_name)
+            return is_valid
+        except Exception as err:
+            # 网络异常等情况不清理 Cookie，等待下一次巡检
+            logger.error(f"账号: {spider_name} Cookie 探测异常!错误原因: {err}")
+            return True
+
+    def sweep(self) -> int:
+        """
+        执行一次巡检
+        :return: 本次巡检的账号数
+        """
+        if self._probe is None:
+            raise ValueError("Cookie probe function can not be None!")
+
+        # 认领到期的账号并推迟它们的下一次巡检时间(原子操作)，
+        # 多个进程同时巡检时同一个账号只会被一个进程探测
+        due_names = self._redis_instance.claim_sorted_set_by_score(
+            key=self._sorted_set_key,
+            max_score=time.time(),
+            count=COOKIE_SWEEP_BATCH_SIZE,
+            score_func=lambda _: self._next_check_time(time.time()),
+        )
+        if not due_names:
+            return 0
+
+        # 一次 MGET 取出这一批账号的 Cookie
+        cookies_list = self._redis_instance.find_keys(keys=due_names)
+        if cookies_list is None:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=COOKIE_SWEEP_CONCURRENCY) as executor:
+            probe_results = list(executor.map(self._probe_one, due_names, cookies_list))
+
+        invalid_names: List = [
+            name for name, is_valid in zip(due_names, probe_results) if not is_valid
+        ]
+        self.evict(spider_names=invalid_names)
+        logger.debug(
+            f"平台: {self._platform}, 巡检账号数: {len(due_names)}, 失效账号数: {len(invalid_names)}"
+        )
+        return len(due_names)
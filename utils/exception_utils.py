@@ -17,3 +17,28 @@ class ParseDataException(CrawlerBaseException):
         self.args = args
         self.code = code
         self.message = message
+
+
+class TaskCancelException(CrawlerBaseException):
+    def __init__(self, code: int = 102, message: str = "任务已取消", args=("任务已取消",)):
+        self.args = args
+        self.code = code
+        self.message = message
+
+
+class TaskInterruptException(TaskCancelException):
+    def __init__(
+        self, code: int = 103, message: str = "爬虫进程退出，任务被中断", args=("爬虫进程退出，任务被中断",)
+    ):
+        self.args = args
+        self.code = code
+        self.message = message
+
+
+class JSWorkerException(CrawlerBaseException):
+    def __init__(
+        self, code: int = 104, message: str = "JS 签名进程异常", args=("JS 签名进程异常",)
+    ):
+        self.args = args
+        self.code = code
+        self.message = message
@@ -35,6 +35,15 @@ def image_base64_to_pillow(img_str: str) -> Image:
     return img
 
 
+def image_bytes_to_pillow(byte_data: bytes) -> Image:
+    """
+    通过图片的二进制数据返回 Pillow.Image 对象
+    :param byte_data: 图片的二进制数据
+    :return: 图片
+    """
+    return Image.open(BytesIO(byte_data))
+
+
 def close_image_window():
     """
     关闭图片展示窗口
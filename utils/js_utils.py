@@ -1,6 +1,11 @@
+import time
+import threading
+from typing import Dict
+
 import execjs
 
 from config import NPM_ROOT_PATH
+from utils.metrics_utils import JS_COMPILE_LATENCY, JS_SIGN_LATENCY
 
 
 zhihu_encrypt_js_code = r"""
@@ -871,5 +876,42 @@ XMLHttpRequest = window.XMLHttpRequest;
 """
 
 
+# 已编译的 JS 上下文 {脚本: 上下文}，进程内共享
+# 知乎 x-zse-86 签名(zhihu_zse86_js_code 的 b)仍然通过 execjs 执行，登录加密已经使用 Python 实现
+js_context_dict: Dict[str, execjs.ExternalRuntime.Context] = {}
+js_context_lock = threading.Lock()
+
+
 def compile_js(js_str: str):
     return execjs.compile(source=js_str, cwd=NPM_ROOT_PATH)
+
+
+def get_js_context(js_str: str):
+    """
+    获取脚本编译后的上下文，每个脚本只在第一次使用时编译一次
+    上下文的 call 不修改自身状态，可以在多个线程之间共享
+    :param js_str: JS 脚本
+    :return: 编译后的上下文
+    """
+    js_context = js_context_dict.get(js_str)
+    if js_context is None:
+        with js_context_lock:
+            js_context = js_context_dict.get(js_str)
+            if js_context is None:
+                start_time = time.perf_counter()
+                js_context = compile_js(js_str=js_str)
+                JS_COMPILE_LATENCY.observe(time.perf_counter() - start_time)
+                js_context_dict[js_str] = js_context
+    return js_context
+
+
+def call_js(js_str: str, function: str, *args):
+    """
+    通过 execjs 调用脚本中的函数并记录签名耗时
+    :param js_str: JS 脚本
+    :param function: 函数名
+    :param args: 函数参数
+    :return: 函数返回值
+    """
+    with JS_SIGN_LATENCY.labels(function=function).time():
+        return get_js_context(js_str=js_str).call(function, *args)
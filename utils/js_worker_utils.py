@@ -0,0 +1,285 @@
+"""
+常驻的 Node.js 签名进程池
+每个 node 进程为每个脚本创建一个独立的 vm 上下文，脚本只在第一次调用时加载一次，
+之后通过 stdin/stdout 按行传输 JSON 进行调用：
+
+请求 {"id": 1, "script": 脚本摘要, "source": 脚本(只在第一次发送), "function": 函数名, "args": [...]}
+响应 {"id": 1, "loaded": 脚本是否已加载, "result": 返回值} 或者 {"id": 1, "loaded": 脚本是否已加载, "error": 错误信息}
+
+进程崩溃或者调用超时时结束该进程，下一次调用时启动新的进程
+
+登录加密已经使用 utils/zhihu_encrypt_utils.py 的 Python 实现，
+进程池只用于对比 JS 结果的单元测试以及 benchmark/js_sign_benchmark.py
+需要 jsdom 的 zhihu_zse86_js_code 在 vm 上下文中的加载只能在安装了 jsdom 的环境中验证
+(test/test_js_worker_utils.py 中与 execjs 结果的对比，没有 jsdom 时跳过)，爬虫仍然通过 execjs 执行
+"""
+
+import os
+import json
+import time
+import queue
+import select
+import atexit
+import hashlib
+import threading
+import subprocess
+from typing import Dict, List, Optional
+
+from utils.decorator import synchronized
+from utils.logger_utils import LogManager
+from utils.exception_utils import JSWorkerException
+from utils.metrics_utils import JS_WORKER_START_COUNTER
+from config import (
+    LOG_LEVEL,
+    NPM_ROOT_PATH,
+    NODE_BIN_PATH,
+    JS_WORKER_POOL_SIZE,
+    JS_WORKER_CALL_TIMEOUT_SECONDS,
+)
+
+logger = LogManager(__name__).get_logger_and_add_handlers(
+    formatter_template=5, log_level_int=LOG_LEVEL
+)
+
+js_worker_code = r"""
+const vm = require("vm");
+const readline = require("readline");
+
+const contexts = {};
+const silentConsole = {log() {}, info() {}, warn() {}, error() {}, debug() {}};
+
+function load(request) {
+    if (request.source !== undefined && contexts[request.script] === undefined) {
+        const context = vm.createContext({
+            require: require,
+            Buffer: Buffer,
+            console: silentConsole,
+        });
+        vm.runInContext(request.source, context);
+        contexts[request.script] = context;
+    }
+    if (contexts[request.script] === undefined) {
+        throw new Error("Script is not loaded: " + request.script);
+    }
+    return contexts[request.script];
+}
+
+readline.createInterface({input: process.stdin}).on("line", (line) => {
+    const request = JSON.parse(line);
+    // loaded 与调用结果分开返回，函数抛出异常时脚本仍然是已加载的
+    const response = {id: request.id, loaded: false};
+    try {
+        const context = load(request);
+        response.loaded = true;
+        response.result = context[request.function].apply(context, request.args);
+    } catch (err) {
+        response.error = String((err && err.stack) || err);
+    }
+    process.stdout.write(JSON.stringify(response) + "\n");
+});
+"""
+
+# 脚本摘要缓存 {脚本: 摘要}
+script_digest_dict: Dict[str, str] = {}
+
+
+def get_script_digest(js_str: str) -> str:
+    digest = script_digest_dict.get(js_str)
+    if digest is None:
+        digest = hashlib.sha1(js_str.encode()).hexdigest()
+        script_digest_dict[js_str] = digest
+    return digest
+
+
+class NodeWorker:
+    """
+    一个常驻的 node 进程，同一时间只处理一个调用
+    """
+
+    def __init__(self):
+        env: Dict = dict(os.environ)
+        env["NODE_PATH"] = NPM_ROOT_PATH
+        self._process = subprocess.Popen(
+            [NODE_BIN_PATH, "-e", js_worker_code],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+        self._request_id: int = 0
+        self._loaded_scripts = set()
+        # 已经读取但还没有组成完整一行的输出
+        self._read_buffer: bytearray = bytearray()
+        # 通信失败或者超时后进程的输出已经不可信，不能再使用
+        self.is_broken: bool = False
+        JS_WORKER_START_COUNTER.inc()
+        logger.debug(f"JS 签名进程启动, pid: {self._process.pid}")
+
+    @property
+    def is_alive(self) -> bool:
+        return self._process.poll() is None
+
+    def _read_line(self, timeout: Optional[float]) -> Optional[bytes]:
+        """
+        在超时时间内从 stdout 读取一行
+        直接对文件描述符 select + os.read，不经过带缓冲的 readline，
+        进程只输出了半行时也不会阻塞超过超时时间
+        :param timeout: 超时时间(秒)，None 为一直等待
+        :return: 一行输出，进程退出时为 b""，超时为 None
+        """
+        fd: int = self._process.stdout.fileno()
+        deadline: Optional[float] = (
+            None if timeout is None else time.monotonic() + timeout
+        )
+        while True:
+            index: int = self._read_buffer.find(b"\n")
+            if index >= 0:
+                line: bytes = bytes(self._read_buffer[: index + 1])
+                del self._read_buffer[: index + 1]
+                return line
+            if deadline is None:
+                remaining: Optional[float] = None
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                continue
+            chunk: bytes = os.read(fd, 65536)
+            if not chunk:
+                return b""
+            self._read_buffer.extend(chunk)
+
+    def call(self, js_str: str, function: str, args: List, timeout: Optional[float]):
+        """
+        :param js_str: JS 脚本
+        :param function: 函数名
+        :param args: 函数参数
+        :param timeout: 超时时间(秒)
+        :return: 函数返回值
+        """
+        digest: str = get_script_digest(js_str=js_str)
+        self._request_id += 1
+        request: Dict = {
+            "id": self._request_id,
+            "script": digest,
+            "function": function,
+            "args": args,
+        }
+        if digest not in self._loaded_scripts:
+            request["source"] = js_str
+        try:
+            self._process.stdin.write(json.dumps(request).encode() + b"\n")
+            self._process.stdin.flush()
+            line: Optional[bytes] = self._read_line(timeout=timeout)
+        except (OSError, ValueError) as err:
+            self.is_broken = True
+            raise JSWorkerException(message=f"JS 签名进程通信失败: {err}")
+        if line is None:
+            self.is_broken = True
+            raise JSWorkerException(message=f"JS 签名超时: {function}")
+        if not line:
+            self.is_broken = True
+            try:
+                return_code = self._process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                return_code = None
+            raise JSWorkerException(message=f"JS 签名进程退出, 退出码: {return_code}")
+
+        try:
+            response: Dict = json.loads(line)
+        except ValueError:
+            self.is_broken = True
+            raise JSWorkerException(message=f"JS 签名进程输出错误: {line[:200]!r}")
+        if response.get("id") != request["id"]:
+            self.is_broken = True
+            raise JSWorkerException(message=f"JS 签名进程响应错误: {function}")
+        # 脚本加载失败时下次调用重新发送脚本，函数抛出异常时脚本已经加载
+        if response.get("loaded"):
+            self._loaded_scripts.add(digest)
+        if "error" in response:
+            raise JSWorkerException(message=response["error"])
+        return response.get("result")
+
+    def close(self):
+        if self.is_alive:
+            self._process.kill()
+        self._process.wait()
+        for pipe in (self._process.stdin, self._process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+
+class JSWorkerPool:
+    """
+    Node.js 进程池 - 单例
+    进程在需要时启动，数量不超过 JS_WORKER_POOL_SIZE，调用超过上限时等待空闲的进程
+    """
+
+    pool = None
+
+    @synchronized
+    def __new__(cls, *args, **kwargs):
+        if cls.pool is None:
+            cls.pool = super().__new__(cls)
+            cls.pool._init_pool(size=JS_WORKER_POOL_SIZE)
+            atexit.register(cls.pool.close)
+        return cls.pool
+
+    def _init_pool(self, size: int):
+        self._semaphore = threading.BoundedSemaphore(size)
+        self._idle_workers: queue.LifoQueue = queue.LifoQueue()
+
+    def _get_worker(self) -> NodeWorker:
+        """
+        取出一个空闲的进程，已经退出的进程直接丢弃，没有空闲的进程时启动新的进程
+        """
+        while True:
+            try:
+                worker: NodeWorker = self._idle_workers.get_nowait()
+            except queue.Empty:
+                return NodeWorker()
+            if worker.is_alive:
+                return worker
+            worker.close()
+
+    def call(
+        self,
+        js_str: str,
+        function: str,
+        *args,
+        timeout: Optional[float] = JS_WORKER_CALL_TIMEOUT_SECONDS,
+    ):
+        """
+        调用脚本中的函数
+        :param js_str: JS 脚本
+        :param function: 函数名
+        :param args: 函数参数(需要可以序列化为 JSON)
+        :param timeout: 超时时间(秒)
+        :return: 函数返回值
+        """
+        with self._semaphore:
+            worker: NodeWorker = self._get_worker()
+            try:
+                result = worker.call(
+                    js_str=js_str, function=function, args=list(args), timeout=timeout
+                )
+            except JSWorkerException:
+                # JS 抛出的异常不影响进程本身，通信失败或者超时的进程直接结束
+                if worker.is_alive and not worker.is_broken:
+                    self._idle_workers.put(worker)
+                else:
+                    logger.warning(f"JS 签名进程异常, 重新启动: {function}")
+                    worker.close()
+                raise
+            self._idle_workers.put(worker)
+            return result
+
+    def close(self):
+        while True:
+            try:
+                self._idle_workers.get_nowait().close()
+            except queue.Empty:
+                return
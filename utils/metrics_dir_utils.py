@@ -0,0 +1,45 @@
+"""
+多进程监控指标目录
+prometheus_client 在导入时根据 PROMETHEUS_MULTIPROC_DIR 决定指标是否写入文件，
+所以入口脚本(api_server.py、call_spider.py、captcha/zhihu_captcha_service.py)
+需要在导入 utils.metrics_utils 之前调用 init_metrics_multiproc_dir
+
+指标文件以进程 PID 命名，容器中的进程 PID 会重复(都是 1)，
+所以每个容器使用 METRICS_MULTIPROC_DIR 下以主机名命名的子目录
+"""
+
+import os
+import atexit
+import shutil
+import socket
+
+from config import METRICS_MULTIPROC_DIR
+
+
+def get_metrics_multiproc_dir() -> str:
+    """
+    当前容器的指标目录
+    """
+    return os.path.join(METRICS_MULTIPROC_DIR, socket.gethostname())
+
+
+def _mark_current_process_dead(path: str):
+    from prometheus_client.multiprocess import mark_process_dead
+
+    mark_process_dead(pid=os.getpid(), path=path)
+
+
+def init_metrics_multiproc_dir(clear: bool = False) -> str:
+    """
+    设置当前进程的指标目录，进程退出时删除进程的实时指标文件
+    :param clear: 是否清空目录中上一次启动留下的指标文件，只能在容器的主进程启动时清空，
+                  子进程(例如 uvicorn 的 worker)启动时清空会删除其他进程的指标文件
+    :return: 指标目录
+    """
+    path: str = get_metrics_multiproc_dir()
+    if clear:
+        shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    atexit.register(_mark_current_process_dead, path)
+    return path
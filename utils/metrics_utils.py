@@ -0,0 +1,162 @@
+import os
+import glob
+import time
+import inspect
+import functools
+from urllib.parse import urlparse
+from typing import Dict, Tuple, Callable, Optional
+
+# 多进程指标目录需要在导入之前通过 utils.metrics_dir_utils.init_metrics_multiproc_dir 设置
+from prometheus_client import (
+    Counter,
+    Histogram,
+    CollectorRegistry,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+from prometheus_client.core import GaugeMetricFamily
+
+from config import METRICS_MULTIPROC_DIR
+
+metrics_prefix: str = "blogs_crawler"
+
+# 爬虫请求
+HTTP_REQUEST_COUNTER = Counter(
+    f"{metrics_prefix}_http_requests_total", "爬虫 HTTP 请求数", ["host", "status"]
+)
+HTTP_REQUEST_LATENCY = Histogram(
+    f"{metrics_prefix}_http_request_seconds", "爬虫 HTTP 请求耗时(秒)", ["host"]
+)
+PAGES_FETCHED_COUNTER = Counter(
+    f"{metrics_prefix}_pages_fetched_total", "爬虫请求的页数", ["spider"]
+)
+RECORDS_PARSED_COUNTER = Counter(
+    f"{metrics_prefix}_records_parsed_total", "爬虫解析的数据条数", ["spider"]
+)
+
+# 任务队列
+TASK_QUEUE_WAIT = Histogram(
+    f"{metrics_prefix}_task_queue_wait_seconds",
+    "任务在队列中等待的时间(秒)",
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 600, 1800, 3600),
+)
+TASK_QUEUE_DEPTH_METRIC: str = f"{metrics_prefix}_task_queue_depth"
+
+# 存储
+MONGO_WRITE_LATENCY = Histogram(
+    f"{metrics_prefix}_mongo_write_seconds",
+    "MongoDB 写入耗时(秒)",
+    ["collection", "operation"],
+)
+MONGO_WRITE_BATCH_SIZE = Histogram(
+    f"{metrics_prefix}_mongo_write_batch_size",
+    "MongoDB 批量写入的条数",
+    ["collection"],
+    buckets=(1, 10, 50, 100, 500, 1000, 5000, 10000),
+)
+REDIS_OP_LATENCY = Histogram(
+    f"{metrics_prefix}_redis_op_seconds",
+    "Redis 操作耗时(秒)",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+)
+
+# 验证码识别以及 JS 签名
+CAPTCHA_INFERENCE_LATENCY = Histogram(
+    f"{metrics_prefix}_captcha_inference_seconds", "验证码识别耗时(秒)"
+)
+CAPTCHA_CACHE_COUNTER = Counter(
+    f"{metrics_prefix}_captcha_cache_total", "验证码识别结果缓存的查询次数", ["result"]
+)
+CAPTCHA_BATCH_SIZE = Histogram(
+    f"{metrics_prefix}_captcha_batch_size",
+    "验证码识别服务每个批次的图片数",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+JS_SIGN_LATENCY = Histogram(
+    f"{metrics_prefix}_js_sign_seconds", "JS 签名耗时(秒)", ["function"]
+)
+JS_COMPILE_LATENCY = Histogram(
+    f"{metrics_prefix}_js_compile_seconds", "JS 脚本编译耗时(秒)"
+)
+JS_WORKER_START_COUNTER = Counter(
+    f"{metrics_prefix}_js_worker_starts_total", "JS 签名 node 进程的启动次数"
+)
+
+
+def observe_http_request(url: str, status: str, elapsed: float):
+    """
+    记录一次爬虫 HTTP 请求
+    :param url: 请求地址
+    :param status: 状态码，请求异常时为 error
+    :param elapsed: 耗时(秒)
+    """
+    host: str = urlparse(url).netloc
+    HTTP_REQUEST_COUNTER.labels(host=host, status=status).inc()
+    HTTP_REQUEST_LATENCY.labels(host=host).observe(elapsed)
+
+
+def observe_redis_latency(func: Callable) -> Callable:
+    """
+    记录 Redis 操作耗时的装饰器(支持异步方法)，操作名称为方法名
+    """
+    histogram = REDIS_OP_LATENCY.labels(operation=func.__name__)
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start_time)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start_time)
+
+    return wrapper
+
+
+class _MultiDirectoryCollector:
+    """
+    汇总 METRICS_MULTIPROC_DIR 下所有容器子目录中的指标文件
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+
+    def collect(self):
+        files = glob.glob(os.path.join(self._path, "*", "*.db"))
+        return MultiProcessCollector.merge(files, accumulate=True)
+
+
+class _ScrapeTimeGaugeCollector:
+    def __init__(self, gauges: Dict[str, Tuple[str, float]]):
+        self._gauges = gauges
+
+    def collect(self):
+        for name, (documentation, value) in self._gauges.items():
+            yield GaugeMetricFamily(name, documentation, value=value)
+
+
+def generate_metrics(
+    extra_gauges: Optional[Dict[str, Tuple[str, float]]] = None,
+) -> bytes:
+    """
+    汇总所有容器中所有进程的指标
+    :param extra_gauges: 抓取时才计算的指标(例如任务队列长度) {指标名称: (说明, 值)}
+    :return: Prometheus 文本格式的指标
+    """
+    registry = CollectorRegistry()
+    registry.register(_MultiDirectoryCollector(path=METRICS_MULTIPROC_DIR))
+    if extra_gauges:
+        registry.register(_ScrapeTimeGaugeCollector(gauges=extra_gauges))
+    return generate_latest(registry)
@@ -0,0 +1,158 @@
+import json
+import time
+import threading
+from typing import Dict, Optional
+
+from utils.trace_utils import TaskTracer, trace_phase
+from utils.logger_utils import LogManager
+from utils.metrics_utils import PAGES_FETCHED_COUNTER, RECORDS_PARSED_COUNTER
+from pipeline.redis_pipeline import RedisPipelineHandler
+from config import LOG_LEVEL, TASK_PROGRESS_EXPIRE_SECONDS
+
+logger = LogManager(__name__).get_logger_and_add_handlers(
+    formatter_template=5, log_level_int=LOG_LEVEL
+)
+
+# 任务进度的 Redis Hash key 前缀以及发布订阅频道前缀
+redis_progress_key_prefix: str = "spider_task_progress"
+redis_progress_channel_prefix: str = "spider_task_progress_channel"
+
+
+def get_progress_key(task_id: str) -> str:
+    return f"{redis_progress_key_prefix}:{task_id}"
+
+
+def get_progress_channel(task_id: str) -> str:
+    return f"{redis_progress_channel_prefix}:{task_id}"
+
+
+# 任务阶段枚举类
+class TaskProgressPhase:
+    Cookies: str = "Cookies"
+    Login: str = "Login"
+    PersonalData: str = "PersonalData"
+    PersonalBlogs: str = "PersonalBlogs"
+    PersonalLikeBlogs: str = "PersonalLikeBlogs"
+    SendData: str = "SendData"
+    Finish: str = "Finish"
+    # 爬虫进程退出时中断的任务，已经放回任务队列，由其他爬虫进程重新执行
+    Interrupted: str = "Interrupted"
+
+
+class TaskProgress:
+    """
+    任务进度
+    进度以 Hash 的形式写入 spider_task_progress:{task_id}
+    同时把最新的快照发布到 spider_task_progress_channel:{task_id}
+    """
+
+    def __init__(
+        self,
+        task_id: Optional[str],
+        platform: str = "unknown",
+        tracer: Optional[TaskTracer] = None,
+    ):
+        """
+        :param task_id: 任务 ID
+        :param platform: 平台名称(监控指标的标签)
+        :param tracer: 任务追踪对象，不传时使用当前线程的追踪对象
+                       (写入数据的线程中结束任务时需要传入)
+        """
+        self._task_id = task_id
+        self._platform = platform
+        self._tracer = tracer
+        self._redis_instance = RedisPipelineHandler()
+        self._lock = threading.Lock()
+
+        self._phase: Optional[str] = None
+        self._phase_start_time: float = time.time()
+        self._progress: Dict = {
+            "taskId": task_id,
+            "phase": "",
+            "pagesFetched": 0,
+            "recordsParsed": 0,
+            "recordsWritten": 0,
+        }
+
+    def _close_phase(self, now: float):
+        if self._phase is not None:
+            elapsed_key: str = f"elapsed.{self._phase}"
+            elapsed: float = self._progress.get(elapsed_key, 0.0)
+            self._progress[elapsed_key] = round(
+                elapsed + now - self._phase_start_time, 3
+            )
+
+    def _publish(self):
+        # 没有任务 ID 的爬虫(例如单独调试时)不记录进度
+        if self._task_id is None:
+            return
+        self._progress["updateTime"] = round(time.time(), 3)
+        self._redis_instance.insert_hash(
+            key=get_progress_key(task_id=self._task_id),
+            mapping=self._progress,
+            expire_seconds=TASK_PROGRESS_EXPIRE_SECONDS,
+        )
+        self._redis_instance.publish_message(
+            channel=get_progress_channel(task_id=self._task_id),
+            message=json.dumps(self._progress),
+        )
+
+    def start_phase(self, phase: str):
+        """
+        切换任务阶段，同时累计上一个阶段的耗时
+        :param phase: 阶段名称 TaskProgressPhase
+        """
+        with self._lock:
+            now: float = time.time()
+            self._close_phase(now=now)
+            self._phase = phase
+            self._phase_start_time = now
+            self._progress["phase"] = phase
+            self._publish()
+        if self._tracer is not None:
+            self._tracer.start_phase(phase=phase)
+        else:
+            trace_phase(phase=phase)
+        logger.debug(f"任务ID: {self._task_id}, 当前阶段: {phase}")
+
+    def add_counters(self, *, pages: int = 0, parsed: int = 0, written: int = 0):
+        """
+        累计任务计数器
+        :param pages: 请求的页数
+        :param parsed: 解析的数据条数
+        :param written: 写入数据库的数据条数
+        """
+        if pages > 0:
+            PAGES_FETCHED_COUNTER.labels(spider=self._platform).inc(pages)
+        if parsed > 0:
+            RECORDS_PARSED_COUNTER.labels(spider=self._platform).inc(parsed)
+        with self._lock:
+            self._progress["pagesFetched"] += pages
+            self._progress["recordsParsed"] += parsed
+            self._progress["recordsWritten"] += written
+            self._publish()
+
+    def finish(self):
+        self.start_phase(phase=TaskProgressPhase.Finish)
+
+    def interrupt(self):
+        self.start_phase(phase=TaskProgressPhase.Interrupted)
+
+    def to_dict(self) -> Dict:
+        return dict(self._progress)
+
+
+def parse_progress_snapshot(snapshot: Dict) -> Dict:
+    """
+    Redis Hash 中的值都是字符串，转换为与发布的进度一致的类型
+    :param snapshot: spider_task_progress:{task_id} 中的数据
+    :return: 进度
+    """
+    progress: Dict = dict(snapshot)
+    for key in ("pagesFetched", "recordsParsed", "recordsWritten"):
+        if key in progress:
+            progress[key] = int(progress[key])
+    for key, value in snapshot.items():
+        if key == "updateTime" or key.startswith("elapsed."):
+            progress[key] = float(value)
+    return progress
@@ -0,0 +1,172 @@
+import json
+import time
+import uuid
+import threading
+from typing import List, Optional
+
+from utils.cache_utils import LRUCache
+from utils.decorator import synchronized
+from utils.logger_utils import LogManager
+from pipeline.redis_pipeline import RedisPipelineHandler
+from config import (
+    LOG_LEVEL,
+    SESSION_CACHE_MAX_SIZE,
+    SESSION_CACHE_TTL_SECONDS,
+    SESSION_VALIDATED_TTL_SECONDS,
+)
+
+logger = LogManager(__name__).get_logger_and_add_handlers(
+    formatter_template=5, log_level_int=LOG_LEVEL
+)
+
+# 会话缓存失效通知的频道
+redis_session_invalidate_channel: str = "session_cache_invalidate"
+# 当前进程的标识，用于忽略自己发出的失效通知
+process_cache_id: str = uuid.uuid4().hex
+
+
+class SessionLocalCache:
+    """
+    进程内会话缓存 - LRUCache
+    同时启动一个守护线程订阅失效通知，其他进程修改会话数据时清理本地缓存
+    """
+
+    local_cache = None
+
+    @synchronized
+    def __new__(cls, *args, **kwargs):
+        if cls.local_cache is None:
+            cls.local_cache = cls._init_local_cache()
+        return cls.local_cache
+
+    @staticmethod
+    def _init_local_cache() -> LRUCache:
+        local_cache = LRUCache(
+            max_size=SESSION_CACHE_MAX_SIZE, ttl_seconds=SESSION_CACHE_TTL_SECONDS
+        )
+
+        redis_instance = RedisPipelineHandler()
+        # 在返回缓存之前同步完成订阅，避免丢失订阅完成之前发布的失效通知
+        first_pubsub = redis_instance.subscribe_channel(
+            channel=redis_session_invalidate_channel
+        )
+
+        def invalidate_listener(pubsub):
+            while True:
+                if pubsub is None:
+                    time.sleep(5)
+                    # 重新订阅之前的失效通知可能已经丢失
+                    local_cache.clear()
+                    pubsub = redis_instance.subscribe_channel(
+                        channel=redis_session_invalidate_channel
+                    )
+                    continue
+                try:
+                    for message in pubsub.listen():
+                        data = json.loads(message["data"])
+                        if data["origin"] == process_cache_id:
+                            continue
+                        for key in data["keys"]:
+                            local_cache.delete(key=key)
+                except Exception as err:
+                    # 连接断开时清空本地缓存，避免错过失效通知后读到旧数据
+                    logger.error(f"会话缓存失效通知订阅异常!错误原因: {err}")
+                    local_cache.clear()
+                    time.sleep(1)
+                finally:
+                    pubsub.close()
+                pubsub = redis_instance.subscribe_channel(
+                    channel=redis_session_invalidate_channel
+                )
+
+        listener_thread = threading.Thread(
+            target=invalidate_listener,
+            args=(first_pubsub,),
+            name="session-cache-invalidate",
+            daemon=True,
+        )
+        listener_thread.start()
+        return local_cache
+
+
+class SessionCacheHandler:
+    """
+    两级会话缓存：进程内 LRUCache + Redis
+    缓存的内容包括 Cookie、掘金的 :params、知乎的 :token、思否的 :user_url 以及 Cookie 最近一次探测通过的时间
+    """
+
+    def __init__(self):
+        self._local_cache = SessionLocalCache()
+        self._redis_instance = RedisPipelineHandler()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._local_cache.get(key=key)
+        if value is not None:
+            return value
+
+        value = self._redis_instance.find_key(key=key)
+        if value is not None:
+            self._local_cache.set(key=key, value=value)
+        return value
+
+    def prefetch(self, keys: List[str]):
+        """
+        通过一次 MGET 把本地缓存中没有的 key 加载到本地缓存
+        :param keys: key 列表
+        """
+        missing_keys: List = [
+            key for key in keys if self._local_cache.get(key=key) is None
+        ]
+        values = self._redis_instance.find_keys(keys=missing_keys)
+        if values is None:
+            return
+        for key, value in zip(missing_keys, values):
+            if value is not None:
+                self._local_cache.set(key=key, value=value)
+
+    def set(
+        self, key: str, value: str, *, expire_seconds: Optional[int] = None
+    ) -> bool:
+        is_insert = self._redis_instance.insert_key(
+            key=key, value=value, expire_seconds=expire_seconds
+        )
+        if is_insert:
+            self._local_cache.set(key=key, value=value, ttl_seconds=expire_seconds)
+            self._publish_invalidate(keys=[key])
+        return is_insert
+
+    def invalidate(self, keys: List[str]):
+        """
+        清理本进程以及其他进程中的缓存(Redis 中的数据由调用方删除)
+        :param keys: 需要失效的 key
+        """
+        for key in keys:
+            self._local_cache.delete(key=key)
+        self._publish_invalidate(keys=keys)
+
+    def _publish_invalidate(self, keys: List[str]):
+        self._redis_instance.publish_message(
+            channel=redis_session_invalidate_channel,
+            message=json.dumps({"origin": process_cache_id, "keys": keys}),
+        )
+
+    def mark_validated(self, spider_name: str) -> bool:
+        """
+        记录 Cookie 最近一次探测通过的时间
+        :param spider_name: 爬虫名称
+        """
+        return self.set(
+            key=f"{spider_name}:validated_at",
+            value=str(time.time()),
+            expire_seconds=SESSION_VALIDATED_TTL_SECONDS,
+        )
+
+    def is_recently_validated(self, spider_name: str) -> bool:
+        """
+        Cookie 是否在 SESSION_VALIDATED_TTL_SECONDS 内探测通过，是则可以跳过探测
+        :param spider_name: 爬虫名称
+        """
+        validated_at = self.get(key=f"{spider_name}:validated_at")
+        if validated_at is None:
+            return False
+        return time.time() - float(validated_at) < SESSION_VALIDATED_TTL_SECONDS
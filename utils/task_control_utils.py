@@ -0,0 +1,41 @@
+import json
+import time
+import threading
+from typing import Dict, Tuple
+
+# 任务取消标记的 key 前缀，取消接口写入，爬虫在分页之间检查
+redis_task_cancel_key_prefix: str = "spider_task_cancel"
+# 任务登录凭据的 key 前缀，凭据不写入任务队列，爬虫进程读取后立即删除
+redis_task_credential_key_prefix: str = "spider_task_credential"
+# 任务中属于登录凭据的字段
+task_credential_fields: tuple = ("username", "password")
+
+# 爬虫进程收到退出信号后不再接收新任务
+worker_drain_event: threading.Event = threading.Event()
+# 等待超时(或者再次收到退出信号)后，正在执行的任务在下一次分页时中断
+worker_interrupt_event: threading.Event = threading.Event()
+
+
+def get_cancel_key(task_id: str) -> str:
+    return f"{redis_task_cancel_key_prefix}:{task_id}"
+
+
+def get_credential_key(task_id: str) -> str:
+    return f"{redis_task_credential_key_prefix}:{task_id}"
+
+
+def split_task_credential(task_dict: Dict) -> Tuple[str, Dict]:
+    """
+    把任务拆分为写入任务队列的消息以及登录凭据
+    :param task_dict: 任务
+    :return: (任务队列消息, 登录凭据)
+    """
+    task_message: Dict = {
+        key: value
+        for key, value in task_dict.items()
+        if key not in task_credential_fields
+    }
+    # 入队时间，用于统计任务在队列中等待的时间
+    task_message["enqueueTime"] = time.time()
+    credential: Dict = {key: task_dict[key] for key in task_credential_fields}
+    return json.dumps(task_message), credential
@@ -0,0 +1,195 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from utils.logger_utils import LogManager
+from pipeline.redis_pipeline import RedisPipelineHandler
+from config import LOG_LEVEL, TASK_TRACE_EXPIRE_SECONDS
+
+logger = LogManager(__name__).get_logger_and_add_handlers(
+    formatter_template=5, log_level_int=LOG_LEVEL
+)
+
+# 任务追踪数据的 Redis List key 前缀
+redis_trace_key_prefix: str = "spider_task_trace"
+# 当前线程正在执行的任务的追踪对象
+_thread_local = threading.local()
+
+
+def get_trace_key(task_id: str) -> str:
+    return f"{redis_trace_key_prefix}:{task_id}"
+
+
+class TaskTracer:
+    """
+    任务追踪
+    任务阶段(TaskProgressPhase)作为顶层 span 依次排列，阶段内的请求、验证码识别、JS 签名、写入数据等作为子 span
+    每个 span 以 [id, 父 id, 名称, 开始时间(毫秒，相对任务开始), 耗时(毫秒), 详情] 的形式
+    写入 spider_task_trace:{task_id}
+    span 先缓存在内存中，切换阶段以及任务结束时通过一个 pipeline 批量写入
+    没有任务 ID 时不记录 span；任务被中断后重新执行时，第一次激活会删除上一次执行的 span
+    """
+
+    def __init__(self, task_id: Optional[str]):
+        self._task_id = task_id
+        self._start_time: float = time.perf_counter()
+        self._lock = threading.Lock()
+        self._redis_instance = RedisPipelineHandler()
+
+        self._next_span_id: int = 0
+        self._span_stack: List[int] = []
+        self._phase_span: Optional[List] = None
+        self._pending_spans: List[str] = []
+        self._is_activated: bool = False
+
+    def _now_ms(self) -> float:
+        return round((time.perf_counter() - self._start_time) * 1000, 1)
+
+    def _new_span_id(self) -> int:
+        with self._lock:
+            span_id = self._next_span_id
+            self._next_span_id += 1
+            return span_id
+
+    def _record(
+        self,
+        span_id: int,
+        parent_id: int,
+        name: str,
+        start_ms: float,
+        detail: Optional[str],
+    ):
+        # 没有任务 ID 的爬虫(例如单独调试时)不缓存 span
+        if self._task_id is None:
+            return
+        span: List = [
+            span_id,
+            parent_id,
+            name,
+            start_ms,
+            round(self._now_ms() - start_ms, 1),
+        ]
+        if detail is not None:
+            span.append(detail)
+        with self._lock:
+            self._pending_spans.append(json.dumps(span, separators=(",", ":")))
+
+    def _close_phase(self):
+        if self._phase_span is not None:
+            self._record(*self._phase_span, detail=None)
+            self._phase_span = None
+
+    def flush(self):
+        """
+        把缓存的 span 写入 Redis
+        """
+        if self._task_id is None:
+            return
+        with self._lock:
+            spans, self._pending_spans = self._pending_spans, []
+        if len(spans) > 0:
+            self._redis_instance.push_list(
+                key=get_trace_key(task_id=self._task_id),
+                values=spans,
+                expire_seconds=TASK_TRACE_EXPIRE_SECONDS,
+            )
+
+    def activate(self):
+        """
+        设置为当前线程的追踪对象，trace_span 以及 trace_phase 会记录到这个对象中
+        """
+        if self._task_id is not None and not self._is_activated:
+            self._redis_instance.remove_keys(
+                keys=[get_trace_key(task_id=self._task_id)]
+            )
+        self._is_activated = True
+        _thread_local.tracer = self
+
+    def start_phase(self, phase: str):
+        self._close_phase()
+        self._phase_span = [self._new_span_id(), -1, phase, self._now_ms()]
+        self.flush()
+
+    def finish(self):
+        """
+        任务结束：关闭当前阶段，写入所有 span 并取消激活
+        """
+        self._close_phase()
+        self.flush()
+        if getattr(_thread_local, "tracer", None) is self:
+            _thread_local.tracer = None
+
+    @contextmanager
+    def span(self, name: str, detail: Optional[str] = None):
+        """
+        记录一个子 span
+        :param name: 名称，例如 http，captcha，js_sign，mongo_write
+        :param detail: 详情，例如请求的域名
+        """
+        if len(self._span_stack) > 0:
+            parent_id: int = self._span_stack[-1]
+        elif self._phase_span is not None:
+            parent_id = self._phase_span[0]
+        else:
+            parent_id = -1
+        span_id = self._new_span_id()
+        start_ms = self._now_ms()
+        self._span_stack.append(span_id)
+        try:
+            yield
+        finally:
+            self._span_stack.pop()
+            self._record(span_id, parent_id, name, start_ms, detail=detail)
+
+
+@contextmanager
+def trace_span(name: str, detail: Optional[str] = None):
+    """
+    在当前线程的追踪对象中记录一个子 span，没有正在追踪的任务时不做任何事情
+    """
+    tracer: Optional[TaskTracer] = getattr(_thread_local, "tracer", None)
+    if tracer is None:
+        yield
+        return
+    with tracer.span(name=name, detail=detail):
+        yield
+
+
+def trace_phase(phase: str):
+    tracer: Optional[TaskTracer] = getattr(_thread_local, "tracer", None)
+    if tracer is not None:
+        tracer.start_phase(phase=phase)
+
+
+def parse_trace_spans(raw_spans: List[str]) -> Dict:
+    """
+    把 Redis 中的 span 转换为瀑布图数据
+    :param raw_spans: spider_task_trace:{task_id} 中的数据
+    :return: {"spans": 按开始时间排序的 span, "summary": 每种 span 的次数以及总耗时}
+    """
+    spans: List[Dict] = []
+    summary: Dict = {}
+    for raw_span in raw_spans:
+        item = json.loads(raw_span)
+        span: Dict = {
+            "id": item[0],
+            "parentId": item[1],
+            "name": item[2],
+            "start": item[3],
+            "duration": round(item[4], 1),
+        }
+        if len(item) > 5:
+            span["detail"] = item[5]
+        spans.append(span)
+
+        # 只统计子 span，顶层的阶段耗时已经包含了子 span
+        if span["parentId"] != -1:
+            name_summary = summary.setdefault(span["name"], {"count": 0, "duration": 0})
+            name_summary["count"] += 1
+            name_summary["duration"] = round(
+                name_summary["duration"] + span["duration"], 1
+            )
+    spans.sort(key=lambda s: (s["start"], s["id"]))
+    return {"spans": spans, "summary": summary}
@@ -0,0 +1,79 @@
+"""
+知乎登录参数加密(encrypt)以及 x-zse-86 签名(b)的 Python 实现
+与 utils/js_utils.py 中两段 JS 的结果完全一致，不再需要 node 进程
+
+两段 JS 执行的是同一段虚拟机字节码，__g._encrypt(e) 的逻辑为：
+1. 检测运行环境(window.name、navigator.userAgent、Buffer、webdriver 等)，
+   每命中一项就在 e 前面加上一个标记字符 \\x10 ~ \\x1c
+2. 末尾补 \\x00 使长度为 3 的倍数
+3. 从后往前每 3 个字节一组，第 0、4、8... 个字节(从后往前计数)与 42 异或，
+   每组按小端拼成 24 位整数，从低位开始每 6 位映射到自定义字母表中的一个字符
+
+第 3 步等价于：异或后的数据做标准 Base64，整体反转后替换字母表
+"""
+
+import base64
+from urllib.parse import quote
+
+# 自定义字母表
+zhihu_encrypt_alphabet: str = (
+    "RuPtXwxpThIZ0qyz_9fYLCOV8B1mMGKs7UnFHgN3iDaWAJE-Qrk2ecSo6bjd4vl5"
+)
+zhihu_encrypt_xor_key: int = 42
+# 运行环境的标记字符
+# encrypt 脚本中 window.navigator 是普通对象，userAgent 是它自身的属性，
+# 命中 Object.getOwnPropertyDescriptor(navigator, "userAgent") 的检测
+zhihu_encrypt_env_flags: bytes = b"\x1a"
+# x-zse-86 脚本运行在 jsdom 中，按 jsdom 的 window(name 为空，userAgent 在 navigator 的原型上)没有命中任何检测，
+# 这一点只和模拟的 window 对比过，需要 test/zhihu_zse86_golden.json(真实 jsdom 的结果)确认
+zhihu_zse86_env_flags: bytes = b""
+
+# encodeURIComponent 不转义的字符(字母、数字以及 -_.~ 之外的部分)
+uri_component_safe_chars: str = "!*'()"
+
+standard_base64_alphabet: bytes = (
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+)
+alphabet_translate_table: bytes = bytes.maketrans(
+    standard_base64_alphabet, zhihu_encrypt_alphabet.encode()
+)
+xor_translate_table: bytes = bytes(i ^ zhihu_encrypt_xor_key for i in range(256))
+
+
+def encode_uri_component(text: str) -> str:
+    """
+    与 JS 的 encodeURIComponent 一致
+    """
+    return quote(text, safe=uri_component_safe_chars)
+
+
+def g_encrypt(data: bytes) -> str:
+    """
+    __g._encrypt 的编码部分
+    :param data: 已经加上环境标记的数据(每个字符不超过 0xff)
+    :return: 编码结果
+    """
+    buffer = bytearray(data)
+    buffer.extend(b"\x00" * (-len(buffer) % 3))
+    last_index: int = len(buffer) - 1
+    buffer[last_index::-4] = buffer[last_index::-4].translate(xor_translate_table)
+    return base64.b64encode(buffer)[::-1].translate(alphabet_translate_table).decode()
+
+
+def zhihu_encrypt(data: str) -> str:
+    """
+    知乎登录请求体加密，对应 zhihu_encrypt_js_code 的 encrypt
+    :param data: urlencode 后的登录参数
+    :return: 加密后的请求体
+    """
+    return g_encrypt(zhihu_encrypt_env_flags + encode_uri_component(data).encode())
+
+
+def zhihu_zse86_sign(data: str) -> str:
+    """
+    x-zse-86 签名，对应 zhihu_zse86_js_code 的 b
+    还没有和真实 jsdom 运行的结果对比过，爬虫仍然通过 execjs 执行原始脚本
+    :param data: 签名原文的 MD5
+    :return: 签名
+    """
+    return g_encrypt(zhihu_zse86_env_flags + encode_uri_component(data).encode())